@@ -1,6 +1,23 @@
+import importlib
 import streamlit as st
 from src.auth.auth import init_session, logout
-from views import analysis, batch_series, data_configuration, data_loader, home, login, train_model
+
+# Página del menú -> (módulo de views, requiere sesión)
+# Cada vista se importa solo al abrirla: así la portada y el login no cargan
+# statsmodels, scipy o matplotlib, que solo usan las páginas de análisis y modelos
+PAGINAS = {
+    "Home": ("home", False),
+    "Login": ("login", False),
+    "Análisis": ("analysis", True),
+    "Predicciones": ("train_model", True),
+    "Configuración": ("data_configuration", True),
+    "Datos": ("data_loader", True),
+    "Precesamiento Masivo": ("batch_series", True),
+}
+
+
+def cargar_vista(modulo):
+    return importlib.import_module(f"views.{modulo}")
 
 st.set_page_config(
     page_title='predicciones.es', 
@@ -31,41 +48,10 @@ else:
     )
 
 # ---------- RENDER VISTAS ----------
-if option == "Home":
-    home.run()
-
-elif option == "Login":
-    login.run()
+modulo, requiere_sesion = PAGINAS[option]
 
-elif option == "Análisis":
-    if st.session_state.authenticated:
-        analysis.run()
-    else:
-        st.warning("Debes iniciar sesión")
-        login.run()
-
-elif option == "Predicciones":
-    if st.session_state.authenticated:
-        train_model.run()
-    else:
-        st.warning("Debes iniciar sesión")
-        login.run()
-
-elif option == "Configuración":
-    if st.session_state.authenticated:
-        data_configuration.run()
-    else:
-        st.warning("Debes iniciar sesión")
-        login.run()
-elif option == "Datos":
-    if st.session_state.authenticated:
-        data_loader.run()
-    else:
-        st.warning("Debes iniciar sesión")
-        login.run()
-elif option == "Precesamiento Masivo":
-    if st.session_state.authenticated:
-        batch_series.run()
-    else:
-        st.warning("Debes iniciar sesión")
-        login.run()
\ No newline at end of file
+if requiere_sesion and not st.session_state.authenticated:
+    st.warning("Debes iniciar sesión")
+    cargar_vista("login").run()
+else:
+    cargar_vista(modulo).run()
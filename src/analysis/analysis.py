@@ -5,15 +5,17 @@ import json
 from src.analysis.stationarity import adf_test, kpss_test, is_stationary, validate_stationarity
 from src.analysis.transformations import difference
 from src.utils.file_store import save_parquet, save_metadata
+from src.utils.dependencies import marcar_construido
+from src.data_preprocessing.data_loader import leer_original
 
 # Nuevas importaciones para análisis completo
 from statsmodels.tsa.stattools import acf, pacf, grangercausalitytests
 from statsmodels.stats.outliers_influence import variance_inflation_factor
 from scipy.stats import ttest_ind
 
-from src.data_exogenous.load_rate import loadRate  # <--- NUEVA CLASE
-from src.data_exogenous.load_bret import get_Bret_for_dates
-from src.data_exogenous.load_holidays import get_festivos_provincia
+from src.data_exogenous.features import construir_exogenas
+from src.utils.cache import cache_datos
+from src.utils.singleflight import singleflight
 
 def to_native(obj):
     if hasattr(obj, "item"):
@@ -22,18 +24,16 @@ def to_native(obj):
 
 def analisis_estacionaridad(provincia, producto):
     base_path = f"src/data/segmented/{provincia}/{producto}/"
-    original_path = base_path + "original.parquet"
     stationary_path = base_path + "stationary.parquet"
     metadata_path = base_path + "metadata.json"
 
-    df = pd.read_parquet(original_path)
+    df = leer_original(provincia, producto)
 
     # Asegurar que la fecha sea índice
    
     df_limpio=df[["Fecha", "Precio"]].copy()
     df_limpio = df_limpio.set_index("Fecha").sort_index()
     serie = df_limpio["Precio"]
-    serie.index = pd.to_datetime(serie.index)
 
     stationary_flag,adf, kpss  = validate_stationarity(serie)
 
@@ -69,32 +69,31 @@ def analisis_estacionaridad(provincia, producto):
     }
 
     save_metadata(metadata, metadata_path)
+    marcar_construido(provincia, producto, "stationary")
+    marcar_construido(provincia, producto, "metadata")
 
 
+@cache_datos("analisis", artefactos=("original", "stationary", "metadata"))
+@singleflight("get_analyze_complete", copiar=False)
 def get_analyze_complete(provincia, producto):
     base_path = f"src/data/segmented/{provincia}/{producto}/"
-    original_path = base_path + "original.parquet"
     stationary_path = base_path + "stationary.parquet"
     metadata_path = base_path + "metadata.json"
     
     # Cargar datos con exógenas
-    df_precio = pd.read_parquet(original_path)
+    df_precio = leer_original(provincia, producto)
     df_stationary = pd.read_parquet(stationary_path)
-    df_precio['Fecha'] = pd.to_datetime(df_precio['Fecha'])
-    df_precio = df_precio.set_index('Fecha').sort_index()
+    df_precio = df_precio.set_index('Fecha')
     
     # Cargar variables exógenas
-    loader = loadRate()
-    tipo_cambio_df = loader.get_rate_for_dates(df_precio.index)
-    df_petroleo = get_Bret_for_dates(df_precio.index)
-    festivos_df = get_festivos_provincia(provincia, df_precio.index)
+    exog = construir_exogenas(provincia, df_precio.index)
     
     # Combinar
     df = pd.DataFrame(index=df_precio.index)
     df['Precio'] = df_precio['Precio']
-    df['Brent'] = df_petroleo['precio_brent']
-    df['TipoCambio'] = tipo_cambio_df['TipoCambio']
-    df['Festivo'] = festivos_df['Festivo']
+    df['Brent'] = exog['Petroleo']
+    df['TipoCambio'] = exog['TipoCambio']
+    df['Festivo'] = exog['Festivo']
     df = df.replace([float("inf"), float("-inf")], pd.NA).ffill().bfill()
     
         # 3. Ejecutar análisis completo
@@ -0,0 +1,101 @@
+import threading
+import numpy as np
+import pandas as pd
+from src.data_exogenous.load_rate import loadRate
+from src.data_exogenous.load_bret import get_Bret_for_dates, version_bret
+from src.data_exogenous.load_holidays import get_festivos_provincia
+from src.utils.cache import cache_datos
+
+# Columnas exógenas en el orden con el que se entrenan los modelos
+EXOG_COLUMNS = ["TipoCambio", "Petroleo", "Festivo"]
+
+
+class MatrizExogenas:
+    """
+    Exógenas comunes a todos los segmentos (TipoCambio, Petroleo) alineadas sobre
+    un rango diario y ya limpias (sin inf ni NaN). Se construye una vez y cada
+    segmento obtiene su tramo, añadiendo solo la columna de festivos de su provincia.
+    """
+
+    def __init__(self, inicio, fin, version=None):
+        self.fechas = pd.date_range(pd.Timestamp(inicio).normalize(),
+                                    pd.Timestamp(fin).normalize(), freq="D")
+        self.version = version
+
+        tipo_cambio_df = loadRate().get_rate_for_dates(self.fechas)
+        df_petroleo = get_Bret_for_dates(self.fechas)
+
+        base = pd.DataFrame({
+            "TipoCambio": tipo_cambio_df["TipoCambio"].to_numpy(dtype=float),
+            "Petroleo": df_petroleo["precio_brent"].to_numpy(dtype=float)
+        }, index=self.fechas)
+
+        # Limpieza una sola vez para todo el rango
+        base = base.replace([float("inf"), float("-inf")], np.nan).ffill().bfill()
+
+        self.base = base
+        self._valores = base.to_numpy()
+
+    def cubre(self, fechas):
+        return len(fechas) == 0 or (fechas.min() >= self.fechas[0] and fechas.max() <= self.fechas[-1])
+
+    def para(self, provincia, fechas):
+        """Exógenas (TipoCambio, Petroleo, Festivo) para las fechas de un segmento."""
+        fechas = pd.to_datetime(fechas)
+        pos = self.fechas.get_indexer(fechas.normalize())
+        if (pos < 0).any():
+            raise ValueError("Fechas fuera del rango de la matriz de exógenas.")
+
+        # Índice diario contiguo (el caso habitual): basta un slice de la matriz
+        # común en lugar de indexar día a día. El DataFrame devuelto es una copia
+        # (propia de cada segmento, y cache_datos la vuelve a copiar para quien la pide)
+        if len(pos) and pos[-1] - pos[0] + 1 == len(pos) and (np.diff(pos) == 1).all():
+            valores = self._valores[pos[0]:pos[-1] + 1]
+        else:
+            valores = self._valores[pos]
+
+        festivos = get_festivos_provincia(provincia, fechas)["Festivo"].to_numpy()
+
+        return pd.DataFrame({
+            "TipoCambio": valores[:, 0],
+            "Petroleo": valores[:, 1],
+            "Festivo": festivos
+        }, index=fechas)
+
+
+# Matriz compartida por el proceso (p.ej. por todos los segmentos de un worker del batch)
+_matriz_actual = None
+_matriz_lock = threading.Lock()
+
+
+def _version_fuentes():
+    return loadRate().version(), version_bret()
+
+
+def get_matriz_exogenas(fechas):
+    """
+    Devuelve una MatrizExogenas que cubre las fechas pedidas. Se reutiliza la del
+    proceso mientras cubra el rango y no hayan cambiado los datos de origen.
+    """
+    global _matriz_actual
+    fechas = pd.to_datetime(fechas)
+    version = _version_fuentes()
+
+    with _matriz_lock:
+        actual = _matriz_actual
+        if actual is not None and actual.version == version and actual.cubre(fechas):
+            return actual
+
+        inicio, fin = fechas.min(), fechas.max()
+        if actual is not None and actual.version == version:
+            # Ampliar el rango en lugar de sustituirlo
+            inicio, fin = min(inicio, actual.fechas[0]), max(fin, actual.fechas[-1])
+
+        _matriz_actual = MatrizExogenas(inicio, fin, version)
+        return _matriz_actual
+
+
+@cache_datos("exogenas", version=_version_fuentes)
+def construir_exogenas(provincia, fechas):
+    """Exógenas limpias y alineadas para un segmento."""
+    return get_matriz_exogenas(fechas).para(provincia, fechas)
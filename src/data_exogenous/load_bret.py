@@ -1,3 +1,6 @@
+import os
+import threading
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from src.utils.file_store import save_parquet
@@ -5,43 +8,93 @@ from pathlib import Path
 
 base_path = f"src/data/metadata"
 
-def getBret():
+# Caché en memoria del parquet de precios base más reciente.
+# - version: mtime del directorio (cambia cuando llega un archivo nuevo)
+# - archivo: parquet cargado
+# - df: datos tal cual (columna Fecha), para getBret
+# - indexado: mismos datos con índice Fecha ordenado y sin duplicados
+_cache = {"version": None, "archivo": None, "df": None, "indexado": None}
+_cache_lock = threading.Lock()
+
+
+def _indexar(df):
+    indexado = df.copy()
+    indexado["Fecha"] = pd.to_datetime(indexado["Fecha"])
+    indexado = indexado.set_index("Fecha").sort_index()
+    return indexado[~indexado.index.duplicated(keep="last")]
+
+
+def _actualizar_cache(df, archivo, version):
+    _cache["df"] = df
+    _cache["indexado"] = _indexar(df)
+    _cache["archivo"] = archivo
+    _cache["version"] = version
+
+
+def _cargar_cache():
+    """
+    Devuelve la caché al día. Solo se vuelve a listar el directorio si su mtime
+    ha cambiado, y solo se relee el parquet si el más reciente es otro.
+    """
     parquet_path = Path(base_path)
     if not parquet_path.exists():
             print(f"❌ Ruta no existe: {parquet_path.resolve()}")
             return None
 
-    parquet_files = sorted(
-        parquet_path.glob("precios_base_*.parquet"),
-        reverse=True
-    )
+    with _cache_lock:
+        version = os.stat(parquet_path).st_mtime_ns
+        if _cache["version"] == version and _cache["df"] is not None:
+            return _cache
 
-    if not parquet_files:
-        print("❌ No se encontraron archivos parquet")
-        return None
-    
-    df= pd.read_parquet(parquet_files[0])
-    df=df.rename(columns={"fecha": "Fecha"})
-    return df
+        parquet_files = sorted(
+            parquet_path.glob("precios_base_*.parquet"),
+            reverse=True
+        )
 
-def get_Bret_for_dates(fechas):
-    df_petroleo = getBret()
+        if not parquet_files:
+            print("❌ No se encontraron archivos parquet")
+            return None
 
-    # Normalizar columnas
-    df_petroleo["Fecha"] = pd.to_datetime(df_petroleo["Fecha"])
+        if _cache["archivo"] == parquet_files[0] and _cache["df"] is not None:
+            _cache["version"] = version
+            return _cache
 
-    df_petroleo = df_petroleo.set_index("Fecha").sort_index()
+        df = pd.read_parquet(parquet_files[0])
+        df = df.rename(columns={"fecha": "Fecha"})
+        _actualizar_cache(df, parquet_files[0], version)
+        return _cache
 
-    fechas = pd.to_datetime(fechas)
-    df_fechas = pd.DataFrame(index=fechas)
 
-    # Unir con el dataset de petróleo
-    merged = df_fechas.join(df_petroleo, how="left")
+def version_bret():
+    """Identificador del parquet de precios base vigente (cambia al cargar uno nuevo)."""
+    cache = _cargar_cache()
+    return None if cache is None else str(cache["archivo"])
+
 
-    # Rellenar huecos
-    merged = merged.ffill().bfill()
+def getBret():
+    cache = _cargar_cache()
+    if cache is None:
+        return None
+    return cache["df"].copy()
 
-    return merged
+def get_Bret_for_dates(fechas):
+    cache = _cargar_cache()
+    if cache is None:
+        raise FileNotFoundError("No hay precios base (EIA) cargados.")
+
+    df_petroleo = cache["indexado"]
+    fechas = pd.to_datetime(fechas)
+
+    # Última cotización disponible en o antes de cada fecha (ffill);
+    # las fechas anteriores al primer dato toman el primero (bfill)
+    pos = df_petroleo.index.get_indexer(fechas, method="ffill")
+    pos = np.where(pos < 0, 0, pos)
+
+    return pd.DataFrame(
+        df_petroleo.to_numpy()[pos],
+        index=fechas,
+        columns=df_petroleo.columns
+    )
 
 def loadBret(uploaded_file):
     if uploaded_file is not None:
@@ -101,4 +154,12 @@ def loadBret(uploaded_file):
         
         save_parquet(df_final, base_path + "/" + parquet_name)
 
+        # Invalidar la caché con los datos recién cargados
+        with _cache_lock:
+            _actualizar_cache(
+                df_final.copy(),
+                Path(base_path) / parquet_name,
+                os.stat(base_path).st_mtime_ns
+            )
+
         return df_final
\ No newline at end of file
@@ -1,19 +1,108 @@
+import json
+import os
+import threading
+import numpy as np
 import pandas as pd
 import holidays
 from src.utils.province_subdiv_map import PROVINCIA_TO_SUBDIV
+from src.utils.config import FESTIVOS_PATH, FESTIVOS_INICIO, FESTIVOS_FIN
+
+# Columna de la matriz con los festivos solo nacionales
+NACIONAL = "ES"
+
+# Matriz de festivos precalculada: una fila por día entre FESTIVOS_INICIO y
+# FESTIVOS_FIN y una columna por subdivisión (uint8). Se guarda en disco y se
+# abre como memory-map, así que todos los procesos comparten las mismas páginas.
+_matriz = {"inicio": None, "columnas": None, "datos": None}
+_matriz_lock = threading.Lock()
+
+
+def _columnas():
+    # Las provincias de una misma comunidad comparten columna
+    return [NACIONAL] + sorted(set(PROVINCIA_TO_SUBDIV.values()))
+
+
+def _ruta_matriz():
+    # La versión de holidays forma parte del nombre: al actualizarla se regenera
+    return f"{FESTIVOS_PATH}_{FESTIVOS_INICIO}_{FESTIVOS_FIN}_{holidays.__version__}.npy"
+
+
+def _construir_matriz(fechas, columnas):
+    """Calcula la matriz de festivos (fechas × columnas) con la librería holidays."""
+    matriz = np.zeros((len(fechas), len(columnas)), dtype=np.uint8)
+    years = range(fechas[0].year, fechas[-1].year + 1)
+
+    for j, subdiv in enumerate(columnas):
+        if subdiv == NACIONAL:
+            calendario = holidays.Spain(years=years)
+        else:
+            calendario = holidays.Spain(subdiv=subdiv, years=years)
+
+        pos = fechas.get_indexer(pd.DatetimeIndex(list(calendario.keys())))
+        matriz[pos[pos >= 0], j] = 1
+
+    return matriz
+
+
+def _cargar_matriz():
+    """Abre la matriz de festivos, calculándola y guardándola la primera vez."""
+    with _matriz_lock:
+        if _matriz["datos"] is not None:
+            return _matriz
+
+        inicio = pd.Timestamp(FESTIVOS_INICIO)
+        columnas = _columnas()
+        ruta = _ruta_matriz()
+        ruta_columnas = ruta.replace(".npy", ".json")
+
+        guardadas = None
+        if os.path.exists(ruta) and os.path.exists(ruta_columnas):
+            with open(ruta_columnas, "r") as f:
+                guardadas = json.load(f)
+
+        if guardadas != columnas:
+            fechas = pd.date_range(FESTIVOS_INICIO, FESTIVOS_FIN, freq="D")
+            matriz = _construir_matriz(fechas, columnas)
+
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            tmp = f"{ruta}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, matriz)
+            os.replace(tmp, ruta)
+            tmp = f"{ruta_columnas}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(columnas, f)
+            os.replace(tmp, ruta_columnas)
+
+        _matriz["inicio"] = inicio
+        _matriz["columnas"] = columnas
+        _matriz["datos"] = np.load(ruta, mmap_mode="r")
+        return _matriz
+
 
 def get_festivos_provincia(provincia, fechas):
     subdiv = PROVINCIA_TO_SUBDIV.get(provincia)
+    fechas = pd.to_datetime(fechas)
+
+    matriz = _cargar_matriz()
+    datos = matriz["datos"]
 
     # Si no existe, usar solo festivos nacionales
-    if subdiv:
-        spain_holidays = holidays.Spain(subdiv=subdiv)
-    else:
-        spain_holidays = holidays.Spain()
+    col = matriz["columnas"].index(subdiv if subdiv else NACIONAL)
 
-    fechas = pd.to_datetime(fechas)
+    # Posición de cada fecha en la matriz (días desde el inicio)
+    dias = (fechas.normalize() - matriz["inicio"]).days.to_numpy()
+    dentro = (dias >= 0) & (dias < datos.shape[0])
 
-    festivos = [1 if f in spain_holidays else 0 for f in fechas]
+    festivos = np.zeros(len(fechas), dtype=np.int64)
+    festivos[dentro] = datos[dias[dentro], col]
 
-    return pd.DataFrame({"Festivo": festivos}, index=fechas)
+    # Fechas fuera del rango precalculado: se calculan con la librería
+    if not dentro.all():
+        if subdiv:
+            spain_holidays = holidays.Spain(subdiv=subdiv)
+        else:
+            spain_holidays = holidays.Spain()
+        festivos[~dentro] = [1 if f in spain_holidays else 0 for f in fechas[~dentro]]
 
+    return pd.DataFrame({"Festivo": festivos}, index=fechas)
@@ -1,20 +1,46 @@
+import os
+import threading
+import time
 import pandas as pd
 import requests
 from io import StringIO
+from src.utils.config import RATE_PATH, RATE_TTL_SECONDS, RATE_TIMEOUT
 
 class loadRate:
     """
     Clase para cargar el tipo de cambio EUR→USD desde la API del Banco Central Europeo.
+
+    Los datos se guardan en un parquet local y en una copia en memoria compartida
+    por todo el proceso. Solo se consulta la API cuando la copia tiene más de `ttl`
+    segundos, y entonces se piden únicamente los días posteriores al último guardado.
+    Si la API no responde (o devuelve algo que no se puede leer) se siguen usando
+    los datos guardados.
     """
 
     URL = "https://data-api.ecb.europa.eu/service/data/EXR/D.USD.EUR.SP00.A?format=csvdata"
 
-    def __init__(self):
+    # Copia en memoria compartida por todas las instancias del proceso
+    _df_compartido = None
+    _cargado_en = 0.0
+    # Se incrementa cada vez que se sustituye la copia compartida
+    _version = 0
+    _lock = threading.Lock()
+
+    def __init__(self, url=None, ruta=RATE_PATH, ttl=RATE_TTL_SECONDS, timeout=RATE_TIMEOUT):
+        self.url = url or self.URL
+        self.ruta = ruta
+        self.ttl = ttl
+        self.timeout = timeout
         self.df = None
 
-    def load(self):
-        """Descarga y carga el CSV desde la API."""
-        response = requests.get(self.URL)
+    def _descargar(self, desde=None):
+        """Descarga el CSV desde la API (solo desde la fecha indicada, si se da)."""
+        params = {"startPeriod": desde.strftime("%Y-%m-%d")} if desde is not None else None
+        response = requests.get(self.url, params=params, timeout=self.timeout)
+
+        # El BCE responde 404 cuando no hay observaciones en el periodo pedido
+        if response.status_code == 404 and desde is not None:
+            return pd.DataFrame(columns=["TipoCambio"], index=pd.DatetimeIndex([], name="Fecha"))
         response.raise_for_status()
 
         csv_data = StringIO(response.text)
@@ -27,10 +53,70 @@ class loadRate:
             "OBS_VALUE": "TipoCambio"
         })
 
-        df = df.set_index("Fecha").sort_index()
+        return df.set_index("Fecha").sort_index()[["TipoCambio"]]
+
+    def _leer_local(self):
+        if not os.path.exists(self.ruta):
+            return None
+        return pd.read_parquet(self.ruta)
+
+    def _guardar_local(self, df):
+        os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+        tmp = f"{self.ruta}.{os.getpid()}.tmp"
+        df.to_parquet(tmp)
+        os.replace(tmp, self.ruta)
+
+    def load(self, forzar=False):
+        """
+        Devuelve el histórico del tipo de cambio (índice Fecha, columna TipoCambio).
+        - forzar: consulta la API aunque la copia local esté al día
+        """
+        cls = type(self)
+        with cls._lock:
+            ahora = time.time()
+
+            # 1) Copia en memoria al día
+            if not forzar and cls._df_compartido is not None and ahora - cls._cargado_en < self.ttl:
+                self.df = cls._df_compartido
+                return self.df
+
+            # 2) Copia en disco al día (p.ej. refrescada por otro proceso)
+            df_local = self._leer_local()
+            if df_local is not None and not forzar:
+                mtime = os.path.getmtime(self.ruta)
+                if ahora - mtime < self.ttl:
+                    cls._df_compartido, cls._cargado_en = df_local, mtime
+                    cls._version += 1
+                    self.df = df_local
+                    return self.df
+
+            # 3) Refresco incremental desde la API
+            try:
+                if df_local is None or df_local.empty:
+                    df = self._descargar()
+                else:
+                    ultimo = df_local.index.max()
+                    nuevos = self._descargar(desde=ultimo + pd.Timedelta(days=1))
+                    df = pd.concat([df_local, nuevos])
+                    df = df[~df.index.duplicated(keep="last")].sort_index()
+                self._guardar_local(df)
+            except (requests.RequestException, ValueError, KeyError, pd.errors.ParserError) as e:
+                if df_local is None:
+                    raise
+                # Sin conexión o respuesta ilegible: se usan los datos guardados
+                # y se reintenta tras el TTL
+                print(f"⚠️ No se pudo actualizar el tipo de cambio ({e}); usando copia local.")
+                df = df_local
+
+            cls._df_compartido, cls._cargado_en = df, ahora
+            cls._version += 1
+            self.df = df
+            return df
 
-        self.df = df
-        return df
+    def version(self):
+        """Contador de refrescos de la copia compartida (cambia cuando cambian los datos)."""
+        self.load()
+        return type(self)._version
 
     def get_rate_for_dates(self, fechas):
         """
@@ -50,4 +136,4 @@ class loadRate:
         # Rellenar huecos (ECB no publica fines de semana)
         merged["TipoCambio"] = merged["TipoCambio"].ffill().bfill()
 
-        return merged
\ No newline at end of file
+        return merged
@@ -0,0 +1,225 @@
+# catalog.py
+#
+# Catálogo de segmentos (SQLite en modo WAL): una fila por provincia / producto
+# con el resumen de sus datos y qué artefactos tiene construidos. Lo actualizan
+# la ingesta (guardar_precios, en una sola transacción por escritura) y los
+# constructores de artefactos (marcar_construido), y las vistas lo leen en vez
+# de recorrer src/data/segmented con os.listdir.
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from src.utils.config import CATALOG_DB_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    provincia       TEXT NOT NULL,
+    producto        TEXT NOT NULL,
+    filas           INTEGER NOT NULL DEFAULT 0,
+    fecha_inicio    TEXT,
+    fecha_fin       TEXT,
+    version         INTEGER,            -- último lote del almacén que tocó el segmento
+    solapado        INTEGER NOT NULL DEFAULT 0, -- alguna ingesta no fue solo de fechas nuevas al final
+    ingested_at     REAL,
+    has_stationary  INTEGER NOT NULL DEFAULT 0,
+    has_metadata    INTEGER NOT NULL DEFAULT 0,
+    has_model       INTEGER NOT NULL DEFAULT 0,
+    has_prediction  INTEGER NOT NULL DEFAULT 0,
+    modelo_elegido  TEXT,               -- modelo elegido por la selección del batch
+    modelo_mae      REAL,               -- MAE de su backtest
+    PRIMARY KEY (provincia, producto)
+);
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    id      INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL            -- se incrementa en cada escritura
+);
+INSERT OR IGNORE INTO catalog_meta (id, version) VALUES (1, 0);
+"""
+
+# artefacto (nombres de dependencies.ARTEFACTOS) -> columna del catálogo
+COLUMNAS_ARTEFACTO = {
+    "stationary": "has_stationary",
+    "metadata": "has_metadata",
+    "model": "has_model",
+    "prediccion": "has_prediction",
+}
+
+COLUMNAS = (
+    "provincia", "producto", "filas", "fecha_inicio", "fecha_fin", "version", "solapado", "ingested_at",
+    "has_stationary", "has_metadata", "has_model", "has_prediction",
+    "modelo_elegido", "modelo_mae",
+)
+
+_inicializado = False
+
+# Copia en memoria del catálogo; solo se vuelve a leer si cambia catalog_meta.version
+_cache = {"version": None, "segmentos": None}
+_cache_lock = threading.Lock()
+
+
+@contextmanager
+def get_connection():
+    """Conexión al catálogo; las escrituras abren BEGIN IMMEDIATE explícitamente."""
+    conn = sqlite3.connect(CATALOG_DB_PATH, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA synchronous=NORMAL")
+        yield conn
+    finally:
+        conn.close()
+
+
+def init_catalogo():
+    global _inicializado
+    if _inicializado and os.path.exists(CATALOG_DB_PATH):
+        return
+
+    os.makedirs(os.path.dirname(CATALOG_DB_PATH), exist_ok=True)
+    with get_connection() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+    _inicializado = True
+
+
+def _incrementar_version(conn):
+    conn.execute("UPDATE catalog_meta SET version = version + 1 WHERE id = 1")
+
+
+def registrar_ingesta(registros):
+    """
+    Guarda en una única transacción el resumen de datos de varios segmentos.
+    registros: dicts con provincia, producto, filas, fecha_inicio, fecha_fin, version
+    y solapado (opcional).
+    Los indicadores de artefactos de los segmentos que ya existían se conservan, y
+    solapado solo se activa: lo desactiva la compactación (marcar_compactado).
+    """
+    init_catalogo()
+    ahora = time.time()
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT INTO segments (provincia, producto, filas, fecha_inicio, fecha_fin, version, solapado, ingested_at) "
+            "VALUES (:provincia, :producto, :filas, :fecha_inicio, :fecha_fin, :version, :solapado, :ingested_at) "
+            "ON CONFLICT (provincia, producto) DO UPDATE SET "
+            "filas = excluded.filas, fecha_inicio = excluded.fecha_inicio, fecha_fin = excluded.fecha_fin, "
+            "version = excluded.version, solapado = MAX(solapado, excluded.solapado), "
+            "ingested_at = excluded.ingested_at",
+            [
+                dict(r, solapado=int(r.get("solapado", 0)), ingested_at=r.get("ingested_at", ahora))
+                for r in registros
+            ]
+        )
+        _incrementar_version(conn)
+        conn.execute("COMMIT")
+
+
+def marcar_compactado(producto):
+    """Quita la marca de solapado a los segmentos del producto (sus particiones ya tienen un solo archivo)."""
+    init_catalogo()
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        cur = conn.execute(
+            "UPDATE segments SET solapado = 0 WHERE producto = ? AND solapado = 1", (producto,)
+        )
+        if cur.rowcount:
+            _incrementar_version(conn)
+        conn.execute("COMMIT")
+
+
+def marcar_artefacto(provincia, producto, nombre, existe=True):
+    """Actualiza el indicador del artefacto (stationary, metadata, model, prediccion)."""
+    columna = COLUMNAS_ARTEFACTO.get(nombre)
+    if columna is None:
+        return
+    init_catalogo()
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        cur = conn.execute(
+            f"UPDATE segments SET {columna} = ? WHERE provincia = ? AND producto = ?",
+            (int(existe), provincia, producto)
+        )
+        if cur.rowcount:
+            _incrementar_version(conn)
+        conn.execute("COMMIT")
+
+
+def registrar_modelo_elegido(provincia, producto, modelo, mae):
+    """Guarda el modelo elegido para el segmento y el MAE de su backtest."""
+    init_catalogo()
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        cur = conn.execute(
+            "UPDATE segments SET modelo_elegido = ?, modelo_mae = ? WHERE provincia = ? AND producto = ?",
+            (modelo, mae, provincia, producto)
+        )
+        if cur.rowcount:
+            _incrementar_version(conn)
+        conn.execute("COMMIT")
+
+
+def info_segmento(provincia, producto):
+    """Fila del catálogo del segmento como dict (o None)."""
+    init_catalogo()
+    with get_connection() as conn:
+        row = conn.execute(
+            f"SELECT {', '.join(COLUMNAS)} FROM segments WHERE provincia = ? AND producto = ?",
+            (provincia, producto)
+        ).fetchone()
+    return dict(zip(COLUMNAS, row)) if row else None
+
+
+def catalogo_vacio():
+    init_catalogo()
+    with get_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0] == 0
+
+
+def listar_segmentos():
+    """
+    Todas las filas del catálogo (lista de dicts ordenada por provincia y producto).
+    Se sirven desde memoria mientras nadie haya escrito en el catálogo: en cada
+    llamada solo se consulta el contador de versión.
+    """
+    init_catalogo()
+    with get_connection() as conn:
+        version = conn.execute("SELECT version FROM catalog_meta WHERE id = 1").fetchone()[0]
+        with _cache_lock:
+            if _cache["version"] == version:
+                return _cache["segmentos"]
+
+        rows = conn.execute(
+            f"SELECT {', '.join(COLUMNAS)} FROM segments ORDER BY provincia, producto"
+        ).fetchall()
+
+    segmentos = [dict(zip(COLUMNAS, r)) for r in rows]
+    with _cache_lock:
+        _cache["version"] = version
+        _cache["segmentos"] = segmentos
+    return segmentos
+
+
+def sincronizar_artefactos():
+    """
+    Recalcula los indicadores de artefactos mirando los archivos de cada segmento.
+    Solo hace falta al crear el catálogo a partir de datos que ya existían.
+    """
+    from src.utils.dependencies import ruta_artefacto
+
+    init_catalogo()
+    filas = []
+    for seg in listar_segmentos():
+        filas.append(tuple(
+            int(os.path.exists(ruta_artefacto(seg["provincia"], seg["producto"], nombre)))
+            for nombre in COLUMNAS_ARTEFACTO
+        ) + (seg["provincia"], seg["producto"]))
+
+    asignaciones = ", ".join(f"{c} = ?" for c in COLUMNAS_ARTEFACTO.values())
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            f"UPDATE segments SET {asignaciones} WHERE provincia = ? AND producto = ?",
+            filas
+        )
+        _incrementar_version(conn)
+        conn.execute("COMMIT")
@@ -1,21 +1,36 @@
 import pandas as pd
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+COLUMNA_FECHA = "Fecha Precio"
+COLUMNA_PRECIO = "Promedio de Pvp Diario CUBO €/litro"
 
+def _parsear_fechas(fechas: pd.Series) -> pd.Series:
+    # pandas deduce el formato del primer valor: sin dayfirst, un bloque que
+    # empieza por "01/02/2025" se leería como mes/día y otro que empieza por
+    # "13/02/2025" como día/mes. Con dayfirst todos los bloques coinciden
+    # (las fechas ISO se leen igual).
+    return pd.to_datetime(fechas, dayfirst=True, errors="coerce")
+
+def _renombrar_columnas(df: pd.DataFrame) -> pd.DataFrame:
     # Renombrar columnas para estandarizar
-    if "Fecha Precio" in df.columns:
-        df = df.rename(columns={"Fecha Precio": "Fecha"})
+    if COLUMNA_FECHA in df.columns:
+        df = df.rename(columns={COLUMNA_FECHA: "Fecha"})
     else:
         raise KeyError("No se encontró la columna 'Fecha Precio' en el archivo CSV.")
 
-    if "Promedio de Pvp Diario CUBO €/litro" in df.columns:
-        df = df.rename(columns={"Promedio de Pvp Diario CUBO €/litro": "Precio"})
+    if COLUMNA_PRECIO in df.columns:
+        df = df.rename(columns={COLUMNA_PRECIO: "Precio"})
     else:
         raise KeyError("No se encontró la columna 'Promedio de Pvp Diario CUBO €/litro' en el archivo CSV.")
 
+    return df
+
+def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+
+    df = _renombrar_columnas(df)
+
     # Convertir fecha y establecer como índice
-    df["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce")
+    df["Fecha"] = _parsear_fechas(df["Fecha"])
     df = df.dropna(subset=["Fecha", "Provincia", "Producto"])
 
     # Normalizar valores numéricos
@@ -26,4 +41,25 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
         .astype(float)
     )
 
-    return df
\ No newline at end of file
+    return df
+
+def clean_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Limpieza de un bloque leído con read_csv(decimal=",", chunksize=...).
+    No copia el bloque y el precio ya llega como float; solo se convierte
+    como texto si el bloque trae valores con otro formato.
+    """
+    df = _renombrar_columnas(df)
+
+    df["Fecha"] = _parsear_fechas(df["Fecha"])
+    df = df.dropna(subset=["Fecha", "Provincia", "Producto"])
+
+    if not pd.api.types.is_float_dtype(df["Precio"]):
+        df["Precio"] = (
+            df["Precio"]
+            .astype(str)
+            .str.replace(",", ".")
+            .astype(float)
+        )
+
+    return df[["Fecha", "Provincia", "Producto", "Precio"]]
@@ -1,50 +1,93 @@
 import pandas as pd
-import os
-from src.data_preprocessing.clean import clean_data
-from src.data_preprocessing.segment import segment_by_province_product
-def actualizar_datos(file):
+from src.data_preprocessing.clean import clean_data, clean_chunk, COLUMNA_FECHA, COLUMNA_PRECIO
+from src.data_preprocessing.price_store import guardar_precios, leer_segmento
+from src.utils.config import INGESTA_CHUNKSIZE, INGESTA_BUFFER_FILAS
+from src.utils.cache import cache_datos
+
+COLUMNAS_CSV = (COLUMNA_FECHA, "Provincia", "Producto", COLUMNA_PRECIO)
+
+
+def _normalizar_provincia(provincia):
+    if "/" in provincia:
+        provincia=provincia.split("/")[0]
+    return provincia
+
+
+@cache_datos("segmento", artefactos=("original",))
+def leer_original(provincia, producto, inicio=None, fin=None, columnas=None):
+    """Histórico del segmento (columnas Fecha, Precio, ordenado por Fecha) desde el almacén de precios."""
+    return leer_segmento(provincia, producto, inicio=inicio, fin=fin, columnas=columnas)
+
+
+def actualizar_datos(file, chunksize=None):
+    """
+    Actualiza el histórico de todos los segmentos con un CSV de la CNMC.
+    - chunksize=None: lee el CSV completo y devuelve los datos cargados
+    - chunksize=N: ingesta por bloques de N filas (memoria acotada por el bloque)
+      y devuelve un resumen por segmento
+    """
+    if chunksize is not None:
+        return _actualizar_datos_por_bloques(file, chunksize)
+
     df_csv = pd.read_csv(file, sep=";")
     df = clean_data(df_csv)
 
-    segments = segment_by_province_product(df)
+    nuevos = df[["Provincia", "Producto", "Fecha", "Precio"]].copy()
+    nuevos["Provincia"] = nuevos["Provincia"].map(_normalizar_provincia)
+    guardar_precios(nuevos.sort_values("Fecha", kind="stable"))
+
+    return df
 
-    for (provincia, producto), data in segments.items():
-           
-        if data.empty:
-            continue
 
-        if "/" in provincia:
-            provincia=provincia.split("/")[0]
+def _actualizar_datos_por_bloques(file, chunksize=INGESTA_CHUNKSIZE, buffer_filas=INGESTA_BUFFER_FILAS):
+    """
+    Ingesta en streaming: los bloques del CSV se acumulan hasta `buffer_filas`
+    filas y entonces se escriben en el almacén de precios (un archivo por
+    producto y año), así que la memoria no depende del tamaño del CSV.
+    """
+    reader = pd.read_csv(
+        file,
+        sep=";",
+        chunksize=chunksize,
+        usecols=lambda c: c in COLUMNAS_CSV,
+        dtype={"Provincia": str, "Producto": str},
+        decimal=","
+    )
 
-        ruta = f"src/data/segmented/{provincia}/{producto}/original.parquet"
-        
-        #crear el directorio si no existe
-        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    buffer = []
+    filas_en_buffer = 0
+    resumenes = []
 
-        # Cargar histórico existente o crear uno vacío
-        if os.path.exists(ruta):
-            df_actual = pd.read_parquet(ruta)
-            df_actual["Fecha"] = pd.to_datetime(df_actual["Fecha"])
-            df_actual = df_actual.set_index("Fecha")
-        else:
-            df_actual = pd.DataFrame(columns=["Precio"])
+    def volcar():
+        datos = pd.concat(buffer, ignore_index=True).sort_values("Fecha", kind="stable")
+        resumenes.append(guardar_precios(datos))
+        buffer.clear()
 
-        # Nuevo segmento
-        data = data[["Fecha", "Precio"]].set_index("Fecha")
+    for chunk in reader:
+        chunk = clean_chunk(chunk)
+        chunk["Provincia"] = chunk["Provincia"].map(_normalizar_provincia)
+        buffer.append(chunk)
 
-        # Combinar sin duplicados
-        df_comb = pd.concat([df_actual, data])
-        df_comb = df_comb[~df_comb.index.duplicated(keep="last")].sort_index()
-        
-        df_final = df_comb.reset_index().rename(columns={"index": "Fecha"})
+        filas_en_buffer += len(chunk)
+        if filas_en_buffer >= buffer_filas:
+            volcar()
+            filas_en_buffer = 0
 
-        # Guardar original
-        df_final.to_parquet(ruta, index=False)
+    if buffer:
+        volcar()
 
-    return df
+    columnas = ["Provincia", "Producto", "Filas", "Desde", "Hasta"]
+    if not resumenes:
+        return pd.DataFrame(columns=columnas)
+
+    return (
+        pd.concat(resumenes, ignore_index=True)
+        .groupby(["Provincia", "Producto"], sort=True)
+        .agg(Filas=("Filas", "sum"), Desde=("Desde", "min"), Hasta=("Hasta", "max"))
+        .reset_index()[columnas]
+    )
 
 
-def get_datos(provincia,producto):
-    ruta = f"src/data/segmented/{provincia}/{producto}/original.parquet"
-    df_actual = pd.read_parquet(ruta)
+def get_datos(provincia,producto, inicio=None, fin=None):
+    df_actual = leer_original(provincia, producto, inicio=inicio, fin=fin)
     return df_actual
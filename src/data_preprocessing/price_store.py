@@ -0,0 +1,479 @@
+# price_store.py
+#
+# Almacén único de precios: un dataset parquet particionado por producto y año
+#
+#   src/data/precios/producto=<producto>/anio=<año>/part-<lote>.parquet
+#
+# Cada archivo tiene las columnas Provincia (diccionario), Fecha (timestamp),
+# Precio y Lote (marca de la ingesta que lo escribió). Cada ingesta solo añade
+# archivos nuevos; si una fecha llega varias veces gana la del lote más reciente.
+# Cuando una partición acumula demasiados archivos se compacta en uno solo.
+# Mientras un segmento solo reciba fechas nuevas al final, sus archivos ya se leen
+# en orden y sin repetidos; el catálogo marca como "solapado" el que no, y solo
+# esos se ordenan y depuran al leer.
+#
+# El catálogo de segmentos (catalog.py) guarda por provincia / producto las filas,
+# el rango de fechas y la versión (último lote que lo modificó), para no tener
+# que leer el dataset para saber qué segmentos hay o si han cambiado.
+#
+# Mantenimiento (desde la raíz del proyecto):
+#   python -m src.data_preprocessing.price_store migrar     # importa los original.parquet
+#   python -m src.data_preprocessing.price_store compactar  # un archivo por partición
+
+import argparse
+import glob
+import os
+import threading
+import time
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from src.data_preprocessing import catalog
+from src.utils import cache
+from src.utils.config import PRECIOS_PATH, PRECIOS_MAX_FRAGMENTOS, PRECIOS_ROW_GROUP, SEGMENTED_PATH
+
+ESQUEMA = pa.schema([
+    ("Provincia", pa.dictionary(pa.int32(), pa.string())),
+    ("Fecha", pa.timestamp("ns")),
+    ("Precio", pa.float64()),
+    ("Lote", pa.int64()),
+])
+
+PARTICIONES = pa.schema([
+    ("producto", pa.string()),
+    ("anio", pa.int32()),
+])
+
+FRAGMENTO_PATTERN = "part-*.parquet"
+
+# Las escrituras (ingesta, compactación, catálogo) se hacen de una en una
+_lock = threading.RLock()
+
+# La comprobación del catálogo frente al almacén se hace una vez por proceso
+_catalogo_comprobado = False
+
+# Histórico por segmento anterior al almacén (se importa con migrar_segmentos)
+ORIGINAL_PATTERN = os.path.join("*", "*", "original.parquet")
+SUFIJO_MIGRADO = ".migrated"
+
+
+def _ruta_particion(producto, anio):
+    return os.path.join(PRECIOS_PATH, f"producto={producto}", f"anio={int(anio)}")
+
+
+def _fragmentos(ruta_particion):
+    return sorted(glob.glob(os.path.join(ruta_particion, FRAGMENTO_PATTERN)))
+
+
+def _particiones_compactas(producto):
+    """True si todas las particiones del producto tienen como mucho un archivo."""
+    rutas = glob.glob(os.path.join(PRECIOS_PATH, f"producto={producto}", "anio=*"))
+    return all(len(_fragmentos(r)) <= 1 for r in rutas)
+
+
+def _nuevo_lote():
+    """Marca creciente de cada escritura (microsegundos)."""
+    return time.time_ns() // 1000
+
+
+# ---------------------------------------------------------------------
+# Resumen por segmento (catálogo)
+# ---------------------------------------------------------------------
+
+def info_segmento(provincia, producto):
+    """Fila del catálogo del segmento (o None si no tiene datos)."""
+    _comprobar_catalogo()
+    return catalog.info_segmento(provincia, producto)
+
+
+def huella_segmento(provincia, producto):
+    """Huella de los datos del segmento (cambia con cada ingesta que lo toca) o None."""
+    info = info_segmento(provincia, producto)
+    if info is None:
+        return None
+    return f"{info['version']}-{info['filas']}"
+
+
+def segmentos():
+    """Lista de (provincia, producto) con datos en el almacén."""
+    _comprobar_catalogo()
+    return [(s["provincia"], s["producto"]) for s in catalog.listar_segmentos()]
+
+
+# ---------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------
+
+def _dataset(producto=None):
+    """Dataset completo o, si se indica producto, solo sus particiones (menos archivos que listar)."""
+    if producto is None:
+        raiz, particiones = PRECIOS_PATH, PARTICIONES
+    else:
+        raiz, particiones = os.path.join(PRECIOS_PATH, f"producto={producto}"), pa.schema([PARTICIONES.field("anio")])
+    return ds.dataset(
+        raiz,
+        schema=pa.unify_schemas([ESQUEMA, particiones]),
+        format="parquet",
+        partitioning=ds.HivePartitioning(particiones, segment_encoding="none"),
+    )
+
+
+def _filtro(provincias=None, productos=None, inicio=None, fin=None):
+    """Expresión de filtro: poda particiones (producto, año) y row groups (provincia, fecha)."""
+    condiciones = []
+    if productos is not None:
+        condiciones.append(ds.field("producto").isin(list(productos)))
+    if provincias is not None:
+        condiciones.append(ds.field("Provincia").isin(list(provincias)))
+    if inicio is not None:
+        inicio = pd.Timestamp(inicio)
+        condiciones.append(ds.field("anio") >= inicio.year)
+        condiciones.append(ds.field("Fecha") >= pa.scalar(inicio, pa.timestamp("ns")))
+    if fin is not None:
+        fin = pd.Timestamp(fin)
+        condiciones.append(ds.field("anio") <= fin.year)
+        condiciones.append(ds.field("Fecha") <= pa.scalar(fin, pa.timestamp("ns")))
+
+    filtro = None
+    for c in condiciones:
+        filtro = c if filtro is None else filtro & c
+    return filtro
+
+
+def _leer_tabla(dataset_fn, filtro, columnas):
+    """Lee del dataset reintentando una vez si una compactación borró algún archivo a mitad."""
+    try:
+        return dataset_fn().to_table(filter=filtro, columns=columnas)
+    except (FileNotFoundError, OSError):
+        return dataset_fn().to_table(filter=filtro, columns=columnas)
+
+
+def leer_precios(provincias=None, productos=None, inicio=None, fin=None):
+    """
+    Lee precios de varios segmentos de una vez.
+    Devuelve Provincia, Producto, Fecha, Precio ordenado por segmento y fecha,
+    con Provincia y Producto como categorías.
+    """
+    _comprobar_catalogo()
+    columnas = ["Provincia", "producto", "Fecha", "Precio", "Lote"]
+    if not os.path.isdir(PRECIOS_PATH):
+        return pd.DataFrame(columns=["Provincia", "Producto", "Fecha", "Precio"])
+
+    tabla = _leer_tabla(_dataset, _filtro(provincias, productos, inicio, fin), columnas)
+    df = tabla.to_pandas().rename(columns={"producto": "Producto"})
+    df["Producto"] = df["Producto"].astype("category")
+
+    df = df.sort_values(["Producto", "Provincia", "Fecha", "Lote"], kind="stable")
+    df = df.drop_duplicates(["Producto", "Provincia", "Fecha"], keep="last")
+    return df.drop(columns="Lote").reset_index(drop=True)
+
+
+def leer_segmento(provincia, producto, inicio=None, fin=None, columnas=None):
+    """
+    Histórico de un segmento ordenado por fecha.
+    - inicio / fin: rango de fechas (incluido); solo se leen las particiones de
+      esos años y los row groups cuyas estadísticas lo solapan
+    - columnas: subconjunto de ("Fecha", "Precio"); por defecto ambas
+    Fecha se devuelve ya como datetime64 (no hace falta pd.to_datetime).
+    """
+    _comprobar_catalogo()
+    if not os.path.isdir(os.path.join(PRECIOS_PATH, f"producto={producto}")):
+        raise FileNotFoundError(f"No hay datos para {provincia} / {producto}")
+
+    columnas = list(columnas) if columnas is not None else ["Fecha", "Precio"]
+    # Fecha y Lote hacen falta siempre para quitar las fechas repetidas
+    leidas = ["Fecha", "Lote"] + [c for c in columnas if c != "Fecha"]
+    info = catalog.info_segmento(provincia, producto)
+    solapado = info is None or bool(info["solapado"])
+
+    tabla = _leer_tabla(
+        lambda: _dataset(producto),
+        _filtro(provincias=[provincia], inicio=inicio, fin=fin),
+        leidas
+    )
+    if tabla.num_rows == 0 and inicio is None and fin is None:
+        raise FileNotFoundError(f"No hay datos para {provincia} / {producto}")
+
+    df = tabla.to_pandas()
+    # Los archivos se leen en orden de año y de lote: sin solape las fechas ya
+    # salen crecientes y sin repetir. Se comprueba igualmente (O(n)) por si el
+    # catálogo aún no refleja una ingesta concurrente.
+    if solapado or not (np.diff(df["Fecha"].to_numpy()) > np.timedelta64(0)).all():
+        df = df.sort_values(["Fecha", "Lote"], kind="stable").drop_duplicates("Fecha", keep="last")
+    return df[columnas].reset_index(drop=True)
+
+
+def ultimo_precio(provincia, producto):
+    """
+    (fecha, precio) del último dato del segmento. Con el catálogo solo se lee
+    el día final (una partición y un row group), no el histórico completo.
+    """
+    info = info_segmento(provincia, producto)
+    df = leer_segmento(provincia, producto, inicio=info["fecha_fin"] if info else None)
+    if df.empty:
+        # Catálogo desfasado respecto a los archivos: se lee el segmento entero
+        df = leer_segmento(provincia, producto)
+    return df["Fecha"].iloc[-1], df["Precio"].iloc[-1]
+
+
+# ---------------------------------------------------------------------
+# Escritura
+# ---------------------------------------------------------------------
+
+def _escribir_fragmento(ruta_particion, df, lote):
+    """Escribe un archivo de la partición (primero a un temporal oculto, luego rename)."""
+    os.makedirs(ruta_particion, exist_ok=True)
+    df = df.sort_values(["Provincia", "Fecha"], kind="stable")
+    tabla = pa.Table.from_pandas(
+        df[["Provincia", "Fecha", "Precio"]].assign(Lote=lote),
+        schema=ESQUEMA,
+        preserve_index=False
+    )
+    ruta = os.path.join(ruta_particion, f"part-{lote}.parquet")
+    # Los nombres que empiezan por "." los ignora el dataset
+    tmp = os.path.join(ruta_particion, f".part-{lote}.tmp")
+    pq.write_table(tabla, tmp, row_group_size=PRECIOS_ROW_GROUP)
+    os.replace(tmp, ruta)
+    return ruta
+
+
+def guardar_precios(df):
+    """
+    Añade al almacén un DataFrame con Provincia, Producto, Fecha, Precio.
+    Solo escribe archivos nuevos (uno por producto y año) y actualiza el catálogo
+    de todos los segmentos tocados en una sola transacción.
+    Si todos los datos de un segmento son posteriores a su última fecha, su resumen
+    se actualiza sin leer nada; si se solapan con el histórico se recuentan sus filas
+    y el segmento queda marcado como solapado hasta que se compacten sus particiones.
+    Devuelve el resumen por segmento (Provincia, Producto, Filas, Desde, Hasta).
+    """
+    columnas_resumen = ["Provincia", "Producto", "Filas", "Desde", "Hasta"]
+    if df.empty:
+        return pd.DataFrame(columns=columnas_resumen)
+
+    df = df[["Provincia", "Producto", "Fecha", "Precio"]].copy()
+    df["Fecha"] = pd.to_datetime(df["Fecha"])
+    df = df.drop_duplicates(["Provincia", "Producto", "Fecha"], keep="last")
+
+    with _lock:
+        _comprobar_catalogo()
+        lote = _nuevo_lote()
+        tocadas = set()
+
+        for (producto, anio), grupo in df.groupby([df["Producto"], df["Fecha"].dt.year], sort=False):
+            ruta_particion = _ruta_particion(producto, anio)
+            _escribir_fragmento(ruta_particion, grupo, lote)
+            tocadas.add(ruta_particion)
+
+        resumen = (
+            df.groupby(["Provincia", "Producto"], sort=True)["Fecha"]
+            .agg(Filas="size", Desde="min", Hasta="max")
+            .reset_index()
+        )
+
+        actuales = {(s["provincia"], s["producto"]): s for s in catalog.listar_segmentos()}
+        registros = []
+        for fila in resumen.itertuples(index=False):
+            actual = actuales.get((fila.Provincia, fila.Producto))
+
+            solapado = False
+            if actual is None:
+                filas, inicio, fin = fila.Filas, fila.Desde, fila.Hasta
+            elif fila.Desde > pd.Timestamp(actual["fecha_fin"]):
+                # Camino rápido: solo fechas nuevas al final
+                filas, inicio, fin = actual["filas"] + fila.Filas, pd.Timestamp(actual["fecha_inicio"]), fila.Hasta
+            else:
+                fechas = leer_segmento(fila.Provincia, fila.Producto, columnas=["Fecha"])["Fecha"]
+                filas, inicio, fin = len(fechas), fechas.iloc[0], fechas.iloc[-1]
+                solapado = True
+
+            registros.append({
+                "provincia": fila.Provincia,
+                "producto": fila.Producto,
+                "filas": int(filas),
+                "fecha_inicio": str(inicio.date()),
+                "fecha_fin": str(fin.date()),
+                "version": lote,
+                "solapado": solapado,
+            })
+
+            # Los artefactos derivados (stationary, modelos...) siguen guardándose por segmento
+            os.makedirs(os.path.join(SEGMENTED_PATH, fila.Provincia, fila.Producto), exist_ok=True)
+
+        catalog.registrar_ingesta(registros)
+        for r in registros:
+            cache.invalidar(r["provincia"], r["producto"])
+
+        for ruta_particion in tocadas:
+            if len(_fragmentos(ruta_particion)) > PRECIOS_MAX_FRAGMENTOS:
+                _compactar_particion(ruta_particion)
+
+    return resumen[columnas_resumen]
+
+
+def _compactar_particion(ruta_particion):
+    """
+    Combina todos los archivos de una partición en uno (gana el lote más reciente).
+    Cuando todas las particiones del producto quedan con un solo archivo, sus
+    segmentos dejan de estar marcados como solapados.
+    """
+    with _lock:
+        fragmentos = _fragmentos(ruta_particion)
+        if len(fragmentos) > 1:
+            _combinar_fragmentos(ruta_particion, fragmentos)
+
+        producto = os.path.basename(os.path.dirname(ruta_particion)).split("=", 1)[1]
+        if _particiones_compactas(producto):
+            catalog.marcar_compactado(producto)
+
+
+def _combinar_fragmentos(ruta_particion, fragmentos):
+    df = pd.concat(
+        [pq.read_table(f, schema=ESQUEMA).to_pandas() for f in fragmentos],
+        ignore_index=True
+    )
+    df = df.sort_values(["Provincia", "Fecha", "Lote"], kind="stable")
+    df = df.drop_duplicates(["Provincia", "Fecha"], keep="last")
+
+    # El nuevo archivo se escribe antes de borrar los antiguos: un lector
+    # concurrente ve como mucho filas repetidas, que se descartan al leer
+    _escribir_fragmento(ruta_particion, df, _nuevo_lote())
+    for f in fragmentos:
+        os.remove(f)
+
+
+def compactar(productos=None):
+    """Compacta las particiones (de los productos indicados o de todos) con más de un archivo."""
+    if productos is None:
+        rutas_producto = glob.glob(os.path.join(PRECIOS_PATH, "producto=*"))
+    else:
+        rutas_producto = [os.path.join(PRECIOS_PATH, f"producto={p}") for p in productos]
+
+    for ruta_producto in rutas_producto:
+        for ruta_particion in glob.glob(os.path.join(ruta_producto, "anio=*")):
+            _compactar_particion(ruta_particion)
+
+
+# ---------------------------------------------------------------------
+# Catálogo y migración desde los original.parquet por segmento
+# ---------------------------------------------------------------------
+
+def _comprobar_catalogo():
+    """
+    Una vez por proceso: si hay datos en el almacén pero el catálogo está vacío
+    (p.ej. se borró la base de datos), se reconstruye. No modifica ningún archivo
+    de datos; la importación de los original.parquet es un paso aparte
+    (migrar_segmentos).
+    """
+    global _catalogo_comprobado
+    if _catalogo_comprobado:
+        return
+    with _lock:
+        if _catalogo_comprobado:
+            return
+        _catalogo_comprobado = True
+
+        if glob.glob(os.path.join(PRECIOS_PATH, "producto=*")) and catalog.catalogo_vacio():
+            reconstruir_catalogo()
+
+
+def reconstruir_catalogo():
+    """Rehace el resumen de todos los segmentos del catálogo leyendo el almacén completo."""
+    with _lock:
+        df = leer_precios()
+        resumen = (
+            df.groupby(["Provincia", "Producto"], observed=True)["Fecha"]
+            .agg(filas="size", inicio="min", fin="max")
+            .reset_index()
+        )
+        lote = _nuevo_lote()
+        catalog.registrar_ingesta([
+            {
+                "provincia": str(r.Provincia),
+                "producto": str(r.Producto),
+                "filas": int(r.filas),
+                "fecha_inicio": str(r.inicio.date()),
+                "fecha_fin": str(r.fin.date()),
+                "version": lote,
+                "solapado": not _particiones_compactas(r.Producto),
+            }
+            for r in resumen.itertuples(index=False)
+        ])
+        catalog.sincronizar_artefactos()
+
+
+def segmentos_sin_migrar():
+    """Rutas de los original.parquet por segmento que aún no se han importado al almacén."""
+    return sorted(glob.glob(os.path.join(SEGMENTED_PATH, ORIGINAL_PATTERN)))
+
+
+@contextmanager
+def _bloqueo_migracion():
+    """
+    Bloqueo entre procesos (flock sobre un archivo junto al almacén) para que
+    dos procesos no importen a la vez. Si el sistema no tiene fcntl solo se
+    bloquea entre hilos del mismo proceso.
+    """
+    os.makedirs(PRECIOS_PATH, exist_ok=True)
+    with _lock, open(os.path.join(PRECIOS_PATH, ".migracion.lock"), "w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def migrar_segmentos():
+    """
+    Importa al almacén el histórico por segmento (original.parquet). Cada archivo
+    importado se renombra a original.parquet.migrated (no se borra), así que
+    volver a ejecutarla no hace nada. Devuelve el número de segmentos importados.
+    """
+    with _bloqueo_migracion():
+        # La lista se toma ya con el bloqueo: otro proceso puede haberlos importado
+        archivos = segmentos_sin_migrar()
+        partes = []
+        for ruta in archivos:
+            base = os.path.dirname(ruta)
+            producto = os.path.basename(base)
+            provincia = os.path.basename(os.path.dirname(base))
+            partes.append(pd.read_parquet(ruta, columns=["Fecha", "Precio"]).assign(
+                Provincia=provincia, Producto=producto
+            ))
+
+        if partes:
+            guardar_precios(pd.concat(partes, ignore_index=True))
+            catalog.sincronizar_artefactos()
+
+        # Solo después de guardar: si falla a mitad, se reimporta todo (gana el último lote)
+        for archivo in archivos:
+            os.replace(archivo, archivo + SUFIJO_MIGRADO)
+    return len(archivos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mantenimiento del almacén de precios.")
+    parser.add_argument(
+        "accion", choices=["migrar", "compactar"],
+        help="migrar: importa los original.parquet por segmento; compactar: un archivo por partición"
+    )
+    args = parser.parse_args(argv)
+
+    if args.accion == "migrar":
+        print(f"Segmentos importados: {migrar_segmentos()}")
+    else:
+        compactar()
+        print("Particiones compactadas.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# backtest.py
+#
+# Backtesting con origen móvil: en lugar de un único corte 80/20, cada día del
+# tramo de test (cada BACKTEST_PASO días) es un origen desde el que se predicen
+# los siguientes 1..BACKTEST_HORIZONTE días solo con los datos anteriores.
+#
+# Para SARIMAX no se reajusta en cada origen: el modelo se ajusta una vez con el
+# tramo de entrenamiento, el filtro de Kalman con esos parámetros fijos recorre
+# el tramo de test (estado predicho en cada origen) y las predicciones de todos
+# los orígenes se calculan a la vez (kalman.predecir_medias).
+#
+# Las métricas por horizonte (MAE/RMSE sobre todos los orígenes) se guardan por
+# segmento y modelo en backtest.parquet.
+
+import os
+import time
+import numpy as np
+import pandas as pd
+from src.forecast import kalman
+from src.forecast.model_store import ModeloCompacto
+from src.utils.config import SEGMENTED_PATH, BACKTEST_HORIZONTE, BACKTEST_PASO
+
+BACKTEST_NAME = "backtest.parquet"
+
+
+def origenes_backtest(n, horizonte=BACKTEST_HORIZONTE, paso=BACKTEST_PASO):
+    """Posiciones de origen en el tramo de test (mismo corte 80/20 que predict_segment)."""
+    return np.arange(int(n * 0.8), n - horizonte + 1, paso)
+
+
+def matriz_futura(valores, origenes, horizonte):
+    """valores[o + h] de cada origen (filas) y paso h (columnas). Con exógenas 2D da (orígenes, pasos, k)."""
+    return np.asarray(valores, dtype=float)[origenes[:, None] + np.arange(horizonte)]
+
+
+def metricas_por_horizonte(reales, predicciones):
+    """MAE y RMSE de cada horizonte sobre todos los orígenes."""
+    errores = np.asarray(reales) - np.asarray(predicciones)
+    return pd.DataFrame({
+        "horizonte": np.arange(1, errores.shape[1] + 1),
+        "mae": np.abs(errores).mean(axis=0),
+        "rmse": np.sqrt((errores ** 2).mean(axis=0)),
+        "origenes": errores.shape[0],
+    })
+
+
+def resumen(metricas):
+    """(mae, rmse) medios de todos los horizontes, para la tabla de resultados del batch."""
+    return float(metricas["mae"].mean()), float(np.sqrt((metricas["rmse"] ** 2).mean()))
+
+
+def predecir_sarimax(modelo, y, exog, origenes, horizonte):
+    """
+    Predicciones (orígenes x horizonte) de un SARIMAX ajustado con y[:origenes[0]]
+    (SARIMAXResults o ModeloCompacto), sin reajustarlo.
+    """
+    if not isinstance(modelo, ModeloCompacto):
+        modelo = ModeloCompacto.desde_resultados(modelo)
+    corte = modelo.nobs
+    if origenes[0] < corte:
+        raise ValueError("Los orígenes del backtest deben ser posteriores al ajuste.")
+
+    y = np.asarray(y, dtype=float)
+    exog = np.asarray(exog, dtype=float) if exog is not None else None
+    filtrado = modelo.filtrar(y[corte:], exog[corte:] if exog is not None else None)
+    posiciones = origenes - corte
+
+    if modelo.sistema is not None:
+        estados = filtrado.predicted_state[:, posiciones].T
+        exog_futuras = matriz_futura(exog, origenes, horizonte) if exog is not None else None
+        return kalman.predecir_medias(modelo.sistema, estados, horizonte, exog_futuras)
+
+    # Modelos no lineales invariantes: predicción dinámica desde cada origen con statsmodels
+    return np.vstack([
+        filtrado.get_prediction(start=j, end=j + horizonte - 1, dynamic=True).predicted_mean
+        for j in posiciones
+    ])
+
+
+def backtest_sarimax(y, exog, modelo, horizonte=BACKTEST_HORIZONTE, paso=BACKTEST_PASO):
+    """
+    Backtest de un SARIMAX ya ajustado con el tramo de entrenamiento.
+    Devuelve las métricas por horizonte, o None si la serie es demasiado corta.
+    """
+    origenes = origenes_backtest(len(y), horizonte, paso)
+    if len(origenes) == 0:
+        return None
+    predicciones = predecir_sarimax(modelo, y, exog, origenes, horizonte)
+    return metricas_por_horizonte(matriz_futura(y, origenes, horizonte), predicciones)
+
+
+def ruta_backtest(provincia, producto):
+    return os.path.join(SEGMENTED_PATH, provincia, producto, BACKTEST_NAME)
+
+
+def guardar_backtest(provincia, producto, modelo, metricas, tiempo=None):
+    """Guarda (sustituye) las métricas de `modelo` en backtest.parquet del segmento."""
+    ruta = ruta_backtest(provincia, producto)
+    nuevas = metricas.assign(modelo=modelo, tiempo=tiempo, generado=time.time())
+    anteriores = cargar_backtest(provincia, producto)
+    if anteriores is not None:
+        nuevas = pd.concat([anteriores[anteriores["modelo"] != modelo], nuevas], ignore_index=True)
+
+    tmp = ruta + ".tmp"
+    nuevas.to_parquet(tmp, index=False)
+    os.replace(tmp, ruta)
+
+
+def cargar_backtest(provincia, producto, modelo=None):
+    """Métricas por horizonte guardadas del segmento (de un modelo o de todos), o None."""
+    ruta = ruta_backtest(provincia, producto)
+    if not os.path.exists(ruta):
+        return None
+    df = pd.read_parquet(ruta)
+    if modelo is not None:
+        df = df[df["modelo"] == modelo].reset_index(drop=True)
+        return df if not df.empty else None
+    return df
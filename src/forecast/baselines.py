@@ -0,0 +1,99 @@
+# baselines.py
+#
+# Modelos de referencia baratos para comparar con SARIMAX en el batch.
+# Todos tienen la interfaz de los predictores del backtest:
+#     predictor(y, exog, origenes, horizonte) -> predicciones (orígenes x horizonte)
+# y calculan las predicciones de todos los orígenes a la vez con NumPy. Los que
+# tienen parámetros (suavizado exponencial, ridge) los estiman una sola vez con
+# los datos anteriores al primer origen.
+
+import numpy as np
+from scipy.signal import lfilter
+
+# Periodo estacional (semanal) del naive estacional
+PERIODO = 7
+# Retardos de la serie en el ridge y penalización L2
+RIDGE_RETARDOS = 7
+RIDGE_ALPHA = 1.0
+# Valores de alpha probados en el suavizado exponencial
+ES_ALPHAS = np.linspace(0.05, 1.0, 20)
+
+
+def _pasos(horizonte):
+    return np.arange(1, horizonte + 1)
+
+
+def naive(y, exog, origenes, horizonte):
+    """Último valor observado."""
+    y = np.asarray(y, dtype=float)
+    return np.repeat(y[origenes - 1][:, None], horizonte, axis=1)
+
+
+def naive_estacional(y, exog, origenes, horizonte, periodo=PERIODO):
+    """Valor del mismo día de la última semana observada."""
+    y = np.asarray(y, dtype=float)
+    h = np.arange(horizonte)
+    atras = periodo * (h // periodo + 1)
+    return y[origenes[:, None] + h - atras]
+
+
+def drift(y, exog, origenes, horizonte):
+    """Último valor más la pendiente media del histórico hasta el origen."""
+    y = np.asarray(y, dtype=float)
+    ultimo = y[origenes - 1]
+    pendiente = (ultimo - y[0]) / np.maximum(origenes - 1, 1)
+    return ultimo[:, None] + pendiente[:, None] * _pasos(horizonte)
+
+
+def _niveles(y, alpha):
+    """Nivel del suavizado exponencial simple en cada día (recursión lineal con lfilter)."""
+    return lfilter([alpha], [1, alpha - 1], y, zi=[(1 - alpha) * y[0]])[0]
+
+
+def suavizado_exponencial(y, exog, origenes, horizonte):
+    """
+    Suavizado exponencial simple: predicción plana igual al nivel en el origen.
+    alpha se elige por error de un paso en los datos anteriores al primer origen.
+    """
+    y = np.asarray(y, dtype=float)
+    ajuste = y[:origenes[0]]
+    errores = [np.mean((ajuste[1:] - _niveles(ajuste, a)[:-1]) ** 2) for a in ES_ALPHAS]
+    alpha = ES_ALPHAS[int(np.argmin(errores))]
+
+    niveles = _niveles(y, alpha)
+    return np.repeat(niveles[origenes - 1][:, None], horizonte, axis=1)
+
+
+def _retardos(y, posiciones, retardos):
+    """Matriz (posiciones x retardos) con y[t-1], ..., y[t-retardos]."""
+    return y[posiciones[:, None] - np.arange(1, retardos + 1)]
+
+
+def ridge_retardos(y, exog, origenes, horizonte, retardos=RIDGE_RETARDOS, alpha=RIDGE_ALPHA):
+    """
+    Regresión ridge sobre los últimos `retardos` días y las exógenas del día.
+    Se ajusta una vez con los datos anteriores al primer origen y predice de forma
+    recursiva (las predicciones ocupan los retardos de los días aún no observados).
+    """
+    y = np.asarray(y, dtype=float)
+    exog = np.zeros((len(y), 0)) if exog is None else np.asarray(exog, dtype=float)
+
+    # --- Ajuste (variables estandarizadas, sin penalizar la constante) ---
+    t = np.arange(retardos, origenes[0])
+    X = np.hstack([_retardos(y, t, retardos), exog[t]])
+    media, escala = X.mean(axis=0), X.std(axis=0)
+    escala[escala == 0] = 1.0
+    Xs = (X - media) / escala
+    objetivo = y[t] - y[t].mean()
+    coef = np.linalg.solve(Xs.T @ Xs + alpha * np.eye(Xs.shape[1]), Xs.T @ objetivo) / escala
+    constante = y[t].mean() - media @ coef
+    coef_y, coef_exog = coef[:retardos], coef[retardos:]
+
+    # --- Predicción recursiva para todos los orígenes a la vez ---
+    ventana = _retardos(y, origenes, retardos)
+    predicciones = np.empty((len(origenes), horizonte))
+    for h in range(horizonte):
+        pred = constante + ventana @ coef_y + exog[origenes + h] @ coef_exog
+        predicciones[:, h] = pred
+        ventana = np.hstack([pred[:, None], ventana[:, :-1]])
+    return predicciones
@@ -1,20 +1,30 @@
 import os
+import numpy as np
 import pandas as pd
-from statsmodels.tsa.statespace.sarimax import SARIMAXResults
-from src.data_exogenous.load_rate import loadRate
-from src.data_exogenous.load_bret import get_Bret_for_dates
-from src.data_exogenous.load_holidays import get_festivos_provincia
+from src.data_exogenous.features import construir_exogenas
+from src.data_preprocessing.data_loader import leer_original
+from src.data_preprocessing.price_store import ultimo_precio
+from src.utils.file_store import load_parquet
+from src.utils.cache import cache_recurso
+from src.utils.singleflight import singleflight
+from src.utils.dependencies import ruta_artefacto
+from src.forecast.model_store import cargar_modelo
 
 BASE_PATH = "src/data/segmented"
+
+@cache_recurso(
+    "modelo",
+    artefactos=("model",),
+    tamano=lambda provincia, producto, modelo: os.path.getsize(ruta_artefacto(provincia, producto, "model"))
+)
 def load_model(provincia, producto):
-    model_path = os.path.join(BASE_PATH, provincia, producto, "model.pkl")
-    return SARIMAXResults.load(model_path)
+    """Modelo compacto del segmento (ModeloCompacto, ver model_store)."""
+    return cargar_modelo(provincia, producto)
 
 
-def load_historico(provincia, producto):
+def load_historico(provincia, producto, inicio=None, fin=None):
     ruta = os.path.join(BASE_PATH, provincia, producto, "stationary.parquet")
-    df = pd.read_parquet(ruta)
-    df["Fecha"] = pd.to_datetime(df["Fecha"])
+    df = load_parquet(ruta, inicio=inicio, fin=fin)
     df = df.set_index("Fecha").sort_index()
     return df
 
@@ -30,35 +40,40 @@ def reintegrar_prediccion(pred_mean, pred_ci, ultimo_precio_real):
     })
 
 
-def predict_future_days(provincia, producto, dias):
-    # --- Cargar modelo ---
-    model_path = os.path.join(BASE_PATH, provincia, producto, "model.pkl")
-    results = SARIMAXResults.load(model_path)
+def reintegrar_predicciones(medias, lower, upper, ultimos_precios):
+    """
+    reintegrar_prediccion para varios segmentos a la vez: matrices (segmentos x días)
+    de la serie diferenciada y el último precio real de cada segmento.
+    Devuelve (precio, lower, upper) en precio real con la misma forma.
+    """
+    ultimos = np.asarray(ultimos_precios, dtype=float)[:, None]
+    return tuple(np.cumsum(m, axis=1) + ultimos for m in (medias, lower, upper))
 
-    # --- Cargar histórico real ---
-    ruta_original = os.path.join(BASE_PATH, provincia, producto, "original.parquet")
-    df_original = pd.read_parquet(ruta_original)
-    df_original["Fecha"] = pd.to_datetime(df_original["Fecha"])
-    df_original = df_original.set_index("Fecha").sort_index()
 
-    ultimo_precio_real = df_original["Precio"].iloc[-1]
+@singleflight("predict_future_days")
+def predict_future_days(provincia, producto, dias, dias_historico=None):
+    """
+    Predicción de los próximos `dias` días en precio real.
+    - dias_historico: si se indica, solo se devuelve (y se lee) esa ventana
+      final del histórico real, p.ej. para dibujarla
+    """
+    # --- Cargar modelo (compartido entre sesiones) ---
+    results = load_model(provincia, producto)
+
+    # --- Último precio real (solo se lee el último día) ---
+    last_date, ultimo_precio_real = ultimo_precio(provincia, producto)
+
+    # --- Cargar histórico real ---
+    inicio = last_date - pd.Timedelta(days=dias_historico - 1) if dias_historico else None
+    df_original = leer_original(provincia, producto, inicio=inicio)
+    df_original = df_original.set_index("Fecha")
 
     # --- Generar fechas futuras ---
-    last_date = df_original.index.max()
     fechas_futuras = pd.date_range(start=last_date + pd.Timedelta(days=1),
                                    periods=dias, freq="D")
 
     # --- Exógenas futuras ---
-    loader = loadRate()
-    tipo_cambio_df = loader.get_rate_for_dates(fechas_futuras)
-    df_petroleo = get_Bret_for_dates(fechas_futuras)
-    festivos_df = get_festivos_provincia(provincia, fechas_futuras)
-
-    exog = pd.DataFrame(index=fechas_futuras)
-    exog["TipoCambio"] = tipo_cambio_df["TipoCambio"]
-    exog["Petroleo"] = df_petroleo["precio_brent"]
-    exog["Festivo"] = festivos_df["Festivo"]
-    exog = exog.replace([float("inf"), float("-inf")], pd.NA).ffill().bfill()
+    exog = construir_exogenas(provincia, fechas_futuras)
 
     # --- Predicción ---
     pred = results.get_forecast(steps=len(exog), exog=exog)
@@ -0,0 +1,173 @@
+# forecast_table.py
+#
+# Predicciones precalculadas por segmento (forecast.parquet) al horizonte máximo
+# de la portada. Se regeneran al entrenar y tras cada carga de datos, y la
+# portada solo corta las primeras N filas: no carga el modelo ni importa statsmodels.
+# Si la tabla falta o está obsoleta se usa predict_future_days en vivo.
+#
+# La predicción es la del modelo elegido para el segmento en el batch
+# (catalog.modelo_elegido, SARIMAX si no hay elección): con SARIMAX sale de
+# model.npz; con otro modelo del registro, de su predictor y de los errores de
+# su backtest para los intervalos.
+
+import os
+import time
+import pandas as pd
+from src.forecast import kalman
+from src.data_preprocessing.catalog import listar_segmentos, info_segmento
+from src.data_preprocessing.data_loader import leer_original
+from src.data_preprocessing.price_store import ultimo_precio
+from src.utils.cache import cache_datos
+from src.utils.config import FORECAST_HORIZONTE_MAX
+from src.utils.dependencies import ruta_artefacto, entradas_al_dia, marcar_construido, cargar_manifest
+
+MODELO_POR_DEFECTO = "sarimax"
+# Entradas de la predicción de un modelo del registro (no usa model.npz)
+ENTRADAS_REGISTRO = ("stationary", "original")
+# Nivel de los intervalos de las predicciones precalculadas
+ALPHA = 0.05
+
+
+def modelo_prediccion(provincia, producto):
+    """Modelo con el que se predice el segmento: el elegido en el batch o SARIMAX."""
+    info = info_segmento(provincia, producto) or {}
+    return info.get("modelo_elegido") or MODELO_POR_DEFECTO
+
+
+def modelo_catalogo(seg):
+    """
+    Modelo con el que se predice un segmento (fila del catálogo): el elegido en
+    el batch, SARIMAX si solo tiene model.npz, o None si no se puede predecir.
+    """
+    if seg["modelo_elegido"]:
+        return seg["modelo_elegido"]
+    return MODELO_POR_DEFECTO if seg["has_model"] else None
+
+
+def prediccion_al_dia(provincia, producto, modelo, manifest=None):
+    """True si forecast.parquet se hizo con `modelo` y con los datos actuales."""
+    if manifest is None:
+        manifest = cargar_manifest(provincia, producto)
+    info = manifest.get("forecast", {}).get("info", {})
+    return info.get("modelo", MODELO_POR_DEFECTO) == modelo and entradas_al_dia(provincia, producto, "forecast", manifest)
+
+
+def _prediccion_registro(provincia, producto, modelo, dias, alpha=ALPHA):
+    """(df_pred, metrics) de un modelo del registro, en precio real."""
+    from src.forecast.forecast import reintegrar_prediccion
+    from src.forecast.model_registry import predecir_futuro
+    from src.forecast.backtest import cargar_backtest, resumen
+
+    ultima_fecha, ultimo_precio_real = ultimo_precio(provincia, producto)
+    fechas = pd.date_range(ultima_fecha + pd.Timedelta(days=1), periods=dias, freq="D")
+    media, rmse = predecir_futuro(provincia, producto, modelo, fechas)
+    lower, upper = kalman.intervalo(media, rmse ** 2, alpha)
+
+    df_pred = reintegrar_prediccion(
+        pd.Series(media, index=fechas),
+        pd.DataFrame({"lower y": lower, "upper y": upper}, index=fechas),
+        ultimo_precio_real
+    )
+    mae, rmse_medio = resumen(cargar_backtest(provincia, producto, modelo))
+    return df_pred, {"MAE": mae, "RMSE": rmse_medio}
+
+
+def precalcular_prediccion(provincia, producto, dias=FORECAST_HORIZONTE_MAX, modelo=None):
+    """
+    Calcula y guarda la predicción del segmento a `dias` días con `modelo`
+    (por defecto, el elegido para el segmento).
+    """
+    from src.forecast.forecast import predict_future_days
+
+    modelo = modelo or modelo_prediccion(provincia, producto)
+    if modelo == MODELO_POR_DEFECTO:
+        _, df_pred, metrics = predict_future_days(provincia, producto, dias, dias_historico=1)
+        entradas = None
+    else:
+        df_pred, metrics = _prediccion_registro(provincia, producto, modelo, dias)
+        entradas = ENTRADAS_REGISTRO
+
+    ruta = ruta_artefacto(provincia, producto, "forecast")
+    tmp = ruta + ".tmp"
+    df_pred.rename_axis("Fecha").reset_index().to_parquet(tmp, index=False)
+    os.replace(tmp, ruta)
+
+    marcar_construido(provincia, producto, "forecast", entradas=entradas, info={
+        "modelo": modelo,
+        "horizonte": dias,
+        "generado": time.time(),
+        "metrics": {k: float(v) for k, v in metrics.items()},
+    })
+    return df_pred
+
+
+def actualizar_predicciones():
+    """
+    Regenera las predicciones obsoletas de los segmentos con modelo elegido o
+    SARIMAX (p.ej. tras una carga de datos). Devuelve {segmento: error} de los que fallaron.
+    """
+    errores = {}
+    for seg in listar_segmentos():
+        provincia, producto = seg["provincia"], seg["producto"]
+        modelo = modelo_catalogo(seg)
+        if modelo is None or prediccion_al_dia(provincia, producto, modelo):
+            continue
+        try:
+            precalcular_prediccion(provincia, producto, modelo=modelo)
+        except Exception as e:
+            errores[f"{provincia} / {producto}"] = str(e)
+    return errores
+
+
+@cache_datos("forecast", artefactos=("forecast",))
+def _leer_tabla(provincia, producto):
+    return pd.read_parquet(ruta_artefacto(provincia, producto, "forecast")).set_index("Fecha")
+
+
+def leer_prediccion(provincia, producto, dias):
+    """
+    (df_pred, metrics) de la tabla precalculada, o None si falta, es corta o se
+    hizo con otros datos o con un modelo distinto del elegido ahora en el catálogo.
+    """
+    manifest = cargar_manifest(provincia, producto)
+    info = manifest.get("forecast", {}).get("info", {})
+    if info.get("horizonte", 0) < dias:
+        return None
+    if not prediccion_al_dia(provincia, producto, modelo_prediccion(provincia, producto), manifest):
+        return None
+    return _leer_tabla(provincia, producto).iloc[:dias], info.get("metrics", {})
+
+
+def prediccion_registro(provincia, producto, modelo, dias, alpha=ALPHA):
+    """
+    (df_pred, metrics) de un modelo del registro distinto de SARIMAX: de la tabla
+    precalculada, que se regenera si falta o está obsoleta (no necesita model.npz).
+    Con otro alpha se calcula al momento sin guardarla.
+    """
+    if alpha != ALPHA:
+        return _prediccion_registro(provincia, producto, modelo, dias, alpha)
+    precalculada = leer_prediccion(provincia, producto, dias)
+    if precalculada is None:
+        precalcular_prediccion(provincia, producto, max(dias, FORECAST_HORIZONTE_MAX), modelo)
+        precalculada = leer_prediccion(provincia, producto, dias)
+    return precalculada
+
+
+def prediccion_portada(provincia, producto, dias, dias_historico=None):
+    """
+    Mismo resultado que predict_future_days (df_hist, df_pred, metrics) sirviendo
+    la predicción desde la tabla precalculada siempre que se pueda.
+    """
+    modelo = modelo_prediccion(provincia, producto)
+    if modelo != MODELO_POR_DEFECTO:
+        precalculada = prediccion_registro(provincia, producto, modelo, dias)
+    else:
+        precalculada = leer_prediccion(provincia, producto, dias)
+        if precalculada is None:
+            from src.forecast.forecast import predict_future_days
+            return predict_future_days(provincia, producto, dias, dias_historico=dias_historico)
+
+    df_pred, metrics = precalculada
+    inicio = df_pred.index[0] - pd.Timedelta(days=dias_historico) if dias_historico else None
+    df_hist = leer_original(provincia, producto, inicio=inicio).set_index("Fecha")
+    return df_hist, df_pred, metrics
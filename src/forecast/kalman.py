@@ -0,0 +1,72 @@
+# kalman.py
+#
+# Predicción de modelos SARIMAX con NumPy, sin statsmodels.
+# Sin observaciones nuevas el filtro de Kalman solo hace el paso de predicción:
+#   y_t  = d + x_t·beta + Z a_t          Var(y_t) = Z P_t Z' + H
+#   a_t+1 = c + T a_t                    P_t+1   = T P_t T' + R Q R'
+# partiendo del estado predicho (a, P) para el primer día posterior al ajuste.
+# Las matrices del sistema se calculan con statsmodels una sola vez, al guardar
+# el modelo (model_store.ModeloCompacto.sistema_lineal), y viajan en model.npz.
+
+from statistics import NormalDist
+import numpy as np
+
+# Matrices del sistema (nombre en model.npz -> forma)
+MATRICES = ("Z", "H", "T", "RQR", "c", "d", "beta")
+
+
+def predecir(sistema, estado, estado_cov, steps, exog=None):
+    """
+    Media y varianza de la predicción a `steps` pasos.
+    - sistema: dict con las MATRICES del modelo
+    - estado / estado_cov: estado predicho para el primer paso y su covarianza
+    - exog: (steps, k_exog) en el orden de las exógenas del ajuste
+    """
+    Z, H, T, RQR, c = (sistema[k] for k in ("Z", "H", "T", "RQR", "c"))
+    a = np.asarray(estado, dtype=float)
+    P = np.asarray(estado_cov, dtype=float)
+
+    # Medias de los estados: recurrencia lineal, sin covarianzas
+    estados = np.empty((steps, a.shape[0]))
+    for t in range(steps):
+        estados[t] = a
+        a = c + T @ a
+
+    # Varianzas: solo hace falta Z P_t Z' en cada paso
+    varianza = np.empty(steps)
+    for t in range(steps):
+        varianza[t] = Z @ P @ Z + H
+        P = T @ P @ T.T + RQR
+
+    media = estados @ Z + sistema["d"]
+    if exog is not None and len(sistema["beta"]):
+        media = media + np.asarray(exog, dtype=float) @ sistema["beta"]
+    return media, varianza
+
+
+def intervalo(media, varianza, alpha=0.05):
+    """Intervalo normal (lower, upper) al nivel 1 - alpha, como conf_int de statsmodels."""
+    q = NormalDist().inv_cdf(1 - alpha / 2)
+    margen = q * np.sqrt(varianza)
+    return media - margen, media + margen
+
+
+def predecir_medias(sistema, estados, steps, exog=None):
+    """
+    Medias de la predicción a `steps` pasos desde varios orígenes a la vez (sin varianzas).
+    - estados: (n_origenes, k_states) estado predicho en cada origen
+    - exog: (n_origenes, steps, k_exog) exógenas de los pasos de cada origen
+    Devuelve (n_origenes, steps).
+    """
+    Z, T, c = sistema["Z"], sistema["T"], sistema["c"]
+    A = np.asarray(estados, dtype=float)
+
+    medias = np.empty((A.shape[0], steps))
+    for t in range(steps):
+        medias[:, t] = A @ Z
+        A = c + A @ T.T
+
+    medias += sistema["d"]
+    if exog is not None and len(sistema["beta"]):
+        medias += np.asarray(exog, dtype=float) @ sistema["beta"]
+    return medias
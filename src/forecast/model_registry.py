@@ -0,0 +1,199 @@
+# model_registry.py
+#
+# Registro de los modelos que se comparan en el batch. Cada modelo tiene un
+# predictor de backtest (ver backtest.py):
+#     predictor(y, exog, origenes, horizonte, ordenes) -> predicciones (orígenes x horizonte)
+# y un nivel: "barato" (modelos de referencia, segundos para todos los segmentos)
+# o "caro" (ajustes SARIMAX). Añadir un modelo es registrar su predictor.
+
+import time
+import numpy as np
+from src.forecast import baselines
+from src.forecast.backtest import (
+    origenes_backtest, matriz_futura, metricas_por_horizonte, resumen,
+    predecir_sarimax, guardar_backtest, cargar_backtest
+)
+from src.utils.config import BACKTEST_HORIZONTE, BACKTEST_PASO, SELECCION_MARGEN, SELECCION_MAE_SUFICIENTE
+
+NIVELES = ("barato", "caro")
+
+
+class ModeloRegistrado:
+    def __init__(self, nombre, predictor, nivel, descripcion):
+        self.nombre = nombre
+        self.predictor = predictor
+        self.nivel = nivel
+        self.descripcion = descripcion
+
+
+_registro = {}
+
+
+def registrar(nombre, predictor, nivel="barato", descripcion=""):
+    if nivel not in NIVELES:
+        raise ValueError(f"Nivel de modelo desconocido: {nivel}")
+    _registro[nombre] = ModeloRegistrado(nombre, predictor, nivel, descripcion)
+
+
+def obtener(nombre):
+    try:
+        return _registro[nombre]
+    except KeyError:
+        raise ValueError(f"Modelo no registrado: {nombre}") from None
+
+
+def modelos(nivel=None):
+    """Nombres de los modelos registrados (los baratos primero, en orden de registro)."""
+    return [
+        m.nombre for n in NIVELES for m in _registro.values()
+        if m.nivel == n and (nivel is None or nivel == n)
+    ]
+
+
+def ordenes_segmento(provincia, producto):
+    """
+    (order, seasonal_order) del segmento: los del modelo guardado o, si no hay,
+    los sugeridos por el análisis ACF/PACF.
+    """
+    from src.forecast.train_model import cargar_metadata
+    from src.utils.dependencies import info_artefacto
+
+    info = info_artefacto(provincia, producto, "model")
+    if "order" in info:
+        return tuple(info["order"]), tuple(info["seasonal_order"])
+
+    metadata = cargar_metadata(provincia, producto)
+    if not metadata or "error" in metadata:
+        raise ValueError((metadata or {}).get("error", "Sin parámetros SARIMAX sugeridos."))
+    s = metadata["seasonal"]
+    return (metadata["p"], metadata["d"], metadata["q"]), (s["P"], s["D"], s["Q"], s["s"])
+
+
+def evaluar_modelo(provincia, producto, nombre, horizonte=BACKTEST_HORIZONTE, paso=BACKTEST_PASO):
+    """
+    Backtest con origen móvil de un modelo registrado sobre el segmento; guarda
+    las métricas por horizonte (backtest.parquet) y devuelve (mae, rmse, tiempo).
+    """
+    from src.forecast.train_model import _cargar_datos_segmento
+
+    modelo = obtener(nombre)
+    y, exog = _cargar_datos_segmento(provincia, producto)
+    origenes = origenes_backtest(len(y), horizonte, paso)
+    if len(origenes) == 0:
+        raise ValueError("Serie demasiado corta para el backtest.")
+    ordenes = ordenes_segmento(provincia, producto) if modelo.nivel == "caro" else None
+
+    inicio = time.time()
+    predicciones = modelo.predictor(y.to_numpy(), exog.to_numpy(), origenes, horizonte, ordenes)
+    tiempo = time.time() - inicio
+
+    metricas = metricas_por_horizonte(matriz_futura(y, origenes, horizonte), predicciones)
+    guardar_backtest(provincia, producto, nombre, metricas, tiempo=tiempo)
+    return (*resumen(metricas), tiempo)
+
+
+def predecir_futuro(provincia, producto, nombre, fechas):
+    """
+    Predicción de la serie del segmento (la del backtest) en `fechas`, los días
+    siguientes al último dato, con un modelo registrado.
+    Devuelve (media, rmse): rmse es el del backtest del modelo en cada horizonte
+    (más allá del horizonte del backtest se repite el último), para los intervalos.
+    """
+    from src.data_exogenous.features import construir_exogenas
+    from src.forecast.train_model import _cargar_datos_segmento
+
+    modelo = obtener(nombre)
+    metricas = cargar_backtest(provincia, producto, nombre)
+    if metricas is None:
+        raise ValueError(f"El segmento no tiene backtest del modelo {nombre}.")
+
+    y, exog = _cargar_datos_segmento(provincia, producto)
+    dias = len(fechas)
+    # Un único origen justo después del último dato; los días futuros van como NaN
+    y_ext = np.concatenate([y.to_numpy(dtype=float), np.full(dias, np.nan)])
+    exog_ext = np.vstack([exog.to_numpy(dtype=float), construir_exogenas(provincia, fechas).to_numpy(dtype=float)])
+    ordenes = ordenes_segmento(provincia, producto) if modelo.nivel == "caro" else None
+    media = modelo.predictor(y_ext, exog_ext, np.array([len(y)]), dias, ordenes)[0]
+
+    rmse = metricas.sort_values("horizonte")["rmse"].to_numpy()[:dias]
+    return media, np.pad(rmse, (0, dias - len(rmse)), mode="edge")
+
+
+# ---------------------------------------------------------------------
+# Selección escalonada
+# ---------------------------------------------------------------------
+
+def _mejor(resultados, nivel):
+    """(mae, modelo) del mejor resultado del nivel, o None. resultados: (modelo, mae, rmse, tiempo)."""
+    candidatos = [(mae, modelo) for modelo, mae, _, _ in resultados if obtener(modelo).nivel == nivel]
+    return min(candidatos) if candidatos else None
+
+
+def necesita_nivel_caro(provincia, producto, resultados, margen=SELECCION_MARGEN,
+                        mae_suficiente=SELECCION_MAE_SUFICIENTE):
+    """
+    Con los resultados de los modelos baratos, decide si hay que ajustar los caros:
+    sí, salvo que el mejor barato quede dentro del margen del último backtest de
+    SARIMAX del segmento (o, si no lo hay, por debajo de mae_suficiente).
+    """
+    mejor = _mejor(resultados, "barato")
+    if mejor is None:
+        return True
+
+    anterior = cargar_backtest(provincia, producto, "sarimax")
+    if anterior is None:
+        return mae_suficiente is None or mejor[0] > mae_suficiente
+    return mejor[0] > resumen(anterior)[0] * (1 + margen)
+
+
+def elegir_modelo(resultados, margen=SELECCION_MARGEN):
+    """
+    (modelo, mae) elegido: el mejor barato salvo que el mejor caro lo mejore en
+    más del margen.
+    """
+    barato, caro = _mejor(resultados, "barato"), _mejor(resultados, "caro")
+    elegido = barato
+    if barato is None or (caro is not None and caro[0] * (1 + margen) < barato[0]):
+        elegido = caro
+    if elegido is None:
+        return None, None
+    mae, modelo = elegido
+    return modelo, mae
+
+
+# ---------------------------------------------------------------------
+# Modelos registrados
+# ---------------------------------------------------------------------
+
+def _sin_ordenes(predictor):
+    """Adapta un predictor de baselines (no usa órdenes SARIMAX)."""
+    def envoltura(y, exog, origenes, horizonte, ordenes):
+        return predictor(y, exog, origenes, horizonte)
+    return envoltura
+
+
+def _sarimax(con_exogenas):
+    def predictor(y, exog, origenes, horizonte, ordenes):
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+        # Un único ajuste con los datos anteriores al primer origen
+        exog = exog if con_exogenas else None
+        corte = origenes[0]
+        order, seasonal_order = ordenes
+        results = SARIMAX(
+            y[:corte],
+            exog=exog[:corte] if exog is not None else None,
+            order=order,
+            seasonal_order=seasonal_order
+        ).fit(disp=False)
+        return predecir_sarimax(results, y, exog, origenes, horizonte)
+    return predictor
+
+
+registrar("naive", _sin_ordenes(baselines.naive), descripcion="Último valor")
+registrar("naive_estacional", _sin_ordenes(baselines.naive_estacional), descripcion="Mismo día de la semana anterior")
+registrar("drift", _sin_ordenes(baselines.drift), descripcion="Último valor + pendiente media")
+registrar("suavizado_exp", _sin_ordenes(baselines.suavizado_exponencial), descripcion="Suavizado exponencial simple")
+registrar("ridge", _sin_ordenes(baselines.ridge_retardos), descripcion="Ridge sobre retardos y exógenas")
+registrar("sarimax", _sarimax(con_exogenas=True), nivel="caro", descripcion="SARIMAX con exógenas")
+registrar("sarimax_sin_exo", _sarimax(con_exogenas=False), nivel="caro", descripcion="SARIMAX sin exógenas")
@@ -0,0 +1,274 @@
+# model_store.py
+#
+# Artefacto compacto de los modelos SARIMAX (model.npz) en lugar del pickle completo
+# de SARIMAXResults (que incluye los datos de entrenamiento y toda la salida del filtro).
+# Solo guarda lo necesario para seguir prediciendo:
+#   - spec: órdenes y opciones de SARIMAX, nombres de exógenas y parámetros, nobs
+#   - params: parámetros ajustados
+#   - estado / estado_cov: estado predicho (y su covarianza) para el primer día
+#     posterior al último dato del ajuste
+#   - métricas: aic, bic, llf
+#   - sistema: matrices del espacio de estados (ver kalman.py)
+# Para predecir basta NumPy (kalman.predecir) con las matrices guardadas; solo
+# si el modelo no es lineal invariante (tendencia, regresión variable) se construye
+# un SARIMAX sobre el horizonte pedido (sin datos), se inicializa con el estado
+# guardado (initialize_known) y se filtra con los parámetros. En ambos casos el
+# resultado coincide con results.get_forecast().
+
+import json
+import os
+import numpy as np
+import pandas as pd
+from src.forecast import kalman
+from src.utils.config import SEGMENTED_PATH
+
+MODEL_NAME = "model.npz"
+# Formato anterior (pickle de SARIMAXResults), se migra al cargar
+LEGACY_MODEL_NAME = "model.pkl"
+
+# Argumentos de SARIMAX que no forman parte de la especificación
+_KWDS_EXCLUIDOS = ("endog", "exog", "dates", "freq", "missing")
+
+
+class Prediccion:
+    """Predicción con la misma interfaz que la de statsmodels (predicted_mean, conf_int)."""
+
+    def __init__(self, media, varianza, index):
+        self.media = np.asarray(media, dtype=float)
+        self.varianza = np.asarray(varianza, dtype=float)
+        self.index = index
+
+    @property
+    def predicted_mean(self):
+        return pd.Series(self.media, index=self.index, name="predicted_mean")
+
+    def conf_int(self, alpha=0.05):
+        lower, upper = kalman.intervalo(self.media, self.varianza, alpha)
+        return pd.DataFrame({"lower y": lower, "upper y": upper}, index=self.index)
+
+
+class ModeloCompacto:
+    """Modelo SARIMAX ajustado reducido a especificación + parámetros + último estado."""
+
+    def __init__(self, spec, params, estado, estado_cov, metricas, sistema=None):
+        self.spec = spec
+        self.params = np.asarray(params, dtype=float)
+        self.estado = np.asarray(estado, dtype=float)
+        self.estado_cov = np.asarray(estado_cov, dtype=float)
+        self.metricas = metricas
+        # Matrices para kalman.predecir (None: se predice con statsmodels)
+        self.sistema = sistema
+
+    # --- Métricas con los mismos nombres que SARIMAXResults ---
+    @property
+    def aic(self):
+        return self.metricas["aic"]
+
+    @property
+    def bic(self):
+        return self.metricas["bic"]
+
+    @property
+    def llf(self):
+        return self.metricas["llf"]
+
+    @property
+    def nobs(self):
+        return self.spec["nobs"]
+
+    @classmethod
+    def desde_resultados(cls, results):
+        """Convierte un SARIMAXResults ajustado."""
+        model = results.model
+        kwds = {
+            k: list(v) if isinstance(v, tuple) else v
+            for k, v in model._get_init_kwds().items()
+            if k not in _KWDS_EXCLUIDOS
+        }
+        spec = {
+            "kwds": kwds,
+            "exog_names": list(model.exog_names or []),
+            "param_names": list(model.param_names),
+            "nobs": int(results.nobs),
+        }
+        metricas = {"aic": float(results.aic), "bic": float(results.bic), "llf": float(results.llf)}
+        modelo = cls(
+            spec,
+            results.params,
+            results.predicted_state[:, -1],
+            results.predicted_state_cov[:, :, -1],
+            metricas
+        )
+        modelo.sistema = modelo.sistema_lineal()
+        return modelo
+
+    def sistema_lineal(self):
+        """
+        Matrices del espacio de estados con los parámetros ajustados, o None si
+        alguna varía con el tiempo (tendencia, regresión variable o en el estado).
+        """
+        kwds = self.spec["kwds"]
+        k_exog = len(self.spec["exog_names"])
+        if kwds.get("trend") not in (None, "n") or kwds.get("time_varying_regression") \
+                or (k_exog and not kwds.get("mle_regression", True)):
+            return None
+
+        # Dos filas sin exógenas y una por exógena: el término independiente de
+        # la observación en cada fila da d y los coeficientes de las exógenas
+        # (con al menos dos filas se distinguen las matrices variables en el tiempo)
+        exog = np.vstack([np.zeros((2, k_exog)), np.eye(k_exog)]) if k_exog else None
+        model = self._modelo(np.full(k_exog + 2, np.nan), exog)
+        model.update(self.params)
+        ssm = model.ssm
+
+        matrices = [ssm["design"], ssm["obs_cov"], ssm["transition"], ssm["selection"], ssm["state_cov"]]
+        if any(m.ndim != 2 for m in matrices) or ssm["state_intercept"].ndim != 1 or ssm.k_endog != 1:
+            return None
+
+        Z, H, T, R, Q = matrices
+        d = np.broadcast_to(ssm["obs_intercept"][0], (k_exog + 2,))
+        return {
+            "Z": Z[0],
+            "H": np.asarray(H[0, 0]),
+            "T": T,
+            "RQR": R @ Q @ R.T,
+            "c": ssm["state_intercept"],
+            "d": np.asarray(d[0]),
+            "beta": d[2:] - d[0],
+        }
+
+    def _modelo(self, endog, exog):
+        """SARIMAX con la especificación guardada que continúa justo después del último dato."""
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+        kwds = dict(self.spec["kwds"])
+        # La tendencia determinista sigue contando desde el final del ajuste
+        kwds["trend_offset"] = kwds.get("trend_offset", 1) + self.nobs
+        # El estado inicial es conocido: ninguna observación se excluye de la
+        # verosimilitud (con diferenciación SARIMAX descartaría las primeras)
+        kwds["loglikelihood_burn"] = 0
+        if exog is not None:
+            exog = np.asarray(exog, dtype=float)
+        model = SARIMAX(np.asarray(endog, dtype=float), exog=exog, **kwds)
+        model.ssm.initialize_known(self.estado, self.estado_cov)
+        return model
+
+    def get_forecast(self, steps, exog=None):
+        """Predicción a `steps` días (misma interfaz que results.get_forecast)."""
+        index = exog.index if isinstance(exog, (pd.DataFrame, pd.Series)) else pd.RangeIndex(steps)
+        if self.sistema is not None:
+            media, varianza = kalman.predecir(self.sistema, self.estado, self.estado_cov, steps, exog)
+            return Prediccion(media, varianza, index)
+
+        resultados = self._modelo(np.full(steps, np.nan), exog).filter(self.params)
+        prediccion = resultados.get_prediction(start=0, end=steps - 1)
+        return Prediccion(prediccion.predicted_mean, prediccion.var_pred_mean, index)
+
+    def filtrar(self, endog, exog=None):
+        """
+        Filtro de Kalman con los parámetros fijos sobre observaciones posteriores
+        al ajuste (sin reoptimizar). predicted_state[:, j] es el estado predicho
+        para la observación j con los datos anteriores a ella.
+        """
+        return self._modelo(np.asarray(endog, dtype=float), exog).filter(self.params)
+
+    def extender(self, endog, exog=None):
+        """
+        Añade observaciones nuevas con los parámetros fijos (solo filtrado).
+        Devuelve (modelo extendido, errores de un paso estandarizados de esas observaciones).
+        """
+        endog = np.asarray(endog, dtype=float)
+        resultados = self.filtrar(endog, exog)
+
+        nobs = self.nobs + len(endog)
+        llf = self.llf + float(resultados.llf)
+        k = len(self.params)
+        metricas = {"aic": -2 * llf + 2 * k, "bic": -2 * llf + k * np.log(nobs), "llf": llf}
+
+        extendido = ModeloCompacto(
+            dict(self.spec, nobs=nobs),
+            self.params,
+            resultados.predicted_state[:, -1],
+            resultados.predicted_state_cov[:, :, -1],
+            metricas,
+            # Mismos parámetros: mismas matrices
+            self.sistema
+        )
+        return extendido, resultados.filter_results.standardized_forecasts_error[0]
+
+
+def ruta_modelo(provincia, producto, nombre=MODEL_NAME):
+    return os.path.join(SEGMENTED_PATH, provincia, producto, nombre)
+
+
+def guardar_modelo(provincia, producto, modelo):
+    """Guarda el modelo (ModeloCompacto o SARIMAXResults) en model.npz."""
+    if not isinstance(modelo, ModeloCompacto):
+        modelo = ModeloCompacto.desde_resultados(modelo)
+
+    ruta = ruta_modelo(provincia, producto)
+    tmp = ruta + ".tmp.npz"
+    # Las matrices van con prefijo "sistema_" (ninguna si el modelo no es lineal invariante)
+    sistema = {f"sistema_{k}": v for k, v in (modelo.sistema or {}).items()}
+    np.savez(
+        tmp,
+        spec=np.array(json.dumps(modelo.spec)),
+        metricas=np.array(json.dumps(modelo.metricas)),
+        params=modelo.params,
+        estado=modelo.estado,
+        estado_cov=modelo.estado_cov,
+        **sistema
+    )
+    os.replace(tmp, ruta)
+    return ruta
+
+
+def cargar_modelo(provincia, producto):
+    """Carga model.npz; si solo existe el model.pkl antiguo, lo migra antes."""
+    ruta = ruta_modelo(provincia, producto)
+    if not os.path.exists(ruta) and os.path.exists(ruta_modelo(provincia, producto, LEGACY_MODEL_NAME)):
+        migrar_modelo(provincia, producto)
+
+    with np.load(ruta) as datos:
+        modelo = ModeloCompacto(
+            json.loads(str(datos["spec"])),
+            datos["params"],
+            datos["estado"],
+            datos["estado_cov"],
+            json.loads(str(datos["metricas"]))
+        )
+        if "sistema_T" in datos.files:
+            modelo.sistema = {k: datos[f"sistema_{k}"] for k in kalman.MATRICES}
+    return modelo
+
+
+def migrar_modelo(provincia, producto):
+    """
+    Convierte el model.pkl del segmento a model.npz y borra el pickle.
+    Los artefactos construidos con el pickle siguen al día (mismo modelo).
+    """
+    from statsmodels.tsa.statespace.sarimax import SARIMAXResults
+    from src.utils.dependencies import huella_artefacto, sustituir_huella
+
+    ruta_pkl = ruta_modelo(provincia, producto, LEGACY_MODEL_NAME)
+    # Mientras no hay model.npz, el artefacto "model" es el pickle
+    anterior = huella_artefacto(provincia, producto, "model")
+
+    guardar_modelo(provincia, producto, SARIMAXResults.load(ruta_pkl))
+    sustituir_huella(provincia, producto, "model", anterior)
+    os.remove(ruta_pkl)
+
+
+def migrar_modelos():
+    """Migra todos los model.pkl que queden. Devuelve el número de modelos migrados."""
+    import glob
+
+    migrados = 0
+    for ruta in glob.glob(os.path.join(SEGMENTED_PATH, "*", "*", LEGACY_MODEL_NAME)):
+        producto_dir = os.path.dirname(ruta)
+        provincia = os.path.basename(os.path.dirname(producto_dir))
+        producto = os.path.basename(producto_dir)
+        if not os.path.exists(ruta_modelo(provincia, producto)):
+            migrar_modelo(provincia, producto)
+            migrados += 1
+    return migrados
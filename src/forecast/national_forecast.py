@@ -0,0 +1,134 @@
+# national_forecast.py
+#
+# Predicción nacional: todos los segmentos con modelo en una sola pasada y una
+# única tabla columnar (Provincia, Producto, Fecha, Predicción, Lower, Upper).
+# Cada segmento se predice con su modelo elegido (forecast_table.modelo_catalogo).
+# Para los SARIMAX las exógenas comunes (tipo de cambio, Brent) se cargan una vez
+# para todo el rango de fechas, cada segmento solo añade los festivos de su
+# provincia, y la vuelta a precio real se hace para todos a la vez. Los modelos
+# de referencia se sirven de su predicción precalculada (forecast.parquet).
+
+import os
+import numpy as np
+import pandas as pd
+from src.data_exogenous.features import get_matriz_exogenas
+from src.data_preprocessing.catalog import listar_segmentos
+from src.data_preprocessing.price_store import ultimo_precio
+from src.forecast import kalman
+from src.forecast.forecast import load_model, reintegrar_predicciones
+from src.forecast.forecast_table import MODELO_POR_DEFECTO, modelo_catalogo, prediccion_registro
+from src.utils.config import FORECAST_HORIZONTE_MAX, PREDICCION_NACIONAL_PATH
+
+COLUMNAS = ["Provincia", "Producto", "Fecha", "Predicción", "Lower", "Upper"]
+
+
+def ruta_prediccion_nacional(fecha=None):
+    fecha = pd.Timestamp(fecha or pd.Timestamp.today()).strftime("%Y-%m-%d")
+    return os.path.join(PREDICCION_NACIONAL_PATH, f"prediccion_{fecha}.parquet")
+
+
+def _prediccion_sarimax(segmentos, dias, alpha, errores):
+    """Tabla de los segmentos SARIMAX (model.npz) predichos a la vez, o None."""
+    # --- Último dato de cada segmento ---
+    ultimos = {}
+    for provincia, producto in segmentos:
+        try:
+            ultimos[(provincia, producto)] = ultimo_precio(provincia, producto)
+        except Exception as e:
+            errores[f"{provincia} / {producto}"] = str(e)
+    if not ultimos:
+        return None
+
+    # --- Exógenas comunes: una matriz para el rango de todos los segmentos ---
+    fechas_fin = [fecha for fecha, _ in ultimos.values()]
+    matriz = get_matriz_exogenas(pd.date_range(
+        min(fechas_fin) + pd.Timedelta(days=1),
+        max(fechas_fin) + pd.Timedelta(days=dias),
+        freq="D"
+    ))
+
+    # --- Predicción de la serie diferenciada por segmento ---
+    claves, fechas, precios, medias, varianzas = [], [], [], [], []
+    for (provincia, producto), (fecha_fin, precio) in ultimos.items():
+        try:
+            fechas_futuras = pd.date_range(fecha_fin + pd.Timedelta(days=1), periods=dias, freq="D")
+            exog = matriz.para(provincia, fechas_futuras)
+            pred = load_model(provincia, producto).get_forecast(steps=dias, exog=exog)
+        except Exception as e:
+            errores[f"{provincia} / {producto}"] = str(e)
+            continue
+        claves.append((provincia, producto))
+        fechas.append(fechas_futuras.to_numpy())
+        precios.append(precio)
+        medias.append(pred.media)
+        varianzas.append(pred.varianza)
+
+    if not claves:
+        return None
+
+    # --- Vuelta a precio real de todos los segmentos a la vez ---
+    medias = np.vstack(medias)
+    lower, upper = kalman.intervalo(medias, np.vstack(varianzas), alpha)
+    precio_real, lower_real, upper_real = reintegrar_predicciones(medias, lower, upper, precios)
+
+    provincias, productos = zip(*claves)
+    return pd.DataFrame({
+        "Provincia": np.repeat(provincias, dias),
+        "Producto": np.repeat(productos, dias),
+        "Fecha": np.concatenate(fechas),
+        "Predicción": precio_real.ravel(),
+        "Lower": lower_real.ravel(),
+        "Upper": upper_real.ravel(),
+    })
+
+
+def generar_prediccion_nacional(dias=FORECAST_HORIZONTE_MAX, alpha=0.05):
+    """
+    Predice `dias` días de todos los segmentos con modelo elegido (o SARIMAX) y
+    guarda la tabla del día. Devuelve (ruta, errores) con errores = {segmento: mensaje}.
+    """
+    modelos = {}
+    for seg in listar_segmentos():
+        modelo = modelo_catalogo(seg)
+        if modelo is not None:
+            modelos[(seg["provincia"], seg["producto"])] = modelo
+    errores = {}
+
+    sarimax = [seg for seg, modelo in modelos.items() if modelo == MODELO_POR_DEFECTO]
+    partes = [_prediccion_sarimax(sarimax, dias, alpha, errores)] if sarimax else []
+
+    for (provincia, producto), modelo in modelos.items():
+        if modelo == MODELO_POR_DEFECTO:
+            continue
+        try:
+            df_pred, _ = prediccion_registro(provincia, producto, modelo, dias, alpha)
+        except Exception as e:
+            errores[f"{provincia} / {producto}"] = str(e)
+            continue
+        partes.append(
+            df_pred.rename_axis("Fecha").reset_index().assign(Provincia=provincia, Producto=producto)
+        )
+
+    partes = [p for p in partes if p is not None]
+    if not partes:
+        return None, errores
+
+    tabla = pd.concat(partes, ignore_index=True)[COLUMNAS]
+    tabla = tabla.sort_values(["Provincia", "Producto", "Fecha"], kind="stable", ignore_index=True)
+    tabla["Provincia"] = tabla["Provincia"].astype("category")
+    tabla["Producto"] = tabla["Producto"].astype("category")
+
+    ruta = ruta_prediccion_nacional()
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = ruta + ".tmp"
+    tabla.to_parquet(tmp, index=False)
+    os.replace(tmp, ruta)
+    return ruta, errores
+
+
+def leer_prediccion_nacional(fecha=None):
+    """Tabla nacional generada en `fecha` (hoy por defecto), o None si no existe."""
+    ruta = ruta_prediccion_nacional(fecha)
+    if not os.path.exists(ruta):
+        return None
+    return pd.read_parquet(ruta)
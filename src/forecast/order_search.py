@@ -0,0 +1,244 @@
+# order_search.py
+#
+# Búsqueda automática de los órdenes (p,d,q)(P,D,Q,s) de SARIMAX por AIC, en
+# lugar de ajustarlos a mano a partir de las sugerencias ACF/PACF.
+#
+# - Stepwise: se parte de unos pocos candidatos y en cada ronda se prueban los
+#   vecinos (±1 en p, q, P, Q) del mejor, hasta que ninguno mejora el AIC.
+#   d y D se toman de los contrastes de estacionariedad (metadata): el AIC no
+#   compara modelos con distinta diferenciación.
+# - Los candidatos de cada ronda se ajustan en paralelo en procesos.
+# - Poda: cada candidato se ajusta primero con pocas iteraciones; si su AIC ya
+#   está claramente por encima del mejor (ORDEN_MARGEN_PODA) no se termina.
+# - Presupuesto de tiempo por segmento, también en la ronda inicial: al agotarse
+#   se devuelve el mejor hasta entonces (si aún no hay ninguno, se espera solo
+#   hasta que termine el primer ajuste válido).
+# - Memoización (orden_busqueda.json del segmento, por orden y huella de los datos):
+#   con los mismos datos se reutiliza el AIC de cada orden ya ajustado; con datos
+#   nuevos, sus parámetros sirven de punto de partida y el mejor orden anterior
+#   entra como candidato inicial.
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+import numpy as np
+from src.forecast.train_model import _cargar_datos_segmento, cargar_metadata
+from src.utils.singleflight import singleflight
+from src.utils.pool import crear_pool, terminar_pool
+from src.utils.config import (
+    SEGMENTED_PATH, BATCH_THREADS_PER_WORKER,
+    ORDEN_MAX, ORDEN_MAX_ESTACIONAL, ORDEN_PRESUPUESTO, ORDEN_WORKERS,
+    ORDEN_MAXITER_PREVIO, ORDEN_MARGEN_PODA
+)
+
+MEMO_NAME = "orden_busqueda.json"
+
+
+def _clave(orden):
+    """(p,d,q,P,D,Q,s) -> "p,d,q,P,D,Q,s" (clave JSON)."""
+    return ",".join(str(o) for o in orden)
+
+
+def _huella_datos(y, exog):
+    h = hashlib.sha1()
+    h.update(y.index.asi8.tobytes())
+    h.update(np.ascontiguousarray(y.to_numpy(dtype=float)).tobytes())
+    h.update(np.ascontiguousarray(exog.to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()
+
+
+def _ruta_memo(provincia, producto):
+    return os.path.join(SEGMENTED_PATH, provincia, producto, MEMO_NAME)
+
+
+def _cargar_memo(provincia, producto):
+    try:
+        with open(_ruta_memo(provincia, producto)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _guardar_memo(provincia, producto, memo):
+    ruta = _ruta_memo(provincia, producto)
+    tmp = ruta + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(memo, f)
+    os.replace(tmp, ruta)
+
+
+def _ajustar_candidato(y, exog, orden, mejor_aic, start_params):
+    """
+    Ajusta SARIMAX con el orden (p,d,q,P,D,Q,s). Se ejecuta en los procesos del pool.
+    Devuelve {"aic", "params", "podado"}; aic = inf si el ajuste falla.
+    """
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    p, d, q, P, D, Q, s = orden
+    try:
+        model = SARIMAX(y, exog=exog, order=(p, d, q), seasonal_order=(P, D, Q, s))
+        start = start_params if start_params is not None and len(start_params) == len(model.start_params) else None
+
+        # Ajuste previo corto: si ya queda claramente peor que el mejor, se descarta
+        previo = model.fit(start_params=start, maxiter=ORDEN_MAXITER_PREVIO, disp=False)
+        if mejor_aic is not None and previo.aic > mejor_aic + ORDEN_MARGEN_PODA:
+            return {"aic": float(previo.aic), "params": previo.params.tolist(), "podado": True}
+
+        results = model.fit(start_params=previo.params, disp=False)
+        return {"aic": float(results.aic), "params": results.params.tolist(), "podado": False}
+    except Exception:
+        return {"aic": float("inf"), "params": None, "podado": False}
+
+
+def _iniciales(d, D, s):
+    """Candidatos iniciales del stepwise (Hyndman-Khandakar)."""
+    if s <= 1:
+        return [(2, d, 2, 0, 0, 0, 0), (0, d, 0, 0, 0, 0, 0), (1, d, 0, 0, 0, 0, 0), (0, d, 1, 0, 0, 0, 0)]
+    return [
+        (2, d, 2, 1, D, 1, s), (0, d, 0, 0, D, 0, s),
+        (1, d, 0, 1, D, 0, s), (0, d, 1, 0, D, 1, s),
+    ]
+
+
+def _vecinos(orden):
+    p, d, q, P, D, Q, s = orden
+    cambios = [(1, 0, 0, 0), (-1, 0, 0, 0), (0, 1, 0, 0), (0, -1, 0, 0), (1, 1, 0, 0), (-1, -1, 0, 0)]
+    if s > 1:
+        cambios += [(0, 0, 1, 0), (0, 0, -1, 0), (0, 0, 0, 1), (0, 0, 0, -1)]
+    vecinos = []
+    for dp, dq, dP, dQ in cambios:
+        np_, nq, nP, nQ = p + dp, q + dq, P + dP, Q + dQ
+        if 0 <= np_ <= ORDEN_MAX and 0 <= nq <= ORDEN_MAX and 0 <= nP <= ORDEN_MAX_ESTACIONAL and 0 <= nQ <= ORDEN_MAX_ESTACIONAL:
+            vecinos.append((np_, d, nq, nP, D, nQ, s))
+    return vecinos
+
+
+@singleflight("buscar_orden")
+def buscar_orden(provincia, producto, s=None, presupuesto=ORDEN_PRESUPUESTO, workers=ORDEN_WORKERS):
+    """
+    Busca el orden SARIMAX de menor AIC para el segmento (sobre el tramo de
+    entrenamiento, el mismo que usa predict_segment).
+    Devuelve {"order", "seasonal_order", "aic", "ajustados", "reutilizados",
+    "podados", "agotado", "tiempo"}.
+    """
+    inicio = time.time()
+    limite = inicio + presupuesto
+
+    y, exog = _cargar_datos_segmento(provincia, producto)
+    train_size = int(len(y) * 0.8)
+    y, exog = y.iloc[:train_size], exog.iloc[:train_size]
+
+    # d y D de los contrastes de estacionariedad
+    metadata = cargar_metadata(provincia, producto) or {}
+    estacional = metadata.get("seasonal", {})
+    d, D = int(metadata.get("d", 0)), int(estacional.get("D", 0))
+    s = int(estacional.get("s", 7) if s is None else s)
+
+    huella = _huella_datos(y, exog)
+    memo = _cargar_memo(provincia, producto)
+    anteriores = memo.get("ajustes", {})
+
+    evaluados = {}        # orden -> {"aic", "params", "podado"}
+    contadores = {"ajustados": 0, "reutilizados": 0, "podados": 0}
+    agotado = False
+
+    def mejor():
+        validos = [(r["aic"], o) for o, r in evaluados.items() if not r["podado"] and np.isfinite(r["aic"])]
+        return min(validos) if validos else (None, None)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    executor = crear_pool(workers, BATCH_THREADS_PER_WORKER) if workers > 1 else None
+
+    y_np, exog_np = y.to_numpy(dtype=float), exog.to_numpy(dtype=float)
+
+    def evaluar(candidatos):
+        """
+        Ajusta una ronda de candidatos (los ya memorizados no se reajustan). Se
+        corta al agotar el presupuesto, salvo que aún no haya ningún modelo válido.
+        """
+        nonlocal agotado
+        pendientes = []
+        for orden in candidatos:
+            if orden in evaluados:
+                continue
+            previo = anteriores.get(_clave(orden))
+            if previo is not None and previo.get("huella") == huella:
+                evaluados[orden] = previo
+                contadores["reutilizados"] += 1
+            else:
+                pendientes.append((orden, previo["params"] if previo else None))
+
+        if executor is None:
+            for orden, start in pendientes:
+                if time.time() > limite and mejor()[1] is not None:
+                    agotado = True
+                    return
+                evaluados[orden] = _ajustar_candidato(y_np, exog_np, orden, mejor()[0], start)
+                contadores["ajustados"] += 1
+            return
+
+        futures = {
+            executor.submit(_ajustar_candidato, y_np, exog_np, orden, mejor()[0], start): orden
+            for orden, start in pendientes
+        }
+        en_curso = set(futures)
+        while en_curso:
+            espera = max(0, limite - time.time()) if mejor()[1] is not None else None
+            hechos, en_curso = wait(en_curso, timeout=espera, return_when=FIRST_COMPLETED)
+            if not hechos:
+                # Los ajustes en curso se abandonan: el pool se termina al salir
+                agotado = True
+                return
+            for future in hechos:
+                evaluados[futures[future]] = future.result()
+                contadores["ajustados"] += 1
+
+    try:
+        iniciales = _iniciales(d, D, s)
+        mejor_anterior = memo.get("mejor")
+        if mejor_anterior:
+            orden = tuple(int(o) for o in mejor_anterior.split(","))
+            # Solo si es compatible con la diferenciación actual
+            if orden[1] == d and orden[4] == D and orden[6] == s and orden not in iniciales:
+                iniciales.insert(0, orden)
+
+        evaluar(iniciales)
+        while not agotado:
+            actual = mejor()
+            if actual[1] is None:
+                break
+            evaluar(_vecinos(actual[1]))
+            if mejor() == actual:
+                break
+    finally:
+        if executor is not None:
+            if agotado:
+                # No esperar a los ajustes que ya habían empezado
+                terminar_pool(executor)
+            else:
+                executor.shutdown()
+
+    contadores["podados"] = sum(1 for r in evaluados.values() if r["podado"])
+    mejor_aic, orden = mejor()
+    if orden is None:
+        raise ValueError("Ningún orden candidato se pudo ajustar.")
+
+    # --- Memo: los ajustes de otros datos se conservan para arrancar en caliente ---
+    ajustes = dict(anteriores)
+    ajustes.update({
+        _clave(o): dict(r, huella=huella)
+        for o, r in evaluados.items() if r["params"] is not None
+    })
+    _guardar_memo(provincia, producto, {"mejor": _clave(orden), "ajustes": ajustes})
+
+    return {
+        "order": orden[:3],
+        "seasonal_order": orden[3:],
+        "aic": mejor_aic,
+        **contadores,
+        "agotado": agotado,
+        "tiempo": time.time() - inicio,
+    }
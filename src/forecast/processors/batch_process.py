@@ -1,52 +1,211 @@
 # processors/batch_process.py
+import os
+import time
+import functools
 import threading
+from concurrent.futures import as_completed
 from src.analysis.analysis import analisis_estacionaridad
-from src.forecast.train_model import predict_segment
+from src.forecast.train_model import actualizar_segmento
 from src.utils.helpers import get_productos,get_provincias
-from src.forecast.processors.progress import update_progress, init_progress
+from src.utils.pool import crear_pool
+from src.utils.config import BATCH_WORKERS, BATCH_THREADS_PER_WORKER, SELECCION_ESCALONADA
+from src.data_preprocessing.catalog import registrar_modelo_elegido
+from src.utils.dependencies import artefactos_obsoletos
+from src.forecast.forecast_table import precalcular_prediccion, prediccion_al_dia
+from src.forecast.backtest import cargar_backtest, resumen
+from src.forecast.model_registry import (
+    modelos, evaluar_modelo, ordenes_segmento, necesita_nivel_caro, elegir_modelo
+)
+from src.forecast.processors.progress import update_progress, init_progress, reset_progress
 from src.forecast.processors.results import init_results_csv, append_result
+from src.forecast.processors.checkpoints import (
+    ETAPA_ANALISIS, ETAPA_PERSISTENCIA,
+    iniciar_run, finalizar_run, guardar_checkpoint, cargar_checkpoints
+)
 
+def predict_sarimax(provincia, producto):
+    """
+    SARIMAX con exógenas: actualiza el modelo guardado del segmento con los datos
+    nuevos (train_model.actualizar_segmento: ajuste completo solo si no hay modelo
+    o hay deriva, reajuste en caliente cada REFIT_MAX_DIAS) y lee el backtest de ese modelo.
+    Devuelve (mae, rmse, tiempo).
+    """
+    order, seasonal_order = ordenes_segmento(provincia, producto)
+    inicio = time.time()
+    actualizar_segmento(provincia, producto, order, seasonal_order)
+    tiempo = time.time() - inicio
+
+    metricas = cargar_backtest(provincia, producto, "sarimax")
+    if metricas is None:
+        raise ValueError("Serie demasiado corta para el backtest.")
+    return (*resumen(metricas), tiempo)
+
+
+def predict_sinexo(provincia, producto):
+    """SARIMAX sin exógenas (solo backtest, no se guarda como modelo del segmento)."""
+    return evaluar_modelo(provincia, producto, "sarimax_sin_exo")
+
+
+# Modelos del registro que no se evalúan solo con evaluar_modelo
+PREDICTORES = {
+    "sarimax": predict_sarimax,
+    "sarimax_sin_exo": predict_sinexo,
+}
+
+
+def _predictor(nombre):
+    return PREDICTORES.get(nombre) or functools.partial(evaluar_modelo, nombre=nombre)
 
-def procesar_todo():
+
+def _ejecutar_modelo(run_id, provincia, producto, modelo, predict_fn, hechas):
+    """
+    Ajusta y evalúa un modelo, salvo que ya tenga checkpoint en esta ejecución.
+    Devuelve (modelo, mae, rmse, tiempo).
+    """
+    etapa = f"fit:{modelo}"
+    if etapa in hechas:
+        payload = hechas[etapa]
+        return modelo, payload["mae"], payload["rmse"], payload["tiempo"]
+
+    mae, rmse, tiempo = predict_fn(provincia, producto)
+    guardar_checkpoint(run_id, provincia, producto, etapa,
+                       {"mae": mae, "rmse": rmse, "tiempo": tiempo})
+    return modelo, mae, rmse, tiempo
+
+
+def procesar_segmento(run_id, provincia, producto, incremental=True, escalonado=SELECCION_ESCALONADA):
+    """
+    Procesa un segmento (análisis + modelos), saltando las etapas que ya
+    tienen checkpoint en la ejecución run_id.
+    Con incremental=True el análisis solo se repite si stationary.parquet o
+    metadata.json están obsoletos respecto a los datos del segmento.
+    Con escalonado=True los modelos caros (SARIMAX) solo se ajustan si los
+    baratos no bastan (model_registry.necesita_nivel_caro).
+    Devuelve (resultados, elegido, error): la lista de resultados obtenidos
+    (modelo, mae, rmse, tiempo), el modelo elegido y el mensaje de error si
+    alguno falló.
+    """
+    resultados = []
+    try:
+        hechas = cargar_checkpoints(run_id, provincia, producto)
+        pendientes = artefactos_obsoletos(provincia, producto) if incremental else None
+
+        # 1) Análisis
+        analisis_pendiente = (
+            pendientes is None
+            or "stationary" in pendientes
+            or "metadata" in pendientes
+        )
+        if ETAPA_ANALISIS not in hechas and analisis_pendiente:
+            analisis_estacionaridad(provincia, producto)
+            guardar_checkpoint(run_id, provincia, producto, ETAPA_ANALISIS)
+
+        # 2) Entrenamiento + backtest de los modelos registrados: primero los baratos
+        for nombre in modelos("barato"):
+            resultados.append(_ejecutar_modelo(run_id, provincia, producto, nombre, _predictor(nombre), hechas))
+
+        # ... y los caros solo si hacen falta (o siempre, sin selección escalonada)
+        if not escalonado or necesita_nivel_caro(provincia, producto, resultados):
+            for nombre in modelos("caro"):
+                resultados.append(_ejecutar_modelo(run_id, provincia, producto, nombre, _predictor(nombre), hechas))
+
+        # 3) Predicción futura precalculada con el modelo elegido (si no se hizo
+        #    ya con ese modelo y con los datos actuales)
+        elegido = elegir_modelo(resultados)[0]
+        if elegido is not None and not prediccion_al_dia(provincia, producto, elegido):
+            precalcular_prediccion(provincia, producto, modelo=elegido)
+
+    except Exception as e:
+        return resultados, None, str(e)
+
+    return resultados, elegido, None
+
+
+def _registrar_segmento(run_id, provincia, producto, resultados, elegido, error):
+    """Escribe los resultados y el progreso de un segmento (solo desde el proceso principal)."""
+    segmento = f"{provincia} / {producto}"
+
+    for modelo, mae, rmse, tiempo in resultados:
+        append_result(provincia, producto, modelo, mae, rmse, tiempo, elegido=modelo == elegido)
+        if modelo == elegido:
+            registrar_modelo_elegido(provincia, producto, modelo, mae)
+
+    if error is None:
+        update_progress(completed=segmento)
+        guardar_checkpoint(run_id, provincia, producto, ETAPA_PERSISTENCIA)
+    else:
+        update_progress(error=f"{segmento}: {error}")
+
+
+def procesar_todo(workers=BATCH_WORKERS, threads_per_worker=BATCH_THREADS_PER_WORKER,
+                  reanudar=True, incremental=True, escalonado=SELECCION_ESCALONADA):
+    """
+    Procesa todos los segmentos.
+    - workers: número de procesos (None = núcleos disponibles, 1 = secuencial)
+    - threads_per_worker: hilos BLAS/OpenMP permitidos en cada proceso
+    - reanudar: si hay una ejecución sin terminar (p.ej. tras reiniciar el proceso),
+      se continúa saltando los segmentos ya persistidos y al día
+    - incremental: solo se procesan los segmentos con algún artefacto obsoleto
+      (datos nuevos desde el último análisis/entrenamiento)
+    - escalonado: selección escalonada de modelos (ver procesar_segmento)
+    """
     init_progress()
     init_results_csv()   # <-- NUEVO
+    run_id, reanudado = iniciar_run(reanudar)
+    if not reanudado:
+        reset_progress()
     update_progress(status="running", current=None)
-    for provincia in get_provincias():
-        for producto in get_productos(provincia):
-            segmento = f"{provincia} / {producto}"
-            try:
-                update_progress(current=segmento)
-                # 1) Análisis
-                #analisis_estacionaridad(provincia, producto)
-
-                # 2) Entrenamiento + predicción
-                # --- 1) SARIMAX con exógenas ---
-                maesarimax, rmsesarimax, timesarimax = predict_sarimax(provincia, producto)
-                append_result(provincia, producto, "sarimax", maesarimax, rmsesarimax, timesarimax)
-
-                # --- 2) SARIMAX sin exógenas ---
-                maesinexo, rmsesinexo, timesinexo = predict_sinexo(provincia, producto)
-                append_result(provincia, producto, "sarimax_sin_exo", maesinexo, rmsesinexo, timesinexo)
 
-                # --- 3) LSTM ---
-                maelstm, rmselstm, timelstm = predict_lstm(provincia, producto)
-                append_result(provincia, producto, "lstm", maelstm, rmselstm, timelstm)
+    segmentos = [
+        (provincia, producto)
+        for provincia in get_provincias()
+        for producto in get_productos(provincia)
+        if ETAPA_PERSISTENCIA not in cargar_checkpoints(run_id, provincia, producto)
+    ]
 
-                # --- 4) Prophet ---
-                maeprop, rmseprop, timeprop = predict_prop(provincia, producto)
-                append_result(provincia, producto, "prophet", maeprop, rmseprop, timeprop)
+    if incremental:
+        # Los segmentos sin cambios se dan por completados sin lanzar ningún proceso
+        al_dia = [seg for seg in segmentos if not artefactos_obsoletos(*seg)]
+        for provincia, producto in al_dia:
+            _registrar_segmento(run_id, provincia, producto, [], None, None)
+        segmentos = [seg for seg in segmentos if seg not in al_dia]
 
-                update_progress(completed=segmento)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(segmentos)))
 
-            except Exception as e:
-                update_progress(error=f"{segmento}: {str(e)}")
+    if workers == 1:
+        for provincia, producto in segmentos:
+            update_progress(current=f"{provincia} / {producto}")
+            resultados, elegido, error = procesar_segmento(run_id, provincia, producto, incremental, escalonado)
+            _registrar_segmento(run_id, provincia, producto, resultados, elegido, error)
+    else:
+        with crear_pool(workers, threads_per_worker) as executor:
+            futures = {
+                executor.submit(procesar_segmento, run_id, provincia, producto, incremental, escalonado): (provincia, producto)
+                for provincia, producto in segmentos
+            }
+            for hechos, future in enumerate(as_completed(futures), start=1):
+                provincia, producto = futures[future]
+                try:
+                    resultados, elegido, error = future.result()
+                except Exception as e:
+                    # El proceso worker murió o el resultado no se pudo recibir
+                    resultados, elegido, error = [], None, str(e)
+                _registrar_segmento(run_id, provincia, producto, resultados, elegido, error)
+                update_progress(current=f"{hechos}/{len(segmentos)} segmentos")
 
     update_progress(status="finished", current=None)
+    finalizar_run(run_id)
 
-def procesar_todo_background():
+def procesar_todo_background(reanudar=True, incremental=True, escalonado=SELECCION_ESCALONADA):
     """
     Lanza el procesamiento masivo en un hilo en segundo plano.
     Esta función es la que se llamará desde la vista de Streamlit.
     """
-    thread = threading.Thread(target=procesar_todo, daemon=True)
+    thread = threading.Thread(
+        target=procesar_todo,
+        kwargs={"reanudar": reanudar, "incremental": incremental, "escalonado": escalonado},
+        daemon=True
+    )
     thread.start()
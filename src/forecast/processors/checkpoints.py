@@ -0,0 +1,118 @@
+# processors/checkpoints.py
+
+import json
+import time
+import uuid
+from src.utils.dependencies import huella_artefacto
+from src.forecast.processors.progress import get_connection, init_progress
+
+# Etapas de cada segmento dentro de una ejecución del procesamiento masivo.
+# El ajuste y la predicción de cada modelo se hacen juntos, así que se guarda
+# un checkpoint "fit:<modelo>" por modelo con sus métricas.
+ETAPA_ANALISIS = "analysis"
+ETAPA_PERSISTENCIA = "persist"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      TEXT PRIMARY KEY,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    status      TEXT NOT NULL       -- running | finished
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run_id      TEXT NOT NULL,
+    segment     TEXT NOT NULL,
+    stage       TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    payload     TEXT,
+    ts          REAL NOT NULL,
+    PRIMARY KEY (run_id, segment, stage)
+);
+"""
+
+
+def init_checkpoints():
+    """Crea las tablas de ejecuciones y checkpoints si no existen."""
+    init_progress()
+    with get_connection() as conn:
+        conn.executescript(SCHEMA)
+
+
+def huella_segmento(provincia, producto):
+    """
+    Huella de los datos de entrada del segmento (versión en el almacén de precios).
+    Si cambia, los checkpoints anteriores del segmento dejan de ser válidos.
+    """
+    return huella_artefacto(provincia, producto, "original") or "missing"
+
+
+def iniciar_run(reanudar=True):
+    """
+    Devuelve (run_id, reanudado).
+    Si reanudar=True y hay una ejecución sin terminar, se continúa esa misma.
+    """
+    init_checkpoints()
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if reanudar:
+            row = conn.execute(
+                "SELECT run_id FROM runs WHERE status = 'running' ORDER BY started_at DESC LIMIT 1"
+            ).fetchone()
+            if row:
+                conn.execute("COMMIT")
+                return row[0], True
+
+        # Una ejecución nueva deja abandonadas las anteriores sin terminar
+        conn.execute("UPDATE runs SET status = 'abandoned' WHERE status = 'running'")
+        run_id = time.strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:6]
+        conn.execute(
+            "INSERT INTO runs (run_id, started_at, status) VALUES (?, ?, 'running')",
+            (run_id, time.time())
+        )
+        conn.execute("COMMIT")
+    return run_id, False
+
+
+def finalizar_run(run_id):
+    """Marca la ejecución como terminada."""
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "UPDATE runs SET status = 'finished', finished_at = ? WHERE run_id = ?",
+            (time.time(), run_id)
+        )
+        conn.execute("COMMIT")
+
+
+def guardar_checkpoint(run_id, provincia, producto, etapa, payload=None):
+    """Registra que la etapa del segmento se completó en esta ejecución."""
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "INSERT OR REPLACE INTO checkpoints (run_id, segment, stage, fingerprint, payload, ts) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                run_id,
+                f"{provincia} / {producto}",
+                etapa,
+                huella_segmento(provincia, producto),
+                json.dumps(payload) if payload is not None else None,
+                time.time()
+            )
+        )
+        conn.execute("COMMIT")
+
+
+def cargar_checkpoints(run_id, provincia, producto):
+    """
+    Devuelve {etapa: payload} con las etapas ya completadas del segmento en esta
+    ejecución y que siguen al día (misma huella de datos).
+    """
+    huella = huella_segmento(provincia, producto)
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT stage, payload FROM checkpoints "
+            "WHERE run_id = ? AND segment = ? AND fingerprint = ?",
+            (run_id, f"{provincia} / {producto}", huella)
+        ).fetchall()
+    return {stage: json.loads(payload) if payload else None for stage, payload in rows}
@@ -1,37 +1,135 @@
 # processors/progress.py
 
-import json
 import os
-from src.utils.config import PROGRESS_PATH
+import sqlite3
+import time
+from contextlib import contextmanager
+from src.utils.config import PROGRESS_DB_PATH
+
+# El progreso se guarda como un registro de eventos en SQLite (modo WAL):
+# - progress_state: una única fila con el resumen (estado, segmento actual, contadores)
+# - progress_events: un evento por segmento completado o error (solo se añaden filas)
+# Cada actualización es un INSERT/UPDATE de coste constante y varios procesos
+# pueden escribir a la vez sin pisarse.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress_state (
+    id          INTEGER PRIMARY KEY CHECK (id = 1),
+    status      TEXT NOT NULL,
+    current     TEXT,
+    n_completed INTEGER NOT NULL DEFAULT 0,
+    n_errors    INTEGER NOT NULL DEFAULT 0,
+    updated_at  REAL
+);
+CREATE TABLE IF NOT EXISTS progress_events (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts      REAL NOT NULL,
+    kind    TEXT NOT NULL,      -- completed | error
+    segment TEXT,
+    message TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_progress_completed
+    ON progress_events(segment) WHERE kind = 'completed';
+CREATE INDEX IF NOT EXISTS idx_progress_kind ON progress_events(kind, id);
+INSERT OR IGNORE INTO progress_state (id, status, current, n_completed, n_errors, updated_at)
+    VALUES (1, 'idle', NULL, 0, 0, NULL);
+"""
+
+# Evita repetir el CREATE TABLE en cada actualización dentro del mismo proceso
+_inicializado = False
+
+
+@contextmanager
+def get_connection():
+    """
+    Abre una conexión al registro de progreso.
+    Las transacciones se abren explícitamente con BEGIN IMMEDIATE en cada escritura.
+    """
+    conn = sqlite3.connect(PROGRESS_DB_PATH, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA synchronous=NORMAL")
+        yield conn
+    finally:
+        conn.close()
 
 
 def init_progress():
-    """Inicializa el archivo de progreso si no existe."""
-    if not os.path.exists(os.path.dirname(PROGRESS_PATH)):
-        os.makedirs(os.path.dirname(PROGRESS_PATH), exist_ok=True)
-
-    if not os.path.exists(PROGRESS_PATH):
-        data = {
-            "status": "idle",      # idle | running | finished | error
-            "current": None,       # segmento actual "Provincia / Producto"
-            "completed": [],       # lista de segmentos completados
-            "errors": []           # lista de mensajes de error
+    """Inicializa el registro de progreso si no existe."""
+    global _inicializado
+    if _inicializado and os.path.exists(PROGRESS_DB_PATH):
+        return
+
+    if not os.path.exists(os.path.dirname(PROGRESS_DB_PATH)):
+        os.makedirs(os.path.dirname(PROGRESS_DB_PATH), exist_ok=True)
+
+    with get_connection() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+    _inicializado = True
+
+
+def reset_progress():
+    """Vacía el registro de progreso y vuelve al estado inicial."""
+    init_progress()
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM progress_events")
+        conn.execute(
+            "UPDATE progress_state SET status = 'idle', current = NULL, "
+            "n_completed = 0, n_errors = 0, updated_at = ? WHERE id = 1",
+            (time.time(),)
+        )
+        conn.execute("COMMIT")
+
+
+def load_summary(limit=20):
+    """
+    Resumen barato para refrescar la vista: estado, segmento actual, contadores
+    y solo los últimos `limit` completados/errores.
+    """
+    init_progress()
+    with get_connection() as conn:
+        status, current, n_completed, n_errors = conn.execute(
+            "SELECT status, current, n_completed, n_errors FROM progress_state WHERE id = 1"
+        ).fetchone()
+
+        def ultimos(kind, columna):
+            rows = conn.execute(
+                f"SELECT {columna} FROM progress_events WHERE kind = ? ORDER BY id DESC LIMIT ?",
+                (kind, limit)
+            ).fetchall()
+            return [r[0] for r in rows]
+
+        return {
+            "status": status,
+            "current": current,
+            "n_completed": n_completed,
+            "n_errors": n_errors,
+            "last_completed": ultimos("completed", "segment"),
+            "last_errors": ultimos("error", "message"),
         }
-        with open(PROGRESS_PATH, "w") as f:
-            json.dump(data, f, indent=4)
 
 
 def load_progress():
-    """Lee el archivo de progreso."""
+    """Lee el progreso completo (mismo formato que el antiguo progress.json)."""
     init_progress()
-    with open(PROGRESS_PATH, "r") as f:
-        return json.load(f)
-
+    with get_connection() as conn:
+        status, current = conn.execute(
+            "SELECT status, current FROM progress_state WHERE id = 1"
+        ).fetchone()
+        completed = [r[0] for r in conn.execute(
+            "SELECT segment FROM progress_events WHERE kind = 'completed' ORDER BY id"
+        )]
+        errors = [r[0] for r in conn.execute(
+            "SELECT message FROM progress_events WHERE kind = 'error' ORDER BY id"
+        )]
 
-def save_progress(data):
-    """Guarda el archivo de progreso."""
-    with open(PROGRESS_PATH, "w") as f:
-        json.dump(data, f, indent=4)
+    return {
+        "status": status,
+        "current": current,
+        "completed": completed,
+        "errors": errors
+    }
 
 
 def update_progress(status=None, current=None, completed=None, error=None):
@@ -42,19 +140,33 @@ def update_progress(status=None, current=None, completed=None, error=None):
     - completed: string de segmento completado para añadir a la lista
     - error: string de error para añadir a la lista
     """
-    data = load_progress()
+    init_progress()
+    ahora = time.time()
+
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
 
-    if status is not None:
-        data["status"] = status
+        if status is not None:
+            conn.execute("UPDATE progress_state SET status = ? WHERE id = 1", (status,))
 
-    if current is not None:
-        data["current"] = current
+        if current is not None:
+            conn.execute("UPDATE progress_state SET current = ? WHERE id = 1", (current,))
 
-    if completed is not None:
-        if completed not in data["completed"]:
-            data["completed"].append(completed)
+        if completed is not None:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO progress_events (ts, kind, segment) VALUES (?, 'completed', ?)",
+                (ahora, completed)
+            )
+            if cur.rowcount:
+                conn.execute("UPDATE progress_state SET n_completed = n_completed + 1 WHERE id = 1")
 
-    if error is not None:
-        data["errors"].append(error)
+        if error is not None:
+            segmento = error.split(":", 1)[0] if ":" in error else None
+            conn.execute(
+                "INSERT INTO progress_events (ts, kind, segment, message) VALUES (?, 'error', ?, ?)",
+                (ahora, segmento, error)
+            )
+            conn.execute("UPDATE progress_state SET n_errors = n_errors + 1 WHERE id = 1")
 
-    save_progress(data)
\ No newline at end of file
+        conn.execute("UPDATE progress_state SET updated_at = ? WHERE id = 1", (ahora,))
+        conn.execute("COMMIT")
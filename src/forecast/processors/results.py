@@ -3,6 +3,7 @@ import csv
 import os
 
 RESULTS_PATH = "data/model_results.csv"
+COLUMNAS = ["provincia", "producto", "modelo", "mae", "rmse", "tiempo", "elegido"]
 
 def init_results_csv():
     """Crea el CSV si no existe, con cabeceras."""
@@ -11,10 +12,23 @@ def init_results_csv():
     if not os.path.exists(RESULTS_PATH):
         with open(RESULTS_PATH, "w", newline="") as f:
             writer = csv.writer(f)
-            writer.writerow(["provincia", "producto", "modelo", "mae", "rmse", "tiempo"])
+            writer.writerow(COLUMNAS)
+        return
 
-def append_result(provincia, producto, modelo, mae, rmse, tiempo):
+    # CSV anterior sin la columna "elegido": se añade vacía a las filas existentes
+    with open(RESULTS_PATH, newline="") as f:
+        if next(csv.reader(f), COLUMNAS) == COLUMNAS:
+            return
+        f.seek(0)
+        filas = list(csv.reader(f))
+    if filas:
+        with open(RESULTS_PATH, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNAS)
+            writer.writerows(fila + [""] * (len(COLUMNAS) - len(fila)) for fila in filas[1:])
+
+def append_result(provincia, producto, modelo, mae, rmse, tiempo, elegido=False):
     """Añade una fila al CSV de resultados."""
     with open(RESULTS_PATH, "a", newline="") as f:
         writer = csv.writer(f)
-        writer.writerow([provincia, producto, modelo, mae, rmse, tiempo])
+        writer.writerow([provincia, producto, modelo, mae, rmse, tiempo, int(elegido)])
@@ -1,76 +1,66 @@
 import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
 from statsmodels.tsa.statespace.sarimax import SARIMAX
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 import os
-from src.data_exogenous.load_rate import loadRate  # <--- NUEVA CLASE
-from src.data_exogenous.load_bret import get_Bret_for_dates
-from src.data_exogenous.load_holidays import get_festivos_provincia
+import time
+from src.data_exogenous.features import construir_exogenas
+from src.data_preprocessing.data_loader import leer_original
+from src.utils.file_store import load_parquet
 from src.analysis.analysis import _sugerir_parametros_arima
-
-def predict_segment(provincia, producto, order, seasonal_order):
+from src.utils.dependencies import marcar_construido, info_artefacto, huella_artefacto, entradas_al_dia
+from src.forecast.model_store import guardar_modelo, cargar_modelo
+from src.utils.config import REFIT_MAX_DIAS, DRIFT_UMBRAL
+from src.utils.cache import cache_datos
+from src.utils.singleflight import singleflight
+from src.forecast.forecast_table import precalcular_prediccion
+from src.forecast.backtest import backtest_sarimax, guardar_backtest
+
+def _cargar_datos_segmento(provincia, producto):
+    """Lee la serie estacionaria del segmento y construye sus exógenas limpias."""
     # --- Construir ruta del archivo ---
     BASE_PATH = "src/data/segmented"
     ruta = os.path.join(BASE_PATH, provincia, producto, "stationary.parquet")
 
     # --- Leer datos ---
-    df = pd.read_parquet(ruta)
-    df["Fecha"] = pd.to_datetime(df["Fecha"])
+    df = load_parquet(ruta)
     df = df.set_index("Fecha").sort_index()
 
     # Serie dependiente
     y = df["Precio"]
 
-    # --- Cargar tipo de cambio desde la API ---
-    loader = loadRate()
-    tipo_cambio_df = loader.get_rate_for_dates(df.index)
-
-    # --- Cargar precio del petróleo ---
-    df_petroleo = get_Bret_for_dates(df.index)
-
-    # --- Cargar festivos ---
-    festivos_df = get_festivos_provincia(provincia, df.index)
-
-    # --- Construir exógenas ---
-    exog = pd.DataFrame(index=df.index)
-    exog["TipoCambio"] = tipo_cambio_df["TipoCambio"]
-    exog["Petroleo"] = df_petroleo["precio_brent"]
-    exog["Festivo"] = festivos_df["Festivo"]
-
-    # --- LIMPIEZA CRÍTICA ---
-    # Reemplazar inf
-    exog = exog.replace([float("inf"), float("-inf")], pd.NA)
-
-    # Rellenar NaNs hacia adelante y atrás
-    exog = exog.ffill().bfill()
+    # --- Construir exógenas (matriz común del proceso + festivos de la provincia) ---
+    exog = construir_exogenas(provincia, df.index)
 
     # Verificación final
     if exog.isna().sum().sum() > 0:
         raise ValueError("Todavía hay NaNs en exog después de la limpieza.")
 
-    # --- Train/Test split ---
-    train_size = int(len(y) * 0.8)
-    y_train, y_test = y.iloc[:train_size], y.iloc[train_size:]
-    exog_train = exog.iloc[:train_size]
-    exog_test = exog.iloc[train_size:]
+    return y, exog
 
-    # --- Modelo SARIMAX ---
-    model = SARIMAX(
-        y_train,
-        exog=exog_train,
-        order=order,
-        seasonal_order=seasonal_order
-    )
-    results = model.fit()
+
+def _guardar_modelo_y_prediccion(provincia, producto, results, y_test, exog_test, info):
+    """
+    Guarda el modelo (formato compacto, ver model_store), predice el tramo de
+    test y guarda prediccion.parquet. `results` puede ser un SARIMAXResults
+    recién ajustado o un ModeloCompacto extendido.
+    """
+    BASE_PATH = "src/data/segmented"
 
     # --- Guardar modelo entrenado ---
-    model_path = os.path.join(BASE_PATH, provincia, producto, "model.pkl")
-    results.save(model_path)
+    guardar_modelo(provincia, producto, results)
+    marcar_construido(provincia, producto, "model", info=info)
 
     # --- Predicción ---
     pred = results.get_forecast(steps=len(y_test), exog=exog_test)
     pred_mean = pred.predicted_mean
     pred_ci = pred.conf_int()
 
+    # Forzar fechas del tramo de test (el modelo puede no tener frecuencia)
+    pred_mean.index = y_test.index
+    pred_ci.index = y_test.index
+
     # --- Guardar resultados de predicción ---
     df_pred = pd.DataFrame({
         "Real": y_test,
@@ -78,18 +68,148 @@ def predict_segment(provincia, producto, order, seasonal_order):
         "Lower": pred_ci.iloc[:, 0],
         "Upper": pred_ci.iloc[:, 1]
     })
-    #df_pred.to_parquet(os.path.join(BASE_PATH, provincia, producto, "prediccion.parquet"))
+    df_pred.to_parquet(os.path.join(BASE_PATH, provincia, producto, "prediccion.parquet"))
+    marcar_construido(provincia, producto, "prediccion")
 
-    #Predecir sin variables exogenas
-    
-    #predecir LSTM:
+    # --- Predicción futura precalculada para la portada ---
+    precalcular_prediccion(provincia, producto)
+    return df_pred
 
-    #predecir Prophet
 
+def _guardar_backtest_sarimax(provincia, producto, y, exog, results, tiempo_ajuste):
+    """
+    Backtest con origen móvil sobre el tramo de test con el modelo recién
+    guardado (mismo ajuste, sin reajustar); la selección de modelos del batch lo lee.
+    """
+    inicio = time.time()
+    metricas = backtest_sarimax(y, exog, results)
+    if metricas is not None:
+        guardar_backtest(provincia, producto, "sarimax", metricas, tiempo=tiempo_ajuste + time.time() - inicio)
 
-    #calcular para cada predicción los datos de MAE,RMSE y tiempo
-    #Registrar los resultados en un dataset y guardarlo en un csv:
 
+@singleflight("predict_segment")
+def predict_segment(provincia, producto, order, seasonal_order):
+    y, exog = _cargar_datos_segmento(provincia, producto)
+
+    # --- Train/Test split ---
+    train_size = int(len(y) * 0.8)
+    y_train, y_test = y.iloc[:train_size], y.iloc[train_size:]
+    exog_train = exog.iloc[:train_size]
+    exog_test = exog.iloc[train_size:]
+
+    # --- Modelo SARIMAX ---
+    inicio = time.time()
+    model = SARIMAX(
+        y_train,
+        exog=exog_train,
+        order=order,
+        seasonal_order=seasonal_order
+    )
+    results = model.fit()
+    tiempo_ajuste = time.time() - inicio
+
+    # --- Guardar modelo + predicción ---
+    info = {
+        "order": list(order),
+        "seasonal_order": list(seasonal_order),
+        "fecha_fin_train": y_train.index[-1].isoformat(),
+        "ajuste_completo": datetime.now().isoformat(),
+        "modo": "completo"
+    }
+    _guardar_modelo_y_prediccion(provincia, producto, results, y_test, exog_test, info)
+    _guardar_backtest_sarimax(provincia, producto, y, exog, results, tiempo_ajuste)
+
+    # Los demás modelos (sin exógenas, referencias baratas) se comparan en el
+    # batch con el mismo backtest: ver model_registry
+
+
+def actualizar_segmento(provincia, producto, order=None, seasonal_order=None):
+    """
+    Actualiza el modelo guardado con las observaciones nuevas en lugar de
+    reajustarlo desde cero:
+    - "append": añade las observaciones con los parámetros fijos (solo filtrado)
+    - "warm": si la última reoptimización tiene más de REFIT_MAX_DIAS días,
+      reajusta partiendo de los parámetros anteriores
+    Se hace un ajuste completo (predict_segment) si no hay modelo, si cambian los
+    órdenes o si los errores de predicción sobre los datos nuevos indican deriva.
+    Sin observaciones de entrenamiento nuevas no se reescribe nada ("sin_cambios").
+    Devuelve el modo usado: "completo" | "append" | "warm" | "sin_cambios".
+    """
+    info = info_artefacto(provincia, producto, "model")
+
+    if huella_artefacto(provincia, producto, "model") is None or "fecha_fin_train" not in info:
+        if order is None or seasonal_order is None:
+            raise ValueError("No hay modelo previo: hay que indicar order y seasonal_order.")
+        predict_segment(provincia, producto, order, seasonal_order)
+        return "completo"
+
+    order = tuple(order) if order is not None else tuple(info["order"])
+    seasonal_order = tuple(seasonal_order) if seasonal_order is not None else tuple(info["seasonal_order"])
+
+    # --- Reajuste completo por cambio de especificación ---
+    if order != tuple(info["order"]) or seasonal_order != tuple(info["seasonal_order"]):
+        predict_segment(provincia, producto, order, seasonal_order)
+        return "completo"
+
+    y, exog = _cargar_datos_segmento(provincia, producto)
+
+    # --- Train/Test split (mismo criterio que predict_segment) ---
+    train_size = int(len(y) * 0.8)
+    y_train, y_test = y.iloc[:train_size], y.iloc[train_size:]
+    exog_train = exog.iloc[:train_size]
+    exog_test = exog.iloc[train_size:]
+
+    # Observaciones de entrenamiento que el modelo todavía no ha visto
+    fecha_fin = pd.Timestamp(info["fecha_fin_train"])
+    if fecha_fin not in y_train.index:
+        # El histórico ha cambiado por detrás: no se puede extender
+        predict_segment(provincia, producto, order, seasonal_order)
+        return "completo"
+    nuevas = y_train.index > fecha_fin
+
+    if not nuevas.any():
+        # El modelo guardado sigue valiendo: reescribirlo cambiaría su huella y
+        # dejaría obsoleto todo lo que depende de él
+        if not entradas_al_dia(provincia, producto, "model"):
+            # stationary.parquet se rehízo sin días nuevos de entrenamiento
+            marcar_construido(provincia, producto, "model", info=info)
+        return "sin_cambios"
+
+    inicio = time.time()
+    results = cargar_modelo(provincia, producto)
+    # El modelo guardado continúa desde su último estado: solo se filtran las observaciones nuevas
+    results_ext, z = results.extender(
+        y_train[nuevas].to_numpy(),
+        exog=exog_train[nuevas].to_numpy()
+    )
+
+    # --- Detección de deriva: errores de un paso estandarizados en los datos nuevos ---
+    if np.nanmean(z ** 2) > DRIFT_UMBRAL:
+        predict_segment(provincia, producto, order, seasonal_order)
+        return "completo"
+
+    # --- Reoptimización periódica, partiendo de los parámetros anteriores ---
+    ultima_reoptimizacion = datetime.fromisoformat(info["ajuste_completo"])
+    if datetime.now() - ultima_reoptimizacion > timedelta(days=REFIT_MAX_DIAS):
+        results = SARIMAX(
+            y_train,
+            exog=exog_train,
+            order=order,
+            seasonal_order=seasonal_order
+        ).fit(start_params=results.params, disp=False)
+        modo = "warm"
+        info = dict(info, ajuste_completo=datetime.now().isoformat())
+    else:
+        results = results_ext
+        modo = "append"
+
+    tiempo_ajuste = time.time() - inicio
+
+    info = dict(info, fecha_fin_train=y_train.index[-1].isoformat(), modo=modo)
+    _guardar_modelo_y_prediccion(provincia, producto, results, y_test, exog_test, info)
+    # El tramo de test también ha cambiado: el backtest se rehace con el modelo actualizado
+    _guardar_backtest_sarimax(provincia, producto, y, exog, results, tiempo_ajuste)
+    return modo
 
 
 def get_predict(provincia, producto):
@@ -110,10 +230,8 @@ def get_predict(provincia, producto):
 
     return y_test, pred_mean, pred_ci, mae, rmse
 
+@cache_datos("parametros_arima", artefactos=("original",))
 def cargar_metadata(provincia, producto):
-    base_path = f"src/data/segmented/{provincia}/{producto}/"
-    original_path = base_path + "original.parquet" 
-    df_precio = pd.read_parquet(original_path)
-    df_precio['Fecha'] = pd.to_datetime(df_precio['Fecha'])
-    df_precio = df_precio.set_index('Fecha').sort_index()
+    df_precio = leer_original(provincia, producto)
+    df_precio = df_precio.set_index('Fecha')
     return _sugerir_parametros_arima(df_precio['Precio'])
\ No newline at end of file
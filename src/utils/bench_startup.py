@@ -0,0 +1,75 @@
+# bench_startup.py
+#
+# Coste de importación de cada vista en un intérprete nuevo (como en un arranque
+# en frío), con `python -X importtime`. Para cada módulo indica el tiempo total
+# y los paquetes que más pesan (tiempo propio sumado por paquete raíz).
+#
+# Uso (desde la raíz del proyecto):
+#   python -m src.utils.bench_startup                 # todas las vistas
+#   python -m src.utils.bench_startup views.home -n 5 # módulos concretos
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+_LINEA = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+
+
+def vistas():
+    """Módulos de views/ (los que carga app.py al abrir cada página)."""
+    return sorted(
+        f"views.{f[:-3]}" for f in os.listdir("views")
+        if f.endswith(".py") and f != "__init__.py"
+    )
+
+
+def medir_importacion(modulo):
+    """
+    Importa `modulo` en un proceso nuevo.
+    Devuelve (total_ms, {paquete raíz: ms propios}).
+    """
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=os.getcwd())
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr.strip().splitlines()[-1])
+
+    total_us = 0
+    por_paquete = defaultdict(int)
+    for linea in proceso.stderr.splitlines():
+        m = _LINEA.match(linea)
+        if not m:
+            continue
+        propio, acumulado, sangria, nombre = int(m[1]), int(m[2]), m[3], m[4]
+        por_paquete[nombre.split(".")[0]] += propio
+        # Los de primer nivel (sangría mínima) son los importados por `import modulo`
+        if len(sangria) == 1:
+            total_us += acumulado
+
+    return total_us / 1000, {k: v / 1000 for k, v in por_paquete.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coste de importación por módulo (arranque en frío).")
+    parser.add_argument("modulos", nargs="*", help="Módulos a medir (por defecto, todas las vistas)")
+    parser.add_argument("-n", "--top", type=int, default=8, help="Paquetes más costosos a mostrar")
+    args = parser.parse_args(argv)
+
+    for modulo in args.modulos or vistas():
+        try:
+            total, por_paquete = medir_importacion(modulo)
+        except RuntimeError as e:
+            print(f"{modulo:<28} ERROR: {e}")
+            continue
+
+        print(f"{modulo:<28} {total:9.1f} ms")
+        for paquete, ms in sorted(por_paquete.items(), key=lambda x: -x[1])[:args.top]:
+            print(f"    {paquete:<24} {ms:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# cache.py
+#
+# Caché en memoria compartida por todas las sesiones de Streamlit del proceso.
+#
+# - cache_recurso: objetos que se comparten tal cual (p.ej. modelos cargados)
+# - cache_datos: DataFrames y resultados que se devuelven copiados, para que una
+#   sesión no modifique lo que ve otra
+#
+# Las claves incluyen la huella de los artefactos del segmento de los que depende
+# la función (dependencies.huella_artefacto), así que un artefacto reescrito por
+# otro proceso (p.ej. el batch) nunca se sirve desde la caché. Además la ingesta
+# y el entrenamiento llaman a invalidar() para liberar en el acto la memoria de
+# las entradas del segmento. Cada caché tiene un tope de memoria y expulsa las
+# entradas usadas hace más tiempo (LRU).
+
+import copy
+import functools
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from src.utils.config import CACHE_MAX_MB_RECURSOS, CACHE_MAX_MB_DATOS
+
+
+def _tamano(obj):
+    """Estimación de los bytes que ocupa un valor cacheado."""
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        uso = obj.memory_usage(deep=True)
+        return int(uso.sum() if hasattr(uso, "sum") else uso)
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_tamano(o) for o in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_tamano(k) + _tamano(v) for k, v in obj.items())
+    return sys.getsizeof(obj)
+
+
+class _LRU:
+    """Diccionario LRU con tope de memoria."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()   # clave -> (valor, bytes, segmento)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada
+
+    def put(self, clave, valor, tamano, segmento):
+        if tamano > self.max_bytes:
+            # No cabe: no se guarda para no vaciar la caché entera
+            return
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._entradas[clave] = (valor, tamano, segmento)
+            self._bytes += tamano
+            while self._bytes > self.max_bytes:
+                _, (_, liberados, _) = self._entradas.popitem(last=False)
+                self._bytes -= liberados
+
+    def invalidar(self, segmento=None):
+        with self._lock:
+            if segmento is None:
+                self._entradas.clear()
+                self._bytes = 0
+                return
+            for clave in [c for c, e in self._entradas.items() if e[2] == segmento]:
+                self._bytes -= self._entradas.pop(clave)[1]
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "mb": self._bytes / 2**20,
+                "max_mb": self.max_bytes / 2**20,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+            }
+
+
+_recursos = _LRU(CACHE_MAX_MB_RECURSOS * 2**20)
+_datos = _LRU(CACHE_MAX_MB_DATOS * 2**20)
+
+
+def clave_argumento(arg):
+    # Los índices de fechas no son hashables: se resumen por su contenido
+    if isinstance(arg, pd.Index):
+        return ("index", len(arg), hash(pd.util.hash_pandas_object(arg, index=False).to_numpy().tobytes()))
+    if isinstance(arg, list):
+        return tuple(clave_argumento(a) for a in arg)
+    return arg
+
+
+def _cacheado(lru, nombre, artefactos, version, tamano, copiar):
+    def decorador(fn):
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            from src.utils.dependencies import huella_artefacto
+
+            # Las funciones con artefactos reciben (provincia, producto, ...)
+            segmento = (args[0], args[1]) if artefactos else None
+            huellas = tuple(huella_artefacto(*segmento, a) for a in artefactos)
+            clave = (
+                nombre,
+                tuple(clave_argumento(a) for a in args),
+                tuple(sorted((k, clave_argumento(v)) for k, v in kwargs.items())),
+                huellas,
+                version() if version else None,
+            )
+
+            entrada = lru.get(clave)
+            if entrada is not None:
+                valor = entrada[0]
+            else:
+                valor = fn(*args, **kwargs)
+                lru.put(clave, valor, tamano(*args, valor) if tamano else _tamano(valor), segmento)
+            return copy.deepcopy(valor) if copiar else valor
+
+        envoltura.sin_cache = fn
+        return envoltura
+    return decorador
+
+
+def cache_recurso(nombre, artefactos=(), version=None, tamano=None):
+    """
+    Cachea objetos compartidos (se devuelven sin copiar; no hay que modificarlos).
+    - artefactos: artefactos del segmento (args[0], args[1]) de los que depende
+    - version: función sin argumentos cuyo resultado se añade a la clave
+    - tamano: función (*args, valor) -> bytes, para objetos sin estimación directa
+    """
+    return _cacheado(_recursos, nombre, artefactos, version, tamano, copiar=False)
+
+
+def cache_datos(nombre, artefactos=(), version=None):
+    """Cachea datos (DataFrames, dicts...) y devuelve una copia en cada llamada."""
+    return _cacheado(_datos, nombre, artefactos, version, None, copiar=True)
+
+
+def invalidar(provincia=None, producto=None):
+    """Libera las entradas de un segmento (o todas si no se indica)."""
+    segmento = (provincia, producto) if provincia is not None else None
+    _recursos.invalidar(segmento)
+    _datos.invalidar(segmento)
+
+
+def estadisticas():
+    return {"recursos": _recursos.estadisticas(), "datos": _datos.estadisticas()}
@@ -6,5 +6,93 @@ import os
 BASE_PATH = "src/data"
 SEGMENTED_PATH = os.path.join(BASE_PATH, "segmented")
 
-# Archivo de progreso para el procesamiento masivo
-PROGRESS_PATH = os.path.join(BASE_PATH, "progress.json")
\ No newline at end of file
+# Catálogo de segmentos (resumen de datos y artefactos de cada provincia / producto)
+CATALOG_DB_PATH = os.path.join(BASE_PATH, "catalog.db")
+
+# Registro de progreso del procesamiento masivo (SQLite en modo WAL, seguro con varios procesos)
+PROGRESS_DB_PATH = os.path.join(BASE_PATH, "progress.db")
+
+# Procesamiento masivo en paralelo
+# Número de procesos (None = todos los núcleos disponibles)
+BATCH_WORKERS = None
+# Hilos BLAS/OpenMP por proceso, para no sobresuscribir la CPU con los ajustes de statsmodels
+BATCH_THREADS_PER_WORKER = 1
+
+# Actualización incremental de modelos SARIMAX
+# Días máximos entre reoptimizaciones de parámetros (reajuste en caliente)
+REFIT_MAX_DIAS = 30
+# Media de los errores de un paso estandarizados al cuadrado a partir de la cual
+# se considera que hay deriva y se reajusta por completo (≈1 si el modelo sigue bien)
+DRIFT_UMBRAL = 4.0
+
+# Tipo de cambio EUR/USD del BCE
+# Copia local persistente (se refresca de forma incremental)
+RATE_PATH = os.path.join(BASE_PATH, "metadata", "tipo_cambio.parquet")
+# Segundos que la copia local se considera al día antes de consultar la API
+RATE_TTL_SECONDS = 6 * 3600
+# Timeout (segundos) de las peticiones a la API del BCE
+RATE_TIMEOUT = 30
+
+# Calendario de festivos precalculado (fechas × subdivisiones, memory-mapped)
+FESTIVOS_PATH = os.path.join(BASE_PATH, "metadata", "festivos")
+FESTIVOS_INICIO = "2000-01-01"
+FESTIVOS_FIN = "2040-12-31"
+
+# Ingesta por bloques de los CSV de la CNMC
+# Filas leídas del CSV en cada bloque
+INGESTA_CHUNKSIZE = 200_000
+# Filas acumuladas en memoria (todos los segmentos) antes de escribirlas en el almacén
+INGESTA_BUFFER_FILAS = 1_000_000
+
+# Almacén de precios (dataset parquet particionado por producto y año)
+PRECIOS_PATH = os.path.join(BASE_PATH, "precios")
+# Archivos añadidos a una partición antes de compactarlos en uno solo
+PRECIOS_MAX_FRAGMENTOS = 8
+# Filas por row group (ordenadas por provincia y fecha, para poder saltar los que no hacen falta)
+PRECIOS_ROW_GROUP = 8192
+
+# Caché en memoria compartida por las sesiones de Streamlit (tope en MB de cada tipo)
+# Recursos: modelos cargados; datos: DataFrames de segmentos, exógenas y análisis
+CACHE_MAX_MB_RECURSOS = 512
+CACHE_MAX_MB_DATOS = 256
+
+# Segundos que una llamada espera a otra idéntica en curso (predicción, análisis, ajuste)
+SINGLEFLIGHT_TIMEOUT = 600
+
+# Horizonte (días) de las predicciones precalculadas por segmento (el máximo de la portada)
+FORECAST_HORIZONTE_MAX = 120
+
+# Días de histórico real que se dibujan junto a la predicción en la portada
+HOME_DIAS_HISTORICO = 365
+
+# Tabla nacional de predicciones (todos los segmentos, un archivo por día de generación)
+PREDICCION_NACIONAL_PATH = os.path.join(BASE_PATH, "prediccion_nacional")
+
+# Búsqueda automática de órdenes SARIMAX (stepwise por AIC)
+# Órdenes máximos de p, q (no estacionales) y P, Q (estacionales)
+ORDEN_MAX = 3
+ORDEN_MAX_ESTACIONAL = 2
+# Segundos máximos de búsqueda por segmento, ronda inicial incluida (se devuelve el mejor
+# encontrado hasta entonces; solo se supera mientras no se haya ajustado ningún orden)
+ORDEN_PRESUPUESTO = 120
+# Procesos en paralelo (None = núcleos disponibles, 1 = en el propio proceso)
+ORDEN_WORKERS = None
+# Iteraciones del ajuste previo y margen de AIC a partir del cual un candidato se descarta sin terminar de ajustarlo
+ORDEN_MAXITER_PREVIO = 10
+ORDEN_MARGEN_PODA = 10.0
+
+# Backtesting con origen móvil (sobre el tramo de test del 20 % final)
+# Horizonte máximo (días) evaluado desde cada origen y separación entre orígenes
+BACKTEST_HORIZONTE = 28
+BACKTEST_PASO = 1
+
+# Selección escalonada de modelos en el batch: primero los modelos baratos y los
+# caros (SARIMAX) solo si los baratos no bastan
+SELECCION_ESCALONADA = True
+# Margen relativo de MAE: los modelos caros se ajustan si el mejor barato supera en más de
+# este margen al último backtest de SARIMAX del segmento, y solo se eligen si mejoran al
+# mejor barato en más de este margen
+SELECCION_MARGEN = 0.05
+# MAE (backtest) con el que basta un modelo barato cuando el segmento aún no tiene
+# backtest de SARIMAX (None = en ese caso siempre se ajusta SARIMAX)
+SELECCION_MAE_SUFICIENTE = None
@@ -0,0 +1,214 @@
+# dependencies.py
+#
+# Seguimiento de dependencias entre los artefactos de cada segmento:
+#
+#   original (almacén de precios) ──► stationary.parquet ──► model.npz ──► prediccion.parquet
+#                  │              └─► metadata.json          └──────────┐
+#                  └──────────────────────────────────────────────────► forecast.parquet
+#
+# Cada vez que se construye un artefacto se guarda en artifacts.json la huella
+# de sus entradas (mtime + tamaño de los archivos; para "original", la versión
+# del segmento en el índice del almacén de precios). Un artefacto está obsoleto si falta, si alguna
+# de sus entradas ha cambiado desde entonces o si alguna entrada está obsoleta.
+#
+# Si la predicción futura sale de un modelo de referencia (selección del batch,
+# ver model_registry) se construye a partir de stationary.parquet en lugar de
+# model.npz: sus entradas se guardan con ella y, mientras sea así, la cadena del
+# modelo SARIMAX (model.npz, prediccion.parquet) no cuenta como pendiente.
+
+import json
+import os
+from src.utils.config import SEGMENTED_PATH
+from src.data_preprocessing import price_store, catalog
+from src.utils import cache
+
+# "original" no es un archivo del segmento: sus datos están en el almacén de precios
+ARTEFACTOS = {
+    "original": None,
+    "stationary": "stationary.parquet",
+    "metadata": "metadata.json",
+    "model": "model.npz",
+    "prediccion": "prediccion.parquet",
+    "forecast": "forecast.parquet",
+}
+
+# Formatos anteriores que se siguen reconociendo mientras no se migran
+ARTEFACTOS_ANTERIORES = {
+    "model": "model.pkl",
+}
+
+# artefacto -> artefactos de los que depende (en orden topológico)
+DEPENDENCIAS = {
+    "stationary": ("original",),
+    "metadata": ("original",),
+    "model": ("stationary",),
+    "prediccion": ("model",),
+    # Predicción futura precalculada: parte del último precio real
+    "forecast": ("model", "original"),
+}
+
+# Artefactos del modelo SARIMAX del segmento
+CADENA_MODELO = ("model", "prediccion")
+
+MANIFEST_NAME = "artifacts.json"
+
+
+def ruta_artefacto(provincia, producto, nombre):
+    ruta = os.path.join(SEGMENTED_PATH, provincia, producto, ARTEFACTOS[nombre])
+    if nombre in ARTEFACTOS_ANTERIORES and not os.path.exists(ruta):
+        anterior = os.path.join(SEGMENTED_PATH, provincia, producto, ARTEFACTOS_ANTERIORES[nombre])
+        if os.path.exists(anterior):
+            return anterior
+    return ruta
+
+
+def huella_artefacto(provincia, producto, nombre):
+    """Huella del artefacto (mtime_ns-tamaño del archivo) o None si no existe."""
+    if nombre == "original":
+        return price_store.huella_segmento(provincia, producto)
+    try:
+        st = os.stat(ruta_artefacto(provincia, producto, nombre))
+    except FileNotFoundError:
+        return None
+    return f"{st.st_mtime_ns}-{st.st_size}"
+
+
+def _mtime_artefacto(provincia, producto, nombre):
+    if nombre == "original":
+        return price_store.info_segmento(provincia, producto)["ingested_at"]
+    return os.path.getmtime(ruta_artefacto(provincia, producto, nombre))
+
+
+def cargar_manifest(provincia, producto):
+    ruta = os.path.join(SEGMENTED_PATH, provincia, producto, MANIFEST_NAME)
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # Manifest corrupto: se reconstruye todo el segmento
+        return {}
+
+
+def _guardar_manifest(provincia, producto, manifest):
+    ruta = os.path.join(SEGMENTED_PATH, provincia, producto, MANIFEST_NAME)
+    tmp = ruta + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp, ruta)
+
+
+def _entradas(nombre, manifest):
+    """Entradas del artefacto: las registradas al construirlo, si se indicaron, o las de DEPENDENCIAS."""
+    return tuple(manifest.get(nombre, {}).get("entradas", DEPENDENCIAS.get(nombre, ())))
+
+
+def esta_obsoleto(provincia, producto, nombre, manifest=None, _visitados=None):
+    """True si el artefacto hay que (re)construirlo."""
+    if manifest is None:
+        manifest = cargar_manifest(provincia, producto)
+    if _visitados is None:
+        _visitados = {}
+    if nombre in _visitados:
+        return _visitados[nombre]
+
+    huella = huella_artefacto(provincia, producto, nombre)
+    entradas = _entradas(nombre, manifest)
+
+    if huella is None:
+        obsoleto = True
+    elif any(esta_obsoleto(provincia, producto, dep, manifest, _visitados) for dep in entradas):
+        obsoleto = True
+    elif nombre in manifest:
+        registradas = manifest[nombre].get("inputs", {})
+        obsoleto = any(
+            registradas.get(dep) != huella_artefacto(provincia, producto, dep)
+            for dep in entradas
+        )
+    else:
+        # Artefacto anterior al manifest: regla de make (más nuevo que sus entradas)
+        mtime = _mtime_artefacto(provincia, producto, nombre)
+        obsoleto = any(
+            _mtime_artefacto(provincia, producto, dep) > mtime
+            for dep in entradas
+        )
+
+    _visitados[nombre] = obsoleto
+    return obsoleto
+
+
+def entradas_al_dia(provincia, producto, nombre, manifest=None):
+    """
+    True si el artefacto existe y sus entradas directas no han cambiado desde que
+    se construyó, aunque esas entradas estén a su vez obsoletas (p.ej. una
+    predicción hecha con el modelo actual, que aún no se ha reentrenado).
+    """
+    if manifest is None:
+        manifest = cargar_manifest(provincia, producto)
+    if huella_artefacto(provincia, producto, nombre) is None or nombre not in manifest:
+        return False
+    registradas = manifest[nombre].get("inputs", {})
+    return all(
+        registradas.get(dep) == huella_artefacto(provincia, producto, dep)
+        for dep in _entradas(nombre, manifest)
+    )
+
+
+def artefactos_obsoletos(provincia, producto):
+    """
+    Lista de artefactos derivados a reconstruir, en orden de dependencias. La
+    cadena del modelo SARIMAX se omite si la predicción futura no la usa.
+    """
+    manifest = cargar_manifest(provincia, producto)
+    visitados = {}
+    omitidos = CADENA_MODELO if "model" not in _entradas("forecast", manifest) else ()
+    return [
+        nombre for nombre in DEPENDENCIAS
+        if nombre not in omitidos and esta_obsoleto(provincia, producto, nombre, manifest, visitados)
+    ]
+
+
+def marcar_construido(provincia, producto, nombre, info=None, entradas=None):
+    """
+    Registra que el artefacto se acaba de construir a partir del estado actual
+    de sus entradas. `info` permite guardar datos extra (p.ej. fecha del ajuste).
+    `entradas` sustituye a las de DEPENDENCIAS si se construyó a partir de otras
+    (p.ej. la predicción futura de un modelo de referencia).
+    """
+    manifest = cargar_manifest(provincia, producto)
+    entrada = {
+        "inputs": {
+            dep: huella_artefacto(provincia, producto, dep)
+            for dep in (entradas if entradas is not None else DEPENDENCIAS.get(nombre, ()))
+        },
+    }
+    if entradas is not None:
+        entrada["entradas"] = list(entradas)
+    if info is not None:
+        entrada["info"] = info
+    elif "info" in manifest.get(nombre, {}):
+        entrada["info"] = manifest[nombre]["info"]
+    manifest[nombre] = entrada
+    _guardar_manifest(provincia, producto, manifest)
+    catalog.marcar_artefacto(provincia, producto, nombre)
+    cache.invalidar(provincia, producto)
+
+
+def sustituir_huella(provincia, producto, nombre, anterior):
+    """
+    Tras convertir un artefacto a otro formato sin cambiar su contenido, los
+    artefactos que se construyeron con la huella `anterior` pasan a apuntar a
+    la nueva, para que no se consideren obsoletos.
+    """
+    manifest = cargar_manifest(provincia, producto)
+    nueva = huella_artefacto(provincia, producto, nombre)
+    for entrada in manifest.values():
+        if entrada.get("inputs", {}).get(nombre) == anterior:
+            entrada["inputs"][nombre] = nueva
+    _guardar_manifest(provincia, producto, manifest)
+
+
+def info_artefacto(provincia, producto, nombre):
+    """Datos extra guardados al construir el artefacto (o {})."""
+    return cargar_manifest(provincia, producto).get(nombre, {}).get("info", {})
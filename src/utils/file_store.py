@@ -3,8 +3,24 @@ import os
 
 def save_parquet(df, path):
     os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Fecha siempre como timestamp nativo, para que al leer no haya que convertirla
+    if "Fecha" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["Fecha"]):
+        df = df.assign(Fecha=pd.to_datetime(df["Fecha"]))
     df.to_parquet(path, index=False)
 
+def load_parquet(path, inicio=None, fin=None, columns=None):
+    """
+    Lee un parquet con columna Fecha filtrando por rango de fechas (incluido).
+    El filtro se aplica con las estadísticas de los row groups, así que los
+    que quedan fuera del rango no se leen.
+    """
+    filtros = []
+    if inicio is not None:
+        filtros.append(("Fecha", ">=", pd.Timestamp(inicio)))
+    if fin is not None:
+        filtros.append(("Fecha", "<=", pd.Timestamp(fin)))
+    return pd.read_parquet(path, columns=columns, filters=filtros or None)
+
 def save_metadata(metadata, path):
     import json
     os.makedirs(os.path.dirname(path), exist_ok=True)
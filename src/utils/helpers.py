@@ -1,17 +1,21 @@
-import os
+from src.data_preprocessing.price_store import segmentos
+from src.data_preprocessing.catalog import listar_segmentos
 
-SEGMENTED_PATH = "src/data/segmented"
 
-def get_provincias():
-    provincias = sorted([
-        d for d in os.listdir(SEGMENTED_PATH)
-        if os.path.isdir(os.path.join(SEGMENTED_PATH, d))
-    ])
+def _filas_catalogo(con_modelo=False):
+    # Una consulta al catálogo (en memoria mientras no cambie) en vez de recorrer src/data/segmented
+    segmentos()  # reconstruye el catálogo la primera vez si está vacío
+    # Con modelo: el elegido en el batch (aunque no sea SARIMAX) o un model.npz
+    return [s for s in listar_segmentos() if s["modelo_elegido"] or s["has_model"] or not con_modelo]
+
+
+def get_provincias(con_modelo=False):
+    provincias = sorted({s["provincia"] for s in _filas_catalogo(con_modelo)})
     return provincias
 
-def get_productos(provincia):
-    productos = sorted([
-        d for d in os.listdir(os.path.join(SEGMENTED_PATH, provincia))
-        if os.path.isdir(os.path.join(SEGMENTED_PATH, provincia, d))
-    ])
-    return productos
\ No newline at end of file
+def get_productos(provincia, con_modelo=False):
+    productos = sorted(
+        s["producto"] for s in _filas_catalogo(con_modelo)
+        if s["provincia"] == provincia
+    )
+    return productos
@@ -0,0 +1,79 @@
+# pool.py
+#
+# Pool de procesos para los ajustes en paralelo (batch y búsqueda de órdenes).
+
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Variables de entorno que controlan los hilos de BLAS/OpenMP
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+# Referencia al limitador de hilos del proceso worker (debe seguir vivo)
+_thread_limits = None
+
+
+def _init_worker(threads, cola_pids=None):
+    """
+    Inicializa cada proceso del pool limitando los hilos BLAS/OpenMP,
+    para que N procesos × M hilos no superen los núcleos disponibles,
+    y anota su PID en cola_pids (para poder terminarlo con terminar_pool).
+    """
+    global _thread_limits
+    if cola_pids is not None:
+        cola_pids.put(os.getpid())
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+
+    # numpy ya está importado en este punto: limitar también los pools ya creados
+    from threadpoolctl import threadpool_limits
+    _thread_limits = threadpool_limits(limits=threads)
+
+
+class PoolProcesos(ProcessPoolExecutor):
+    """ProcessPoolExecutor que conoce los PID de sus procesos (los anota cada uno al arrancar)."""
+
+    def __init__(self, workers, threads_per_worker):
+        # "spawn" evita hacer fork del servidor de Streamlit (multihilo)
+        contexto = multiprocessing.get_context("spawn")
+        self.cola_pids = contexto.SimpleQueue()
+        super().__init__(
+            max_workers=workers,
+            mp_context=contexto,
+            initializer=_init_worker,
+            initargs=(threads_per_worker, self.cola_pids)
+        )
+
+
+def crear_pool(workers, threads_per_worker):
+    """Pool de `workers` procesos de `threads_per_worker` hilos BLAS cada uno."""
+    return PoolProcesos(workers, threads_per_worker)
+
+
+def terminar_pool(executor):
+    """
+    Cancela las tareas pendientes y termina los procesos del pool, incluidos los
+    que están a mitad de una tarea (shutdown solo cancela las que no han empezado).
+    """
+    # Al ver sus procesos muertos el executor da el pool por roto, cancela lo
+    # pendiente y los recoge: shutdown espera solo a eso, no a las tareas. Mientras
+    # tanto se terminan también los procesos que aún estaban arrancando.
+    cierre = threading.Thread(
+        target=executor.shutdown, kwargs={"wait": True, "cancel_futures": True}, daemon=True
+    )
+    cierre.start()
+    while cierre.is_alive():
+        while not executor.cola_pids.empty():
+            try:
+                os.kill(executor.cola_pids.get(), signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        cierre.join(0.1)
@@ -0,0 +1,81 @@
+# singleflight.py
+#
+# Agrupa las llamadas concurrentes idénticas dentro del proceso: si varias
+# sesiones piden a la vez la misma operación sobre el mismo segmento y con los
+# mismos parámetros, solo la primera la ejecuta y las demás esperan su resultado
+# (o reciben su misma excepción). Las llamadas posteriores, una vez terminada,
+# vuelven a ejecutarse (para reutilizar resultados ya está cache.py).
+
+import copy
+import functools
+import threading
+from src.utils.cache import clave_argumento
+from src.utils.config import SINGLEFLIGHT_TIMEOUT
+
+
+class _Llamada:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.error = None
+        self.esperando = 0
+
+
+_en_curso = {}
+_lock = threading.Lock()
+
+
+def ejecutar(clave, fn, *args, timeout=SINGLEFLIGHT_TIMEOUT, copiar=True, **kwargs):
+    """
+    Ejecuta fn(*args, **kwargs) salvo que ya haya una ejecución en curso con la
+    misma clave; en ese caso espera como mucho `timeout` segundos su resultado.
+    - copiar: los que esperan reciben una copia del resultado (no el mismo objeto)
+    Lanza TimeoutError si la ejecución en curso no termina a tiempo.
+    """
+    with _lock:
+        llamada = _en_curso.get(clave)
+        lider = llamada is None
+        if lider:
+            llamada = _Llamada()
+            _en_curso[clave] = llamada
+        else:
+            llamada.esperando += 1
+
+    if lider:
+        try:
+            llamada.resultado = fn(*args, **kwargs)
+            return llamada.resultado
+        except BaseException as e:
+            llamada.error = e
+            raise
+        finally:
+            with _lock:
+                _en_curso.pop(clave, None)
+            llamada.evento.set()
+
+    if not llamada.evento.wait(timeout):
+        raise TimeoutError(f"Tiempo de espera agotado ({timeout} s) esperando a {clave[0]}")
+    if llamada.error is not None:
+        raise llamada.error
+    return copy.deepcopy(llamada.resultado) if copiar else llamada.resultado
+
+
+def singleflight(operacion, timeout=SINGLEFLIGHT_TIMEOUT, copiar=True):
+    """Decorador: la clave es (operacion, argumentos de la llamada)."""
+    def decorador(fn):
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            clave = (
+                operacion,
+                tuple(clave_argumento(a) for a in args),
+                tuple(sorted((k, clave_argumento(v)) for k, v in kwargs.items())),
+            )
+            return ejecutar(clave, fn, *args, timeout=timeout, copiar=copiar, **kwargs)
+        return envoltura
+    return decorador
+
+
+def en_curso():
+    """Operaciones en curso y cuántas llamadas esperan a cada una."""
+    with _lock:
+        return {clave: llamada.esperando for clave, llamada in _en_curso.items()}
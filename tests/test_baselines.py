@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.forecast import baselines, model_registry
+from src.forecast.model_registry import elegir_modelo, necesita_nivel_caro
+
+N = 200
+HORIZONTE = 10
+ORIGENES = np.array([120, 150, 190])
+
+BASELINES = [
+    baselines.naive,
+    baselines.naive_estacional,
+    baselines.drift,
+    baselines.suavizado_exponencial,
+    baselines.ridge_retardos,
+]
+
+
+@pytest.fixture(scope="module")
+def serie():
+    rng = np.random.default_rng(0)
+    return np.cumsum(rng.normal(0, 1, N + HORIZONTE)) + 0.5 * np.sin(np.arange(N + HORIZONTE) * 2 * np.pi / 7)
+
+
+def test_naive_estacional_y_drift_coinciden_con_el_bucle(serie):
+    estacional = baselines.naive_estacional(serie, None, ORIGENES, HORIZONTE)
+    deriva = baselines.drift(serie, None, ORIGENES, HORIZONTE)
+    for fila, o in enumerate(ORIGENES):
+        for h in range(HORIZONTE):
+            assert estacional[fila, h] == serie[o - 7 + h % 7]
+            pendiente = (serie[o - 1] - serie[0]) / (o - 1)
+            assert deriva[fila, h] == pytest.approx(serie[o - 1] + pendiente * (h + 1))
+    np.testing.assert_array_equal(
+        baselines.naive(serie, None, ORIGENES, HORIZONTE), np.repeat(serie[ORIGENES - 1][:, None], HORIZONTE, axis=1)
+    )
+
+
+@pytest.mark.parametrize("alpha", [0.1, 0.5, 1.0])
+def test_niveles_coinciden_con_la_recursion(serie, alpha):
+    esperado = np.empty(N)
+    esperado[0] = serie[0]
+    for t in range(1, N):
+        esperado[t] = alpha * serie[t] + (1 - alpha) * esperado[t - 1]
+    np.testing.assert_allclose(baselines._niveles(serie[:N], alpha), esperado, rtol=1e-10)
+
+
+def test_ridge_reproduce_una_recurrencia_lineal():
+    # Una sinusoide cumple y[t] = 2 cos(w) y[t-1] - y[t-2]: la predicción recursiva es exacta
+    t = np.arange(N + HORIZONTE)
+    y = 3 + np.sin(t * 2 * np.pi / 11)
+    predicciones = baselines.ridge_retardos(y, None, ORIGENES, HORIZONTE, alpha=1e-9)
+    esperado = np.stack([y[o:o + HORIZONTE] for o in ORIGENES])
+    np.testing.assert_allclose(predicciones, esperado, atol=1e-4)
+
+
+@pytest.mark.parametrize("predictor", BASELINES)
+def test_no_usan_datos_posteriores_al_origen(serie, predictor):
+    # Como en predecir_futuro: los días futuros van como NaN
+    y = serie.copy()
+    y[ORIGENES[-1]:] = np.nan
+    exog = np.ones((len(y), 1))
+    predicciones = predictor(y, exog, ORIGENES, HORIZONTE)
+
+    assert predicciones.shape == (len(ORIGENES), HORIZONTE)
+    assert np.isfinite(predicciones).all()
+    np.testing.assert_allclose(predicciones, predictor(serie, exog, ORIGENES, HORIZONTE))
+
+
+def _resultados(**maes):
+    return [(modelo, mae, mae, 0.0) for modelo, mae in maes.items()]
+
+
+def test_elegir_modelo():
+    # El caro solo gana si mejora al barato en más del margen
+    assert elegir_modelo(_resultados(naive=1.0, drift=0.9, sarimax=0.88), margen=0.05) == ("drift", 0.9)
+    assert elegir_modelo(_resultados(naive=1.0, drift=0.9, sarimax=0.8), margen=0.05) == ("sarimax", 0.8)
+    assert elegir_modelo(_resultados(sarimax=0.8)) == ("sarimax", 0.8)
+    assert elegir_modelo([]) == (None, None)
+
+
+def test_necesita_nivel_caro(monkeypatch):
+    backtests = {}
+    monkeypatch.setattr(model_registry, "cargar_backtest", lambda provincia, producto, nombre: backtests.get(nombre))
+    baratos = _resultados(naive=1.0, drift=0.9)
+
+    # Sin backtest previo de SARIMAX: depende de mae_suficiente
+    assert necesita_nivel_caro("Madrid", "Gasolina", baratos, mae_suficiente=None)
+    assert not necesita_nivel_caro("Madrid", "Gasolina", baratos, mae_suficiente=0.95)
+
+    # Con él: el mejor barato tiene que quedar dentro del margen de SARIMAX
+    backtests["sarimax"] = pd.DataFrame({"horizonte": [1, 2], "mae": [0.8, 0.9], "rmse": [1.0, 1.0]})
+    assert not necesita_nivel_caro("Madrid", "Gasolina", baratos, margen=0.1)
+    assert necesita_nivel_caro("Madrid", "Gasolina", baratos, margen=0.01)
+    assert necesita_nivel_caro("Madrid", "Gasolina", [], margen=0.1)
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils import cache, dependencies
+
+
+@pytest.fixture
+def huellas(monkeypatch):
+    """Cachés vacías; la huella de los artefactos de cada segmento se controla desde el test."""
+    cache.invalidar()
+    huellas = {}
+    monkeypatch.setattr(
+        dependencies, "huella_artefacto",
+        lambda provincia, producto, nombre: huellas.get((provincia, producto, nombre), "1")
+    )
+    yield huellas
+    cache.invalidar()
+
+
+def _contador(decorador):
+    llamadas = []
+
+    @decorador
+    def leer(provincia, producto, dias=10):
+        llamadas.append((provincia, producto, dias))
+        return pd.DataFrame({"Precio": np.arange(dias, dtype=float)})
+
+    return leer, llamadas
+
+
+def test_cache_datos_devuelve_copias(huellas):
+    leer, llamadas = _contador(cache.cache_datos("prueba_copias", artefactos=("original",)))
+
+    df = leer("Madrid", "Gasolina")
+    df.loc[0, "Precio"] = -1.0
+
+    assert leer("Madrid", "Gasolina").loc[0, "Precio"] == 0.0
+    assert len(llamadas) == 1
+
+
+def test_cache_recurso_comparte_el_objeto(huellas):
+    leer, llamadas = _contador(cache.cache_recurso("prueba_recurso", artefactos=("model",)))
+    assert leer("Madrid", "Gasolina") is leer("Madrid", "Gasolina")
+    assert len(llamadas) == 1
+
+
+def test_argumentos_distintos_no_comparten_entrada(huellas):
+    leer, llamadas = _contador(cache.cache_datos("prueba_args", artefactos=("original",)))
+    leer("Madrid", "Gasolina")
+    leer("Madrid", "Gasolina", dias=5)
+    leer("Madrid", "Gasolina", 5)
+    leer("Sevilla", "Gasolina")
+    assert len(llamadas) == 4
+
+
+def test_artefacto_reescrito_no_se_sirve_de_la_cache(huellas):
+    leer, llamadas = _contador(cache.cache_datos("prueba_huella", artefactos=("original",)))
+    leer("Madrid", "Gasolina")
+
+    # Otro proceso reescribió el artefacto: la huella cambia sin pasar por invalidar()
+    huellas[("Madrid", "Gasolina", "original")] = "2"
+    leer("Madrid", "Gasolina")
+    leer("Madrid", "Gasolina")
+    assert len(llamadas) == 2
+
+
+def test_invalidar_solo_el_segmento(huellas):
+    leer, llamadas = _contador(cache.cache_datos("prueba_invalidar", artefactos=("original",)))
+    leer("Madrid", "Gasolina")
+    leer("Sevilla", "Gasolina")
+
+    cache.invalidar("Madrid", "Gasolina")
+    leer("Madrid", "Gasolina")
+    leer("Sevilla", "Gasolina")
+    assert llamadas == [("Madrid", "Gasolina", 10), ("Sevilla", "Gasolina", 10), ("Madrid", "Gasolina", 10)]
+
+
+def test_version_forma_parte_de_la_clave(huellas):
+    version = {"n": 1}
+    leer, llamadas = _contador(cache.cache_datos("prueba_version", version=lambda: version["n"]))
+    leer("Madrid", "Gasolina")
+    version["n"] = 2
+    leer("Madrid", "Gasolina")
+    assert len(llamadas) == 2
+
+
+def test_lru_expulsa_lo_usado_hace_mas_tiempo():
+    lru = cache._LRU(max_bytes=100)
+    lru.put("a", 1, 40, None)
+    lru.put("b", 2, 40, None)
+    lru.get("a")
+    lru.put("c", 3, 40, None)
+
+    assert lru.get("b") is None
+    assert lru.get("a")[0] == 1 and lru.get("c")[0] == 3
+    assert lru.estadisticas()["entradas"] == 2
+
+
+def test_lru_no_guarda_lo_que_no_cabe():
+    lru = cache._LRU(max_bytes=100)
+    lru.put("a", 1, 40, None)
+    lru.put("grande", 2, 500, None)
+    assert lru.get("grande") is None
+    assert lru.get("a")[0] == 1
+
+
+def test_clave_de_indice_de_fechas():
+    fechas = pd.date_range("2024-01-01", periods=10)
+    assert cache.clave_argumento(fechas) == cache.clave_argumento(fechas.copy())
+    assert cache.clave_argumento(fechas) != cache.clave_argumento(fechas[1:])
+    hash(cache.clave_argumento([fechas, 1]))
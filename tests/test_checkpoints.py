@@ -0,0 +1,79 @@
+import pytest
+
+from src.forecast.processors import batch_process, checkpoints, progress
+
+SEGMENTO = ("Madrid", "Gasolina")
+
+
+@pytest.fixture
+def huellas(tmp_path, monkeypatch):
+    """Registro de checkpoints en tmp_path; la huella de datos de cada segmento se controla desde el test."""
+    monkeypatch.setattr(progress, "PROGRESS_DB_PATH", str(tmp_path / "progress.db"))
+    monkeypatch.setattr(progress, "_inicializado", False)
+    huellas = {SEGMENTO: "1-100"}
+    monkeypatch.setattr(
+        checkpoints, "huella_artefacto",
+        lambda provincia, producto, nombre: huellas.get((provincia, producto))
+    )
+    return huellas
+
+
+def test_reanuda_la_ejecucion_sin_terminar(huellas):
+    run_id, reanudado = checkpoints.iniciar_run()
+    assert not reanudado
+
+    assert checkpoints.iniciar_run() == (run_id, True)
+
+    checkpoints.finalizar_run(run_id)
+    nuevo, reanudado = checkpoints.iniciar_run()
+    assert nuevo != run_id and not reanudado
+
+
+def test_sin_reanudar_abandona_la_anterior(huellas):
+    run_id, _ = checkpoints.iniciar_run()
+    checkpoints.guardar_checkpoint(run_id, *SEGMENTO, checkpoints.ETAPA_ANALISIS)
+
+    nuevo, reanudado = checkpoints.iniciar_run(reanudar=False)
+    assert nuevo != run_id and not reanudado
+    assert checkpoints.cargar_checkpoints(nuevo, *SEGMENTO) == {}
+    # La abandonada ya no se reanuda
+    assert checkpoints.iniciar_run() == (nuevo, True)
+
+
+def test_checkpoints_con_payload(huellas):
+    run_id, _ = checkpoints.iniciar_run()
+    checkpoints.guardar_checkpoint(run_id, *SEGMENTO, checkpoints.ETAPA_ANALISIS)
+    checkpoints.guardar_checkpoint(run_id, *SEGMENTO, "fit:naive", {"mae": 0.1, "rmse": 0.2, "tiempo": 1.0})
+
+    assert checkpoints.cargar_checkpoints(run_id, *SEGMENTO) == {
+        checkpoints.ETAPA_ANALISIS: None,
+        "fit:naive": {"mae": 0.1, "rmse": 0.2, "tiempo": 1.0},
+    }
+    assert checkpoints.cargar_checkpoints(run_id, "Sevilla", "Gasolina") == {}
+
+
+def test_datos_nuevos_invalidan_los_checkpoints(huellas):
+    run_id, _ = checkpoints.iniciar_run()
+    checkpoints.guardar_checkpoint(run_id, *SEGMENTO, checkpoints.ETAPA_PERSISTENCIA)
+
+    huellas[SEGMENTO] = "2-110"
+    assert checkpoints.cargar_checkpoints(run_id, *SEGMENTO) == {}
+
+
+def test_reanudar_no_repite_los_modelos_ya_ajustados(huellas):
+    run_id, _ = checkpoints.iniciar_run()
+    llamadas = []
+
+    def predict(provincia, producto):
+        llamadas.append((provincia, producto))
+        return 0.1, 0.2, 1.0
+
+    primero = batch_process._ejecutar_modelo(run_id, *SEGMENTO, "naive", predict, {})
+    # Tras reiniciar el proceso: se continúa la misma ejecución con sus checkpoints
+    run_id, reanudado = checkpoints.iniciar_run()
+    hechas = checkpoints.cargar_checkpoints(run_id, *SEGMENTO)
+    segundo = batch_process._ejecutar_modelo(run_id, *SEGMENTO, "naive", predict, hechas)
+
+    assert reanudado
+    assert primero == segundo == ("naive", 0.1, 0.2, 1.0)
+    assert llamadas == [SEGMENTO]
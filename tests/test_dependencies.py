@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from src.data_preprocessing import catalog, price_store
+from src.utils import dependencies
+from src.utils.dependencies import artefactos_obsoletos, entradas_al_dia, marcar_construido
+
+PROVINCIA, PRODUCTO = "Madrid", "Gasolina"
+DERIVADOS = ["stationary", "metadata", "model", "prediccion", "forecast"]
+
+
+@pytest.fixture
+def segmento(tmp_path, monkeypatch):
+    """Segmento en tmp_path; la versión de sus datos en el almacén se controla desde el test."""
+    monkeypatch.setattr(dependencies, "SEGMENTED_PATH", str(tmp_path))
+    monkeypatch.setattr(catalog, "CATALOG_DB_PATH", str(tmp_path / "catalog.db"))
+    monkeypatch.setattr(catalog, "_inicializado", False)
+    datos = {"huella": "1-100", "ingested_at": 0.0}
+    monkeypatch.setattr(price_store, "huella_segmento", lambda provincia, producto: datos["huella"])
+    monkeypatch.setattr(price_store, "info_segmento", lambda provincia, producto: {"ingested_at": datos["ingested_at"]})
+    (tmp_path / PROVINCIA / PRODUCTO).mkdir(parents=True)
+    return datos
+
+
+def _construir(nombre, contenido="x", entradas=None):
+    with open(dependencies.ruta_artefacto(PROVINCIA, PRODUCTO, nombre), "w") as f:
+        f.write(contenido)
+    marcar_construido(PROVINCIA, PRODUCTO, nombre, entradas=entradas)
+
+
+def _construir_todo():
+    for nombre in DERIVADOS:
+        _construir(nombre)
+
+
+def test_sin_artefactos_todo_pendiente(segmento):
+    assert artefactos_obsoletos(PROVINCIA, PRODUCTO) == DERIVADOS
+
+
+def test_construidos_al_dia(segmento):
+    _construir_todo()
+    assert artefactos_obsoletos(PROVINCIA, PRODUCTO) == []
+
+
+def test_datos_nuevos_invalidan_toda_la_cadena(segmento):
+    _construir_todo()
+    segmento["huella"] = "2-110"
+    assert artefactos_obsoletos(PROVINCIA, PRODUCTO) == DERIVADOS
+
+
+def test_modelo_nuevo_invalida_solo_lo_que_depende_de_el(segmento):
+    _construir_todo()
+    _construir("model", contenido="modelo reentrenado")
+    assert artefactos_obsoletos(PROVINCIA, PRODUCTO) == ["prediccion", "forecast"]
+
+
+def test_prediccion_de_referencia_omite_la_cadena_del_modelo(segmento):
+    _construir("stationary")
+    _construir("metadata")
+    _construir("forecast", entradas=("stationary", "original"))
+
+    # Sin model.npz ni prediccion.parquet: no cuentan mientras la predicción no los use
+    assert artefactos_obsoletos(PROVINCIA, PRODUCTO) == []
+
+    segmento["huella"] = "2-110"
+    assert artefactos_obsoletos(PROVINCIA, PRODUCTO) == ["stationary", "metadata", "forecast"]
+
+
+def test_entradas_al_dia_aunque_la_entrada_este_obsoleta(segmento):
+    _construir_todo()
+    _construir("stationary", contenido="datos nuevos")
+
+    # El modelo está obsoleto (stationary cambió), pero la predicción es la de ese modelo
+    assert "model" in artefactos_obsoletos(PROVINCIA, PRODUCTO)
+    assert entradas_al_dia(PROVINCIA, PRODUCTO, "prediccion")
+    assert not entradas_al_dia(PROVINCIA, PRODUCTO, "model")
+
+
+def test_artefacto_sin_manifest_compara_fechas(segmento):
+    ruta = dependencies.ruta_artefacto(PROVINCIA, PRODUCTO, "stationary")
+    with open(ruta, "w") as f:
+        f.write("x")
+    os.utime(ruta, (1000, 1000))
+
+    segmento["ingested_at"] = 500.0
+    assert "stationary" not in artefactos_obsoletos(PROVINCIA, PRODUCTO)
+    segmento["ingested_at"] = 2000.0
+    assert "stationary" in artefactos_obsoletos(PROVINCIA, PRODUCTO)
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from src.forecast import kalman, model_store
+from src.forecast.model_store import ModeloCompacto
+
+N = 240
+AJUSTE = 200
+PASOS = 30
+
+ESPECIFICACIONES = [
+    dict(order=(1, 0, 1)),
+    dict(order=(1, 0, 1), seasonal_order=(1, 0, 0, 7)),
+    dict(order=(2, 1, 1), seasonal_order=(1, 1, 1, 7)),
+    dict(order=(1, 0, 1), measurement_error=True),
+    # Tendencia: no es lineal invariante, predice con statsmodels
+    dict(order=(1, 0, 0), trend="c"),
+]
+
+
+@pytest.fixture(scope="module")
+def datos():
+    rng = np.random.default_rng(0)
+    fechas = pd.date_range("2024-01-01", periods=N, freq="D")
+    exog = pd.DataFrame({
+        "TipoCambio": 1.1 + np.cumsum(rng.normal(0, 0.01, N)),
+        "Festivo": (np.arange(N) % 7 == 6).astype(float),
+    }, index=fechas)
+    ruido = rng.normal(0, 0.1, N)
+    y = np.zeros(N)
+    for t in range(1, N):
+        y[t] = 0.6 * y[t - 1] + ruido[t] + 0.3 * ruido[t - 1]
+    y = pd.Series(y + 0.5 * exog["TipoCambio"] - 0.2 * exog["Festivo"], index=fechas, name="y")
+    return y, exog
+
+
+def _ajustar(datos, con_exogenas, **kwds):
+    y, exog = datos
+    exog = exog.iloc[:AJUSTE] if con_exogenas else None
+    return SARIMAX(y.iloc[:AJUSTE], exog=exog, **kwds).fit(disp=False)
+
+
+def _exog_futuras(datos, con_exogenas, desde=AJUSTE):
+    return datos[1].iloc[desde:desde + PASOS] if con_exogenas else None
+
+
+@pytest.mark.parametrize("con_exogenas", [True, False])
+@pytest.mark.parametrize("kwds", ESPECIFICACIONES)
+def test_get_forecast_coincide_con_statsmodels(datos, kwds, con_exogenas):
+    results = _ajustar(datos, con_exogenas, **kwds)
+    modelo = ModeloCompacto.desde_resultados(results)
+    assert (modelo.sistema is None) == ("trend" in kwds)
+
+    exog = _exog_futuras(datos, con_exogenas)
+    esperado = results.get_forecast(PASOS, exog=exog)
+    obtenido = modelo.get_forecast(PASOS, exog=exog)
+
+    np.testing.assert_allclose(obtenido.predicted_mean, esperado.predicted_mean, rtol=1e-6, atol=1e-8)
+    for alpha in (0.05, 0.2):
+        np.testing.assert_allclose(
+            obtenido.conf_int(alpha=alpha).to_numpy(),
+            esperado.conf_int(alpha=alpha).to_numpy(),
+            rtol=1e-6, atol=1e-8
+        )
+
+
+@pytest.mark.parametrize("con_exogenas", [True, False])
+@pytest.mark.parametrize("kwds", ESPECIFICACIONES)
+def test_extender_coincide_con_append(datos, kwds, con_exogenas):
+    y, exog = datos
+    results = _ajustar(datos, con_exogenas, **kwds)
+    nuevos = slice(AJUSTE, N - PASOS)
+    exog_nuevas = exog.iloc[nuevos] if con_exogenas else None
+
+    anexado = results.append(y.iloc[nuevos], exog=exog_nuevas)
+    extendido, errores = ModeloCompacto.desde_resultados(results).extender(
+        y.iloc[nuevos], exog_nuevas.to_numpy() if con_exogenas else None
+    )
+
+    assert extendido.nobs == anexado.nobs
+    np.testing.assert_allclose(extendido.llf, anexado.llf, rtol=1e-8)
+    np.testing.assert_allclose(extendido.aic, anexado.aic, rtol=1e-8)
+    np.testing.assert_allclose(
+        errores, anexado.filter_results.standardized_forecasts_error[0, AJUSTE:], rtol=1e-6, atol=1e-6
+    )
+
+    futuras = _exog_futuras(datos, con_exogenas, desde=N - PASOS)
+    esperado = anexado.get_forecast(PASOS, exog=futuras)
+    obtenido = extendido.get_forecast(PASOS, exog=futuras)
+    np.testing.assert_allclose(obtenido.predicted_mean, esperado.predicted_mean, rtol=1e-6, atol=1e-8)
+    np.testing.assert_allclose(obtenido.conf_int().to_numpy(), esperado.conf_int().to_numpy(), rtol=1e-6, atol=1e-8)
+
+
+@pytest.mark.parametrize("con_exogenas", [True, False])
+def test_predecir_medias_coincide_con_predecir(datos, con_exogenas):
+    y, exog = datos
+    results = _ajustar(datos, con_exogenas, order=(1, 0, 1), seasonal_order=(1, 0, 0, 7))
+    modelo = ModeloCompacto.desde_resultados(results)
+
+    origenes = np.array([0, 5, 9])
+    exog_resto = exog.iloc[AJUSTE:].to_numpy() if con_exogenas else None
+    filtrado = modelo.filtrar(y.iloc[AJUSTE:], exog_resto)
+    estados = filtrado.predicted_state[:, origenes].T
+    futuras = (
+        np.stack([exog_resto[o:o + PASOS] for o in origenes]) if con_exogenas else None
+    )
+
+    medias = kalman.predecir_medias(modelo.sistema, estados, PASOS, futuras)
+    for fila, o in enumerate(origenes):
+        media, _ = kalman.predecir(
+            modelo.sistema, estados[fila], filtrado.predicted_state_cov[:, :, o], PASOS,
+            futuras[fila] if con_exogenas else None
+        )
+        np.testing.assert_allclose(medias[fila], media, rtol=1e-10)
+
+
+def test_guardar_y_cargar_modelo(datos, tmp_path, monkeypatch):
+    monkeypatch.setattr(model_store, "SEGMENTED_PATH", str(tmp_path))
+    (tmp_path / "Madrid" / "Gasolina").mkdir(parents=True)
+
+    results = _ajustar(datos, True, order=(1, 0, 1), seasonal_order=(1, 0, 0, 7))
+    model_store.guardar_modelo("Madrid", "Gasolina", results)
+    cargado = model_store.cargar_modelo("Madrid", "Gasolina")
+
+    assert cargado.sistema is not None
+    exog = _exog_futuras(datos, True)
+    np.testing.assert_allclose(
+        cargado.get_forecast(PASOS, exog=exog).predicted_mean,
+        results.get_forecast(PASOS, exog=exog).predicted_mean,
+        rtol=1e-6, atol=1e-8
+    )
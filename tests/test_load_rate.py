@@ -0,0 +1,124 @@
+import http.server
+import threading
+import urllib.parse
+
+import pandas as pd
+import pytest
+
+from src.data_exogenous.load_rate import loadRate
+
+
+class ServidorBCE(http.server.BaseHTTPRequestHandler):
+    """Sustituto local de la API del BCE (mismo formato csvdata)."""
+
+    fechas = pd.bdate_range("2024-01-01", "2024-03-29")
+    # "ok" | "ilegible" (200 con un cuerpo que no es el CSV) | "error" (500)
+    modo = "ok"
+    peticiones = []
+
+    def do_GET(self):
+        consulta = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        type(self).peticiones.append(consulta)
+
+        if self.modo == "error":
+            self._responder(500, b"error")
+            return
+        if self.modo == "ilegible":
+            self._responder(200, b"<html>mantenimiento</html>")
+            return
+
+        fechas = self.fechas
+        if "startPeriod" in consulta:
+            fechas = fechas[fechas >= pd.Timestamp(consulta["startPeriod"][0])]
+            if len(fechas) == 0:
+                self._responder(404, b"No results found.")
+                return
+        lineas = ["KEY,FREQ,CURRENCY,TIME_PERIOD,OBS_VALUE"] + [
+            f"EXR.D.USD,D,USD,{f.date()},{1 + i / 1000:.4f}" for i, f in enumerate(fechas)
+        ]
+        self._responder(200, ("\n".join(lineas) + "\n").encode())
+
+    def _responder(self, codigo, cuerpo):
+        self.send_response(codigo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    monkeypatch.setattr(ServidorBCE, "peticiones", [])
+    monkeypatch.setattr(ServidorBCE, "modo", "ok")
+    monkeypatch.setattr(ServidorBCE, "fechas", ServidorBCE.fechas)
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ServidorBCE)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}/service/data/EXR/D.USD.EUR.SP00.A?format=csvdata"
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture(autouse=True)
+def sin_copia_compartida(monkeypatch):
+    monkeypatch.setattr(loadRate, "_df_compartido", None)
+    monkeypatch.setattr(loadRate, "_cargado_en", 0.0)
+
+
+def _cargador(url, tmp_path, ttl=3600):
+    return loadRate(url=url, ruta=str(tmp_path / "tipo_cambio.parquet"), ttl=ttl, timeout=5)
+
+
+def test_primera_carga_descarga_todo_y_guarda_copia(servidor, tmp_path):
+    df = _cargador(servidor, tmp_path).load()
+
+    assert len(df) == len(ServidorBCE.fechas)
+    assert list(df.columns) == ["TipoCambio"]
+    assert ServidorBCE.peticiones == [{"format": ["csvdata"]}]
+    assert (tmp_path / "tipo_cambio.parquet").exists()
+
+
+def test_dentro_del_ttl_no_consulta_la_api(servidor, tmp_path):
+    _cargador(servidor, tmp_path).load()
+    _cargador(servidor, tmp_path).load()
+    assert len(ServidorBCE.peticiones) == 1
+
+    # Otro proceso (sin copia en memoria) usa la copia en disco si está al día
+    loadRate._df_compartido = None
+    _cargador(servidor, tmp_path).load()
+    assert len(ServidorBCE.peticiones) == 1
+
+
+def test_refresco_incremental_pide_solo_los_dias_nuevos(servidor, tmp_path):
+    _cargador(servidor, tmp_path).load()
+    ultimo = ServidorBCE.fechas[-1]
+    ServidorBCE.fechas = pd.bdate_range("2024-01-01", "2024-04-12")
+
+    df = _cargador(servidor, tmp_path, ttl=0).load()
+
+    desde = ServidorBCE.peticiones[-1]["startPeriod"]
+    assert desde == [(ultimo + pd.Timedelta(days=1)).strftime("%Y-%m-%d")]
+    assert df.index.max() == pd.Timestamp("2024-04-12")
+    assert df.index.is_unique and df.index.is_monotonic_increasing
+
+
+def test_sin_dias_nuevos_conserva_los_datos(servidor, tmp_path):
+    anterior = _cargador(servidor, tmp_path).load()
+    df = _cargador(servidor, tmp_path, ttl=0).load()
+    pd.testing.assert_frame_equal(df, anterior)
+
+
+@pytest.mark.parametrize("modo", ["error", "ilegible"])
+def test_fallo_de_la_api_usa_la_copia_local(servidor, tmp_path, modo):
+    anterior = _cargador(servidor, tmp_path).load()
+    ServidorBCE.modo = modo
+
+    df = _cargador(servidor, tmp_path, ttl=0).load(forzar=True)
+    pd.testing.assert_frame_equal(df, anterior)
+
+
+def test_fallo_sin_copia_local_se_propaga(servidor, tmp_path):
+    ServidorBCE.modo = "error"
+    with pytest.raises(Exception):
+        _cargador(servidor, tmp_path).load()
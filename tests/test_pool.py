@@ -0,0 +1,25 @@
+import multiprocessing
+import time
+
+from src.utils.pool import crear_pool, terminar_pool
+
+
+def test_terminar_pool_no_espera_a_las_tareas_en_curso():
+    executor = crear_pool(2, 1)
+    futures = [executor.submit(time.sleep, 60) for _ in range(4)]
+    # Los dos procesos ya están a mitad de una tarea
+    limite = time.time() + 30
+    while sum(f.running() for f in futures) < 2 and time.time() < limite:
+        time.sleep(0.05)
+
+    inicio = time.time()
+    terminar_pool(executor)
+
+    assert time.time() - inicio < 10
+    assert multiprocessing.active_children() == []
+    assert all(f.done() for f in futures)
+
+
+def test_pool_devuelve_resultados():
+    with crear_pool(2, 1) as executor:
+        assert list(executor.map(abs, [-1, -2, 3])) == [1, 2, 3]
@@ -0,0 +1,149 @@
+import glob
+import os
+
+import pandas as pd
+import pytest
+
+from src.data_preprocessing import catalog, price_store
+
+
+@pytest.fixture
+def almacen(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_store, "PRECIOS_PATH", str(tmp_path / "precios"))
+    monkeypatch.setattr(price_store, "SEGMENTED_PATH", str(tmp_path / "segmented"))
+    monkeypatch.setattr(price_store, "_catalogo_comprobado", False)
+    monkeypatch.setattr(catalog, "CATALOG_DB_PATH", str(tmp_path / "catalog.db"))
+    monkeypatch.setattr(catalog, "_inicializado", False)
+    monkeypatch.setattr(catalog, "_cache", {"version": None, "segmentos": None})
+    return tmp_path
+
+
+def _precios(fechas, precio, provincia="Madrid", producto="Gasolina"):
+    return pd.DataFrame({"Provincia": provincia, "Producto": producto, "Fecha": fechas, "Precio": precio})
+
+
+def _fragmentos(almacen, producto="Gasolina"):
+    return glob.glob(str(almacen / "precios" / f"producto={producto}" / "anio=*" / "part-*.parquet"))
+
+
+FECHAS = pd.date_range("2023-12-20", periods=20, freq="D")
+
+
+def test_camino_rapido_no_lee_el_historico(almacen, monkeypatch):
+    price_store.guardar_precios(_precios(FECHAS[:10], 1.0))
+
+    def no_leer(*args, **kwargs):
+        raise AssertionError("el camino rápido no debería leer el segmento")
+
+    with monkeypatch.context() as m:
+        m.setattr(price_store, "leer_segmento", no_leer)
+        price_store.guardar_precios(_precios(FECHAS[10:], 2.0))
+
+    info = catalog.info_segmento("Madrid", "Gasolina")
+    assert info["filas"] == 20
+    assert (info["fecha_inicio"], info["fecha_fin"]) == ("2023-12-20", "2024-01-08")
+    assert info["solapado"] == 0
+
+    df = price_store.leer_segmento("Madrid", "Gasolina")
+    assert df["Fecha"].tolist() == list(FECHAS)
+
+
+def test_solape_recuenta_filas_y_gana_el_ultimo_lote(almacen):
+    price_store.guardar_precios(_precios(FECHAS[:15], 1.0))
+    price_store.guardar_precios(_precios(FECHAS[10:], 2.0))
+
+    info = catalog.info_segmento("Madrid", "Gasolina")
+    assert info["filas"] == 20
+    assert info["solapado"] == 1
+
+    df = price_store.leer_segmento("Madrid", "Gasolina")
+    assert df["Fecha"].is_unique and df["Fecha"].is_monotonic_increasing
+    assert df["Precio"].tolist() == [1.0] * 10 + [2.0] * 10
+
+
+def test_fechas_anteriores_sin_repetir(almacen):
+    price_store.guardar_precios(_precios(FECHAS[10:], 2.0))
+    price_store.guardar_precios(_precios(FECHAS[:10], 1.0))
+
+    assert catalog.info_segmento("Madrid", "Gasolina")["fecha_inicio"] == "2023-12-20"
+    df = price_store.leer_segmento("Madrid", "Gasolina")
+    assert df["Fecha"].tolist() == list(FECHAS)
+
+
+def test_lectura_por_rango_y_columnas(almacen):
+    price_store.guardar_precios(_precios(FECHAS, 1.0))
+
+    df = price_store.leer_segmento("Madrid", "Gasolina", inicio="2024-01-01", fin="2024-01-03", columnas=["Fecha"])
+    assert list(df.columns) == ["Fecha"]
+    assert df["Fecha"].tolist() == list(pd.date_range("2024-01-01", "2024-01-03"))
+    assert price_store.ultimo_precio("Madrid", "Gasolina") == (FECHAS[-1], 1.0)
+
+
+def test_compactar_particion_un_archivo_y_quita_el_solape(almacen):
+    price_store.guardar_precios(_precios(FECHAS[:15], 1.0))
+    price_store.guardar_precios(_precios(FECHAS[10:], 2.0))
+    price_store.guardar_precios(_precios(FECHAS[5:8], 3.0, provincia="Sevilla"))
+    antes = price_store.leer_segmento("Madrid", "Gasolina")
+
+    price_store.compactar()
+
+    # Una partición por año, cada una con un solo archivo
+    assert len(_fragmentos(almacen)) == 2
+    assert catalog.info_segmento("Madrid", "Gasolina")["solapado"] == 0
+    pd.testing.assert_frame_equal(price_store.leer_segmento("Madrid", "Gasolina"), antes)
+    assert price_store.leer_segmento("Sevilla", "Gasolina")["Precio"].tolist() == [3.0] * 3
+
+
+def test_compactacion_automatica(almacen, monkeypatch):
+    monkeypatch.setattr(price_store, "PRECIOS_MAX_FRAGMENTOS", 2)
+    for inicio in range(0, 8, 2):
+        price_store.guardar_precios(_precios(FECHAS[12 + inicio:14 + inicio], float(inicio)))
+
+    assert len(_fragmentos(almacen)) <= 2
+    assert len(price_store.leer_segmento("Madrid", "Gasolina")) == 8
+
+
+def test_las_lecturas_no_migran(almacen):
+    ruta = almacen / "segmented" / "Madrid" / "Gasolina" / "original.parquet"
+    ruta.parent.mkdir(parents=True)
+    _precios(FECHAS, 1.0)[["Fecha", "Precio"]].to_parquet(ruta)
+
+    assert price_store.segmentos() == []
+    assert ruta.exists()
+    assert price_store.segmentos_sin_migrar() == [str(ruta)]
+
+
+def test_migrar_segmentos_conserva_los_originales(almacen):
+    for provincia in ("Madrid", "Sevilla"):
+        ruta = almacen / "segmented" / provincia / "Gasolina" / "original.parquet"
+        ruta.parent.mkdir(parents=True)
+        _precios(FECHAS, 1.0)[["Fecha", "Precio"]].to_parquet(ruta)
+
+    assert price_store.migrar_segmentos() == 2
+
+    assert price_store.segmentos() == [("Madrid", "Gasolina"), ("Sevilla", "Gasolina")]
+    assert price_store.segmentos_sin_migrar() == []
+    migrados = glob.glob(str(almacen / "segmented" / "*" / "*" / "original.parquet.migrated"))
+    assert len(migrados) == 2
+    assert price_store.leer_segmento("Sevilla", "Gasolina")["Fecha"].tolist() == list(FECHAS)
+
+    # Volver a ejecutarla no importa nada
+    assert price_store.migrar_segmentos() == 0
+    assert catalog.info_segmento("Madrid", "Gasolina")["filas"] == 20
+
+
+def test_catalogo_vacio_se_reconstruye(almacen, monkeypatch):
+    price_store.guardar_precios(_precios(FECHAS[:15], 1.0))
+    price_store.guardar_precios(_precios(FECHAS[10:], 2.0))
+
+    # Otro proceso, con la base de datos del catálogo borrada
+    for ruta in glob.glob(catalog.CATALOG_DB_PATH + "*"):
+        os.remove(ruta)
+    monkeypatch.setattr(price_store, "_catalogo_comprobado", False)
+    monkeypatch.setattr(catalog, "_inicializado", False)
+    monkeypatch.setattr(catalog, "_cache", {"version": None, "segmentos": None})
+
+    info = price_store.info_segmento("Madrid", "Gasolina")
+    assert info["filas"] == 20
+    # Las particiones aún tienen varios archivos
+    assert info["solapado"] == 1
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from src.utils import singleflight as sf
+
+
+class Operacion:
+    """Función lenta controlada desde el test: no termina hasta que se libera."""
+
+    def __init__(self, error=None):
+        self.llamadas = 0
+        self.empezada = threading.Event()
+        self.liberar = threading.Event()
+        self.error = error
+
+    def __call__(self, provincia, producto):
+        self.llamadas += 1
+        self.empezada.set()
+        assert self.liberar.wait(5)
+        if self.error is not None:
+            raise self.error
+        return {"segmento": [provincia, producto]}
+
+
+def _lanzar(fn, n, *args):
+    """Lanza n hilos que llaman a fn(*args); devuelve (hilos, resultados)."""
+    resultados = [None] * n
+
+    def llamar(i):
+        try:
+            resultados[i] = fn(*args)
+        except Exception as e:
+            resultados[i] = e
+
+    hilos = [threading.Thread(target=llamar, args=(i,)) for i in range(n)]
+    for h in hilos:
+        h.start()
+    return hilos, resultados
+
+
+def _esperar_a(clave_operacion, esperando):
+    """Espera a que haya `esperando` llamadas esperando a la operación en curso."""
+    limite = time.time() + 5
+    while time.time() < limite:
+        if any(c[0] == clave_operacion and n == esperando for c, n in sf.en_curso().items()):
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"no hay {esperando} llamadas esperando")
+
+
+def test_llamadas_concurrentes_se_ejecutan_una_vez():
+    operacion = Operacion()
+    fn = sf.singleflight("prueba_una_vez")(operacion)
+
+    hilos, resultados = _lanzar(fn, 4, "Madrid", "Gasolina")
+    _esperar_a("prueba_una_vez", 3)
+    operacion.liberar.set()
+    for h in hilos:
+        h.join()
+
+    assert operacion.llamadas == 1
+    assert all(r == {"segmento": ["Madrid", "Gasolina"]} for r in resultados)
+    # Los que esperan reciben copias, no el mismo objeto
+    assert len({id(r) for r in resultados}) == 4
+    assert sf.en_curso() == {}
+
+
+def test_sin_copia_comparten_el_resultado():
+    operacion = Operacion()
+    fn = sf.singleflight("prueba_sin_copia", copiar=False)(operacion)
+
+    hilos, resultados = _lanzar(fn, 3, "Madrid", "Gasolina")
+    _esperar_a("prueba_sin_copia", 2)
+    operacion.liberar.set()
+    for h in hilos:
+        h.join()
+
+    assert len({id(r) for r in resultados}) == 1
+
+
+def test_la_excepcion_llega_a_todos():
+    operacion = Operacion(error=ValueError("serie demasiado corta"))
+    fn = sf.singleflight("prueba_error")(operacion)
+
+    hilos, resultados = _lanzar(fn, 3, "Madrid", "Gasolina")
+    _esperar_a("prueba_error", 2)
+    operacion.liberar.set()
+    for h in hilos:
+        h.join()
+
+    assert operacion.llamadas == 1
+    assert all(isinstance(r, ValueError) for r in resultados)
+
+
+def test_argumentos_distintos_no_se_agrupan():
+    operacion = Operacion()
+    operacion.liberar.set()
+    fn = sf.singleflight("prueba_args")(operacion)
+
+    fn("Madrid", "Gasolina")
+    fn("Sevilla", "Gasolina")
+    # Una vez terminada, la siguiente llamada vuelve a ejecutarse
+    fn("Madrid", "Gasolina")
+    assert operacion.llamadas == 3
+
+
+def test_tiempo_de_espera_agotado():
+    operacion = Operacion()
+    fn = sf.singleflight("prueba_timeout", timeout=0.05)(operacion)
+
+    hilos, _ = _lanzar(fn, 1, "Madrid", "Gasolina")
+    assert operacion.empezada.wait(5)
+    with pytest.raises(TimeoutError):
+        fn("Madrid", "Gasolina")
+
+    operacion.liberar.set()
+    for h in hilos:
+        h.join()
@@ -2,7 +2,6 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import json
-import os
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -10,12 +9,12 @@ from statsmodels.tsa.stattools import acf, pacf
 import inspect
 # Nuevos imports para análisis completo
 from src.analysis.analysis import get_analyze_complete, analisis_estacionaridad
+from src.utils.helpers import get_provincias, get_productos
 
 
 def run():
     print(">>> Archivo cargado:", inspect.getfile(inspect.currentframe()))
 
-    SEGMENTED_PATH = "src/data/segmented"
 
     # ---------------------------------------------------------
     # TÍTULO
@@ -27,10 +26,7 @@ def run():
     # 1. Cargar provincias y productos (CÓDIGO ORIGINAL)
     # ---------------------------------------------------------
 
-    provincias = sorted([
-        d for d in os.listdir(SEGMENTED_PATH)
-        if os.path.isdir(os.path.join(SEGMENTED_PATH, d))
-    ])
+    provincias = get_provincias()
 
     if not provincias:
         st.error("No se encontraron provincias procesadas.")
@@ -38,10 +34,7 @@ def run():
 
     provincia = st.selectbox("Provincia", provincias)
 
-    productos = sorted([
-        d for d in os.listdir(os.path.join(SEGMENTED_PATH, provincia))
-        if os.path.isdir(os.path.join(SEGMENTED_PATH, provincia, d))
-    ])
+    productos = get_productos(provincia)
 
     if not productos:
         st.error("No se encontraron productos para esta provincia.")
@@ -3,27 +3,32 @@
 import streamlit as st
 import time
 from src.forecast.processors.batch_process import procesar_todo_background
-from src.forecast.processors.progress import load_progress, init_progress
+from src.forecast.processors.progress import load_summary, init_progress, reset_progress
+from src.forecast.national_forecast import generar_prediccion_nacional
+from src.utils.config import SELECCION_ESCALONADA
 
 def view_progress():
     """Vista que muestra el progreso en tiempo (casi) real."""
     init_progress()
-    progress_data = load_progress()
+    progress_data = load_summary()
 
     st.subheader("Estado general")
     st.write(f"**Estado:** {progress_data['status']}")
     st.write(f"**Procesando:** {progress_data['current']}")
 
     st.subheader("Segmentos completados")
-    if progress_data["completed"]:
-        st.write(f"Total: {len(progress_data['completed'])}")
-        st.write(progress_data["completed"])
+    if progress_data["n_completed"]:
+        st.write(f"Total: {progress_data['n_completed']}")
+        st.caption("Últimos completados:")
+        st.write(progress_data["last_completed"])
     else:
         st.write("Ningún segmento completado aún.")
 
     st.subheader("Errores")
-    if progress_data["errors"]:
-        st.write(progress_data["errors"])
+    if progress_data["n_errors"]:
+        st.write(f"Total: {progress_data['n_errors']}")
+        st.caption("Últimos errores:")
+        st.write(progress_data["last_errors"])
     else:
         st.write("Sin errores registrados por el momento.")
 
@@ -48,17 +53,46 @@ def run():
     (todas las provincias y productos presentes en la carpeta `segmented`).
     """)
 
+    reanudar = st.checkbox(
+        "Reanudar la ejecución pendiente (si la hay)",
+        value=True,
+        help="Continúa la última ejecución sin terminar, saltando los segmentos ya procesados."
+    )
+    incremental = st.checkbox(
+        "Solo segmentos con datos nuevos",
+        value=True,
+        help="Salta los segmentos cuyo análisis, modelo y predicción están al día con su histórico."
+    )
+
+    escalonado = st.checkbox(
+        "Selección escalonada de modelos",
+        value=SELECCION_ESCALONADA,
+        help="Evalúa primero los modelos baratos y solo ajusta SARIMAX si su error no basta."
+    )
+
     col1, col2 = st.columns(2)
 
     with col1:
         if st.button("🚀 Iniciar procesamiento masivo"):
-            procesar_todo_background()
+            procesar_todo_background(reanudar=reanudar, incremental=incremental, escalonado=escalonado)
             st.success("Procesamiento iniciado en segundo plano.")
 
     with col2:
         if st.button("🔄 Reiniciar estado de progreso"):
-            init_progress()
+            reset_progress()
             st.success("Estado de progreso reiniciado.")
 
+    st.markdown("---")
+    st.subheader("Predicción nacional")
+    st.caption("Predicción de todos los segmentos con modelo en una única tabla (segmento × fecha).")
+    if st.button("🗺️ Generar predicción nacional"):
+        with st.spinner("Generando predicción nacional..."):
+            ruta, errores = generar_prediccion_nacional()
+        if ruta:
+            st.success(f"Predicción nacional guardada en `{ruta}`.")
+        if errores:
+            st.warning(f"{len(errores)} segmentos con errores.")
+            st.write(errores)
+
     st.markdown("---")
     view_progress()
\ No newline at end of file
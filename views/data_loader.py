@@ -1,24 +1,34 @@
 import streamlit as st
-import os
 from src.data_preprocessing.data_loader import actualizar_datos, get_datos
+from src.data_preprocessing.price_store import migrar_segmentos, segmentos_sin_migrar
+from src.utils.config import INGESTA_CHUNKSIZE
+from src.forecast.forecast_table import actualizar_predicciones
+from src.utils.helpers import get_provincias, get_productos
 
 def run():
     st.title("🔄 Historico de Precios")
 
-    SEGMENTED_PATH = "src/data/segmented"
     # ---------------------------------------------------------
     # TÍTULO
     # ---------------------------------------------------------
     st.markdown("Para ver los datos selecciona una provincia y un producto.")
 
+    # ---------------------------------------------------------
+    # Histórico por segmento anterior al almacén de precios
+    # ---------------------------------------------------------
+    sin_migrar = segmentos_sin_migrar()
+    if sin_migrar:
+        st.warning(f"Hay {len(sin_migrar)} segmentos con histórico antiguo (original.parquet) sin importar.")
+        if st.button("📦 Importar histórico antiguo"):
+            with st.spinner("Importando histórico..."):
+                migrados = migrar_segmentos()
+            st.success(f"Importados {migrados} segmentos (los originales se conservan como .migrated).")
+
     # ---------------------------------------------------------
     # 1. Cargar provincias y productos (CÓDIGO ORIGINAL)
     # ---------------------------------------------------------
 
-    provincias = sorted([
-        d for d in os.listdir(SEGMENTED_PATH)
-        if os.path.isdir(os.path.join(SEGMENTED_PATH, d))
-    ])
+    provincias = get_provincias()
 
     if not provincias:
         st.error("No se encontraron provincias procesadas.")
@@ -26,10 +36,7 @@ def run():
 
     provincia = st.selectbox("Provincia", provincias)
 
-    productos = sorted([
-        d for d in os.listdir(os.path.join(SEGMENTED_PATH, provincia))
-        if os.path.isdir(os.path.join(SEGMENTED_PATH, provincia, d))
-    ])
+    productos = get_productos(provincia)
 
     if not productos:
         st.error("No se encontraron productos para esta provincia.")
@@ -57,10 +64,15 @@ def run():
     archivo = st.file_uploader("Cargar archivo Excel CNMC (por año)", type=["csv"])
     # 1) Actualizar histórico de un segmento
     if archivo and st.button("Actualizar Datos"):
-        df=actualizar_datos(archivo)
-        st.write("Datos Cargados:")
+        df=actualizar_datos(archivo, chunksize=INGESTA_CHUNKSIZE)
+        st.write("Datos Cargados (por segmento):")
         st.dataframe(df)
         st.success(f"Histórico actualizado.")
 
+        with st.spinner("Actualizando predicciones precalculadas..."):
+            errores = actualizar_predicciones()
+        for segmento, error in errores.items():
+            st.warning(f"{segmento}: no se pudo actualizar la predicción ({error})")
+
  
 
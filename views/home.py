@@ -1,8 +1,9 @@
 import streamlit as st
-import os
 import plotly.graph_objects as go
 
-from src.forecast.forecast import predict_future_days
+from src.forecast.forecast_table import prediccion_portada
+from src.utils.config import HOME_DIAS_HISTORICO
+from src.utils.helpers import get_provincias, get_productos
 
 def run():
     st.title("Predicción del precio de los carburantes en España")
@@ -14,15 +15,11 @@ def run():
     - Municipio
     """)
 
-    SEGMENTED_PATH = "src/data/segmented"
     # ---------------------------------------------------------
     # 1. Cargar provincias y productos
     # ---------------------------------------------------------
 
-    provincias = sorted([
-        d for d in os.listdir(SEGMENTED_PATH)
-        if os.path.isdir(os.path.join(SEGMENTED_PATH, d))
-    ])
+    provincias = get_provincias(con_modelo=True)
 
     if not provincias:
         st.error("No se encontraron provincias procesadas.")
@@ -30,10 +27,7 @@ def run():
 
     provincia = st.selectbox("Provincia", provincias)
 
-    productos = sorted([
-        d for d in os.listdir(os.path.join(SEGMENTED_PATH, provincia))
-        if os.path.isdir(os.path.join(SEGMENTED_PATH, provincia, d))
-    ])
+    productos = get_productos(provincia, con_modelo=True)
 
     if not productos:
         st.error("No se encontraron productos para esta provincia.")
@@ -47,7 +41,7 @@ def run():
         index=0
     )
     if st.button("Generar"):
-        df_hist, df_pred, metrics = predict_future_days(provincia, producto, horizonte)
+        df_hist, df_pred, metrics = prediccion_portada(provincia, producto, horizonte, dias_historico=HOME_DIAS_HISTORICO)
 
         # --- Métricas ---
         """
@@ -1,12 +1,13 @@
 import streamlit as st
-import os
-from src.forecast.train_model import get_predict, predict_segment,cargar_metadata
+from src.forecast.train_model import get_predict, predict_segment,cargar_metadata, actualizar_segmento
 import matplotlib.pyplot as plt
+from src.utils.helpers import get_provincias, get_productos
+from src.forecast.order_search import buscar_orden
+from src.forecast.backtest import cargar_backtest
 
 def run():
     key="param_s_v2"
 
-    SEGMENTED_PATH = "src/data/segmented"
     # ---------------------------------------------------------
     # TÍTULO
     # ---------------------------------------------------------
@@ -17,10 +18,7 @@ def run():
     # 1. Cargar provincias y productos
     # ---------------------------------------------------------
 
-    provincias = sorted([
-        d for d in os.listdir(SEGMENTED_PATH)
-        if os.path.isdir(os.path.join(SEGMENTED_PATH, d))
-    ])
+    provincias = get_provincias()
 
     if not provincias:
         st.error("No se encontraron provincias procesadas.")
@@ -28,10 +26,7 @@ def run():
 
     provincia = st.selectbox("Provincia", provincias)
 
-    productos = sorted([
-        d for d in os.listdir(os.path.join(SEGMENTED_PATH, provincia))
-        if os.path.isdir(os.path.join(SEGMENTED_PATH, provincia, d))
-    ])
+    productos = get_productos(provincia)
 
     if not productos:
         st.error("No se encontraron productos para esta provincia.")
@@ -74,6 +69,26 @@ def run():
     # Mostrar recomendación si existe
     if 'recomendacion' in metadata:
         st.info(f"📌 **Parámetros recomendados:** {metadata['recomendacion']}")
+
+    # Búsqueda automática por AIC: rellena los parámetros con el mejor orden encontrado
+    if st.button("🔎 Buscar órdenes automáticamente (AIC)"):
+        with st.spinner("Buscando órdenes SARIMAX"):
+            busqueda = buscar_orden(provincia, producto, s=int(metadata.get('seasonal', {}).get('s', 7)) or None)
+        st.session_state["busqueda_orden"] = {(provincia, producto): busqueda}
+        # Los campos toman el valor encontrado al volver a crearse
+        for campo in ("param_p", "param_d", "param_q", "param_P", "param_D", "param_Q", key):
+            st.session_state.pop(campo, None)
+
+    busqueda = st.session_state.get("busqueda_orden", {}).get((provincia, producto))
+    if busqueda:
+        (bp, bd, bq), (bP, bD, bQ, bs) = busqueda["order"], busqueda["seasonal_order"]
+        metadata = dict(metadata, p=bp, d=bd, q=bq, seasonal={'P': bP, 'D': bD, 'Q': bQ, 's': bs})
+        st.success(
+            f"🔎 **Mejor orden encontrado:** SARIMAX({bp},{bd},{bq})({bP},{bD},{bQ},{bs}) "
+            f"· AIC {busqueda['aic']:.1f} · {busqueda['ajustados']} ajustes, "
+            f"{busqueda['reutilizados']} reutilizados, {busqueda['podados']} descartados "
+            f"· {busqueda['tiempo']:.1f} s" + (" (presupuesto de tiempo agotado)" if busqueda["agotado"] else "")
+        )
     
     col1, col2, col3 = st.columns(3)
         
@@ -178,7 +193,7 @@ def run():
 
     st.markdown("---")
     #st.subheader("📊 Ejecutar Predicción")
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     with col1:
         if st.button("📊 Predecir serie seleccionada"):
             # Preparar parámetros
@@ -189,6 +204,14 @@ def run():
             st.success("Predicción completada.")
 
     with col2:
+        if st.button("⚡ Actualizar modelo con datos nuevos"):
+            order = (p, d, q)
+            seasonal_order = (P, D, Q, s)
+            with st.spinner("Actualizando modelo"):
+                modo = actualizar_segmento(provincia, producto, order, seasonal_order)
+            st.success(f"Modelo actualizado (modo: {modo}).")
+
+    with col3:
         mostrar_resultados = st.button("🔍 Ver resultados")
 
     if not mostrar_resultados:
@@ -213,3 +236,11 @@ def run():
         ax.set_title(f"Predicción de precios - {provincia} / {producto}")
         ax.legend()
         st.pyplot(fig)
+
+        # --- Backtest con origen móvil (error por horizonte) ---
+        backtest = cargar_backtest(provincia, producto)
+        if backtest is not None:
+            st.subheader("Backtest con origen móvil")
+            st.caption("MAE y RMSE por horizonte (días) sobre todos los orígenes del tramo de test.")
+            st.line_chart(backtest.pivot(index="horizonte", columns="modelo", values="mae"))
+            st.dataframe(backtest[["modelo", "horizonte", "mae", "rmse", "origenes"]], hide_index=True)